@@ -0,0 +1,155 @@
+"""
+bench_ask_load.py – 긴 SQL 생성이 진행 중일 때 /api/health 응답 지연 측정
+실행: python bench_ask_load.py [--asks 10] [--gen-seconds 8] [--interval 0.05]
+
+uvicorn 으로 main.app 을 띄우되 SQL 생성 백엔드를 --gen-seconds 동안 스레드를 붙잡는
+블로킹 가짜 백엔드로 바꾼다 (실제 LLM 동기 클라이언트와 같은 방식으로 대기).
+  1) 부하 없이 /api/health 지연
+  2) 서로 다른 질문 --asks 개를 동시에 /api/ask 로 보내는 동안 /api/health 를 --interval 간격으로 호출
+의 p50 / p95 / p99 / 최대 지연(ms)과 /api/ask 완료 시간을 출력한다.
+블로킹 호출이 이벤트 루프에서 돌면 2)의 health 지연이 생성 시간만큼 늘어난다.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ASK_SQL = "SELECT std_date, org_code, amt FROM td_irpos"
+
+
+class _SlowBackend:
+    """블로킹 LLM 클라이언트 흉내: generate_sql 이 호출 스레드를 gen_seconds 동안 점유"""
+
+    n_results_sql = 3
+
+    def __init__(self, gen_seconds: float):
+        self.gen_seconds = gen_seconds
+
+    def search_similar_sql(self, question: str):
+        return [], 0.5
+
+    def generate_sql(self, question: str, **kwargs) -> str:
+        time.sleep(self.gen_seconds)
+        return ASK_SQL
+
+    def run_sql(self, sql: str, cancel=None):
+        import pandas as pd
+
+        return pd.DataFrame({"std_date": ["20260101", "20260102"], "org_code": ["A001", "B002"], "amt": [1.0, 2.0]})
+
+
+def _serve(port: int, gen_seconds: float):
+    """자식 프로세스: main.vn 을 가짜 백엔드로 바꾸고 uvicorn 실행 (부트스트랩 생략)"""
+    import uvicorn
+
+    import main
+
+    main.vn = _SlowBackend(gen_seconds)
+    main._bootstrap["state"] = "ready"
+    uvicorn.run(main.app, host="127.0.0.1", port=port, lifespan="off", log_level="warning")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(gen_seconds: float, tmp: str):
+    port = _free_port()
+    env = dict(os.environ, DB_PATH=os.path.join(tmp, "bench.db"), DATABASE_URL="", RACE_MODE="off",
+               STORE_PATH=os.path.join(tmp, "bench_store.db"))
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", str(port),
+                             "--gen-seconds", str(gen_seconds)],
+                            env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError((proc.stderr.read().strip().splitlines() or ["?"])[-1])
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return proc, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("서버 기동 시간 초과")
+
+
+def _percentiles(samples: list[float]) -> str:
+    ordered = sorted(samples)
+
+    def pct(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    return (f"n={len(ordered):4d}  p50 {pct(50):7.1f}ms  p95 {pct(95):7.1f}ms  "
+            f"p99 {pct(99):7.1f}ms  max {ordered[-1]:7.1f}ms")
+
+
+async def _poll_health(client, until: asyncio.Event, interval: float) -> list[float]:
+    samples = []
+    while not until.is_set():
+        started = time.perf_counter()
+        resp = await client.get("/api/health")
+        resp.raise_for_status()
+        samples.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(interval)
+    return samples
+
+
+async def _run(base: str, asks: int, interval: float):
+    import httpx
+
+    async with httpx.AsyncClient(base_url=base, timeout=None,
+                                 limits=httpx.Limits(max_connections=asks + 4)) as client:
+        idle_done = asyncio.Event()
+        idle_task = asyncio.create_task(_poll_health(client, idle_done, interval))
+        await asyncio.sleep(2)
+        idle_done.set()
+        print(f"  health (부하 없음)      : {_percentiles(await idle_task)}")
+
+        async def ask(i: int) -> float:
+            started = time.perf_counter()
+            resp = await client.post("/api/ask", json={"question": f"부하 측정용 질문 {i} {time.time_ns()}"})
+            resp.raise_for_status()
+            return time.perf_counter() - started
+
+        loaded_done = asyncio.Event()
+        health_task = asyncio.create_task(_poll_health(client, loaded_done, interval))
+        ask_times = await asyncio.gather(*(ask(i) for i in range(asks)))
+        loaded_done.set()
+        print(f"  health (ask {asks}건 진행 중): {_percentiles(await health_task)}")
+        print(f"  /api/ask 완료 시간     : 최소 {min(ask_times):.1f}s  중앙 {statistics.median(ask_times):.1f}s  "
+              f"최대 {max(ask_times):.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--asks", type=int, default=10)
+    parser.add_argument("--gen-seconds", type=float, default=8.0)
+    parser.add_argument("--interval", type=float, default=0.05)
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        _serve(args.serve, args.gen_seconds)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server, base = _start_server(args.gen_seconds, tmp)
+        try:
+            print(f"[bench] 동시 ask {args.asks}건, SQL 생성 {args.gen_seconds:g}s (블로킹), "
+                  f"health 간격 {args.interval * 1000:.0f}ms")
+            asyncio.run(_run(base, args.asks, args.interval))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+bench_chroma_clients.py – 백엔드 생성 시 ChromaDB 클라이언트 수·기동 시간·RSS 측정
+실행: python bench_chroma_clients.py [--repeat 3]
+
+새 프로세스에서 vanna_setup 을 import 하고 Primary·Fallback·등록 프로바이더(groq/gemini/claude,
+벤치용 가짜 키)를 모두 생성해
+  - import + 생성 소요 시간
+  - 시작·생성 후 RSS(VmRSS) 와 최대 RSS(VmHWM)
+  - 서로 다른 Chroma 클라이언트 / 임베딩 함수 객체 수
+를 출력한다. 임베딩 함수마다 첫 검색 시 ONNX 임베딩 모델을 따로 로드하므로
+임베딩 함수 수만큼 모델 메모리가 추가로 든다. (/proc 를 읽으므로 Linux 전용)
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def _proc_status_mb(key: str) -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(key + ":"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _build_all() -> list:
+    import vanna_setup
+
+    backends = [vanna_setup.get_primary_vn(), vanna_setup.get_fallback_vn()]
+    backends += [vanna_setup._get_provider(name) for name in ("groq", "gemini", "claude")]
+    return [b for b in backends if b is not None]
+
+
+def _run_child():
+    """자식 프로세스: import + 백엔드 전체 생성 → '초 시작RSS 생성후RSS 최대RSS 클라이언트수 임베딩수 백엔드수' 출력"""
+    start_mb = _proc_status_mb("VmRSS")
+    started = time.perf_counter()
+    # import·생성 로그는 버린다
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+    try:
+        backends = _build_all()
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    seconds = time.perf_counter() - started
+    clients = {id(b.chroma_client) for b in backends}
+    embeddings = {id(b.embedding_function) for b in backends}
+    print(f"{seconds} {start_mb} {_proc_status_mb('VmRSS')} {_proc_status_mb('VmHWM')} "
+          f"{len(clients)} {len(embeddings)} {len(backends)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _run_child()
+        return
+
+    runs = []
+    for _ in range(args.repeat):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, CHROMA_PATH=os.path.join(tmp, "chroma"), LLM_PROVIDER="sqlcoder",
+                       SQLCODER_MODE="ollama", GROQ_API_KEY="bench", GEMINI_API_KEY="bench",
+                       CLAUDE_API_KEY="bench", DB_PATH=os.path.join(tmp, "bench.db"), DATABASE_URL="")
+            proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"], env=env,
+                                  cwd=os.path.dirname(os.path.abspath(__file__)),
+                                  capture_output=True, text=True)
+            if proc.returncode != 0:
+                sys.exit(f"[bench] 실패 — {(proc.stderr.strip().splitlines() or ['?'])[-1]}")
+            runs.append([float(v) for v in proc.stdout.strip().splitlines()[-1].split()])
+
+    seconds, start_mb, after_mb, peak_mb, clients, embeddings, backends = (
+        statistics.median(col) for col in zip(*runs)
+    )
+    print(f"[bench] 백엔드 {backends:.0f}개 생성, {args.repeat}회 중앙값")
+    print(f"  import + 생성 : {seconds * 1000:7.0f}ms")
+    print(f"  RSS           : 시작 {start_mb:6.1f}MB → 생성 후 {after_mb:6.1f}MB "
+          f"(+{after_mb - start_mb:.1f}MB, 최대 {peak_mb:.1f}MB)")
+    print(f"  Chroma 클라이언트 {clients:.0f}개, 임베딩 함수 {embeddings:.0f}개")
+
+
+if __name__ == "__main__":
+    main()
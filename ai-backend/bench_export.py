@@ -0,0 +1,221 @@
+"""
+bench_export.py – /api/ask/{message_id}/export 메모리 사용량 확인
+실행: python bench_export.py [--rows 2000000] [--chunk 50000]
+
+임시 SQLite에 td_irpos 형태(기준일자·기관코드·포트폴리오번호 + 수치 컬럼)의 합성 데이터를
+--rows 행 만들고, 방식마다 별도 프로세스의 최대 RSS(VmHWM)를 비교한다.
+  전체 로드 : pd.read_sql 전체 → to_csv (기존 방식 근사, 단독 프로세스)
+  csv      : uvicorn 으로 main.app 을 띄우고 /api/ask/{id}/export?format=csv 를 HTTP로 끝까지 수신
+  parquet  : 같은 방식으로 format=parquet (pyarrow 설치 시)
+서버 경로(iter_sql → StreamingResponse 스레드 순회)를 그대로 거치므로 행 수를 늘려도
+서버 최대 RSS가 거의 변하지 않아야 한다. 추가로
+  - 첫 조각 컬럼이 전부 NULL 인 Parquet 내보내기 (result_format.parquet_chunks)
+  - 다운로드 중 연결을 끊으면 서버가 DB 파일 핸들을 바로 반납하는지
+를 확인한다. (/proc 를 읽으므로 Linux 전용)
+"""
+import argparse
+import io
+import os
+import resource
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+SQL = "SELECT * FROM td_irpos"
+NUMERIC_COLS = 12
+MESSAGE_ID = "bench-export"
+
+
+def _build_db(path: str, rows: int):
+    rng = np.random.default_rng(0)
+    cols = ", ".join(f"amt_{i} REAL" for i in range(NUMERIC_COLS))
+    conn = sqlite3.connect(path)
+    conn.execute(f"CREATE TABLE td_irpos (std_date TEXT, org_code TEXT, port_no INTEGER, memo TEXT, {cols})")
+    marks = ", ".join("?" * (NUMERIC_COLS + 4))
+    batch = 100000
+    for start in range(0, rows, batch):
+        n = min(batch, rows - start)
+        amounts = rng.normal(1e6, 1e5, size=(n, NUMERIC_COLS)).tolist()
+        dates = rng.choice(["20260101", "20260102", "20260103"], n).tolist()
+        orgs = rng.choice(["A001", "B002", "C003"], n).tolist()
+        ports = rng.integers(1, 500, n).tolist()
+        # memo: 앞쪽 행은 전부 NULL, 뒤쪽에만 값 (Parquet 스키마 통합 경로)
+        memos = [None if start + i < rows // 2 else f"m{(start + i) % 7}" for i in range(n)]
+        conn.executemany(
+            f"INSERT INTO td_irpos VALUES ({marks})",
+            ([d, o, p, m, *a] for d, o, p, m, a in zip(dates, orgs, ports, memos, amounts)),
+        )
+    conn.commit()
+    conn.close()
+
+
+def _check_parquet_leading_nulls():
+    """첫 조각에서 전부 NULL 인 컬럼이 뒤 조각에서 값을 가져도 중간 실패 없이 기록되는지"""
+    import pandas as pd
+
+    from result_format import parquet_chunks
+
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("[check] Parquet NULL 선행 조각: pyarrow 미설치 — 건너뜀")
+        return
+    chunks = [
+        pd.DataFrame({"memo": [None, None], "amt": [1, 2]}),
+        pd.DataFrame({"memo": ["a", None], "amt": [1.5, None]}),
+        pd.DataFrame({"memo": [None, "b"], "amt": [3, 4]}),
+    ]
+    table = pq.read_table(io.BytesIO(b"".join(parquet_chunks(iter(chunks)))))
+    assert table.num_rows == 6, table.num_rows
+    assert str(table.schema.field("memo").type) in ("string", "large_string"), table.schema
+    assert table.column("memo").to_pylist() == [None, None, "a", None, None, "b"]
+    assert table.column("amt").to_pylist()[2:4] == [1.5, None]
+    print("[check] Parquet NULL 선행 조각: OK")
+
+
+def _run_full(path: str):
+    """자식 프로세스: 전체 로드 기준선. 출력 바이트 수, 소요 시간, 최대 RSS(MB) 출력"""
+    import pandas as pd
+
+    conn = sqlite3.connect(path)
+    started = time.perf_counter()
+    size = len(pd.read_sql(SQL, conn).to_csv(index=False).encode("utf-8"))
+    seconds = time.perf_counter() - started
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{size} {seconds} {rss_mb}")
+
+
+def _serve(port: int):
+    """자식 프로세스: main.app 에 벤치용 SQL을 등록하고 uvicorn 실행 (부트스트랩 생략)"""
+    import uvicorn
+
+    import main
+
+    main._remember_ask(MESSAGE_ID, SQL)
+    main._bootstrap["state"] = "ready"
+    uvicorn.run(main.app, host="127.0.0.1", port=port, lifespan="off", log_level="warning")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _proc_status_mb(pid: int, key: str) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith(key + ":"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _open_handles(pid: int, path: str) -> int:
+    count = 0
+    for fd in os.listdir(f"/proc/{pid}/fd"):
+        try:
+            if os.readlink(f"/proc/{pid}/fd/{fd}").startswith(path):
+                count += 1
+        except OSError:
+            pass
+    return count
+
+
+def _start_server(path: str, chunk: int, tmp: str):
+    port = _free_port()
+    env = dict(os.environ, DB_PATH=path, DATABASE_URL="", EXPORT_CHUNK_ROWS=str(chunk),
+               STORE_PATH=os.path.join(tmp, "bench_store.db"))
+    proc = subprocess.Popen([sys.executable, __file__, "--serve", str(port)], env=env,
+                            cwd=os.path.dirname(os.path.abspath(__file__)),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(proc.stderr.read().strip().splitlines()[-1])
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return proc, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("서버 기동 시간 초과")
+
+
+def _export(base: str, mode: str, path: str, pid: int) -> str:
+    import httpx
+
+    url = f"{base}/api/ask/{MESSAGE_ID}/export?format={mode}"
+    idle_mb = _proc_status_mb(pid, "VmRSS")
+    started = time.perf_counter()
+    size = 0
+    with httpx.stream("GET", url, timeout=None) as resp:
+        resp.raise_for_status()
+        for part in resp.iter_raw():
+            size += len(part)
+    seconds = time.perf_counter() - started
+    peak_mb = _proc_status_mb(pid, "VmHWM")
+
+    # 다운로드 도중 연결 종료 → DB 파일 핸들이 남지 않아야 함
+    # (진행 중이던 조각 읽기가 끝나는 즉시 반납되므로 최대 10초 대기)
+    with httpx.stream("GET", url, timeout=None) as resp:
+        next(resp.iter_raw())
+    closed_at = time.perf_counter()
+    while (leaked := _open_handles(pid, path)) and time.perf_counter() - closed_at < 10:
+        time.sleep(0.1)
+    released = f"{time.perf_counter() - closed_at:.1f}s 후 반납" if not leaked else f"{leaked}개 남음"
+    return (f"{seconds:6.1f}s  출력 {size / 1e6:7.1f}MB  서버 RSS 기동 {idle_mb:6.1f}MB → 최대 {peak_mb:7.1f}MB"
+            f"  중단 시 DB 핸들 {released}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2000000)
+    parser.add_argument("--chunk", type=int, default=50000)
+    parser.add_argument("--full", metavar="DB", help=argparse.SUPPRESS)
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.full:
+        _run_full(args.full)
+        return
+    if args.serve:
+        _serve(args.serve)
+        return
+
+    _check_parquet_leading_nulls()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench_export.db")
+        started = time.perf_counter()
+        _build_db(path, args.rows)
+        print(f"[bench] td_irpos {args.rows}행 생성 ({time.perf_counter() - started:.1f}s, "
+              f"{os.path.getsize(path) / 1e6:.0f}MB), chunk={args.chunk}")
+
+        proc = subprocess.run([sys.executable, __file__, "--full", path], capture_output=True, text=True)
+        if proc.returncode == 0:
+            size, seconds, rss_mb = proc.stdout.split()
+            print(f"  {'전체 로드':8s}: {float(seconds):6.1f}s  출력 {int(size) / 1e6:7.1f}MB  최대 RSS {float(rss_mb):7.1f}MB")
+        else:
+            print(f"  {'전체 로드':8s}: 실패 — {(proc.stderr.strip().splitlines() or ['?'])[-1]}")
+
+        for mode in ("csv", "parquet"):
+            try:
+                server, base = _start_server(path, args.chunk, tmp)
+            except RuntimeError as e:
+                print(f"  {mode:8s}: 서버 기동 실패 — {e}")
+                continue
+            try:
+                print(f"  {mode:8s}: {_export(base, mode, path, server.pid)}")
+            except Exception as e:
+                print(f"  {mode:8s}: 실패 — {e}")
+            finally:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+bench_import.py – `import main` 소요 시간 측정 (python -X importtime 기반)
+실행: python bench_import.py [--budget-ms 500] [--repeat 5] [--top 15]
+
+새 프로세스에서
+  1) 기준선: main·vanna_setup 이 쓰는 외부 패키지(DEPENDENCIES)만 import
+  2) `import main`
+을 번갈아 --repeat 회 실행해 각각의 중앙값을 구하고, 그 차이(앱 모듈 자체 import 비용)가
+IMPORT_BUDGET_MS(기본 500ms)를 넘으면 종료 코드 1로 실패한다.
+외부 패키지 import 시간은 머신마다 크게 다르므로 절대값 대신 기준선 대비 증가분으로 판단한다.
+프로바이더·ChromaDB 클라이언트·임베딩 모델은 지연 생성되므로 이 증가분에 포함되면 안 된다.
+(측정 예: 기준선 ≈1.9s / 증가분: 현재 ≈0.1s, import 시 프로바이더를 생성하던 이전 코드 ≈1.8s)
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+# main.py / vanna_setup.py 가 import 하는 외부 패키지
+DEPENDENCIES = (
+    "dotenv", "fastapi", "fastapi.middleware.cors", "fastapi.responses",
+    "pydantic", "requests", "pandas", "vanna.chromadb",
+)
+
+
+def measure(code: str) -> list[tuple[str, int, int, int]]:
+    """(모듈, self µs, 누적 µs, 깊이) 목록. 실패 시 stderr를 출력하고 종료"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        print(result.stderr[-2000:])
+        sys.exit(f"[bench] {code} 실패")
+    rows = []
+    for line in result.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            rows.append((m.group(4), int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2))
+    return rows
+
+
+def _total_ms(rows: list[tuple[str, int, int, int]]) -> float:
+    """최상위 import 누적 시간 합계(ms)"""
+    return sum(cum for _, _, cum, depth in rows if depth == 0) / 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", "500")))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    baseline, totals = [], []
+    for _ in range(args.repeat):
+        baseline.append(_total_ms(measure("import " + ", ".join(DEPENDENCIES))))
+        rows = measure("import main")
+        totals.append(_total_ms(rows))
+
+    print(f"{'누적(ms)':>10} {'self(ms)':>10}  모듈  (마지막 실행)")
+    for name, self_us, cum_us, _ in sorted(rows, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f"{cum_us / 1000:>10.1f} {self_us / 1000:>10.1f}  {name}")
+
+    base_ms = statistics.median(baseline)
+    total_ms = statistics.median(totals)
+    print(f"\n[bench] 외부 패키지 기준선: {base_ms:.0f}ms  (중앙값, {args.repeat}회)")
+    print(f"[bench] import main       : {total_ms:.0f}ms")
+    print(f"[bench] 앱 모듈 증가분    : {total_ms - base_ms:.0f}ms (예산 {args.budget_ms:.0f}ms)")
+    if total_ms - base_ms > args.budget_ms:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+bench_race.py – RACE_MODE(off / hedge / parallel)별 SQL 생성 지연 비교
+실행: python bench_race.py [--questions 208] [--concurrency 16] [--hedge-ms 150] [--seed 0]
+
+main.ask_with_retry 를 그대로 호출하되 LLM 백엔드는 지연·실패를 흉내 내는 가짜 백엔드로 바꾼다.
+  primary : 평균 100ms, 10% 확률로 1s 지연, 5% 확률로 실패 (429 등)
+  partner : 평균 200ms,  5% 확률로 0.8s 지연, 2% 확률로 실패
+  DB 실행 : 매 쿼리 --db-ms (생성 지연 지표에는 포함되면 안 됨)
+모드마다 /admin/monitoring 의 sql_generation_latency(p50/p95/p99)와
+ask_with_retry 전체 소요 시간(p50/p99)을 출력한다.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+_tmp = tempfile.mkdtemp(prefix="bench_race_")
+os.environ.setdefault("DB_PATH", os.path.join(_tmp, "bench.db"))
+os.environ.setdefault("STORE_PATH", os.path.join(_tmp, "bench_store.db"))
+os.environ["DATABASE_URL"] = ""
+
+import main  # noqa: E402
+
+_sql_ids = itertools.count()
+
+
+class _StubBackend:
+    """generate_sql 이 호출 스레드를 점유하는 가짜 LLM (지연·실패 확률 지정)"""
+
+    n_results_sql = 3
+
+    def __init__(self, rng: random.Random, mean: float, stall: float, p_stall: float, p_fail: float,
+                 db_seconds: float):
+        self.rng = rng
+        self.mean = mean
+        self.stall = stall
+        self.p_stall = p_stall
+        self.p_fail = p_fail
+        self.db_seconds = db_seconds
+        self._lock = threading.Lock()
+
+    def search_similar_sql(self, question: str):
+        return [], 0.5
+
+    def generate_sql(self, question: str, **kwargs) -> str:
+        with self._lock:
+            stalled = self.rng.random() < self.p_stall
+            delay = self.stall if stalled else self.mean * self.rng.uniform(0.7, 1.3)
+            failed = self.rng.random() < self.p_fail
+        time.sleep(delay)
+        if failed:
+            raise RuntimeError("429 Too Many Requests")
+        # 결과 캐시에 걸리지 않도록 매번 다른 SQL
+        return f"SELECT std_date, org_code, amt FROM td_irpos WHERE port_no = {next(_sql_ids)}"
+
+    def run_sql(self, sql: str, cancel=None):
+        import pandas as pd
+
+        time.sleep(self.db_seconds)
+        return pd.DataFrame({"std_date": ["20260101"], "org_code": ["A001"], "amt": [1.0]})
+
+
+def _pct(samples: list[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+
+
+async def _run_mode(mode: str, args) -> str:
+    rng = random.Random(args.seed)
+    db_seconds = args.db_ms / 1000
+    primary = _StubBackend(rng, 0.1, 1.0, 0.10, 0.05, db_seconds)
+    partner = _StubBackend(rng, 0.2, 0.8, 0.05, 0.02, db_seconds)
+
+    main.vn = primary
+    main.get_fallback_vn = lambda: partner
+    main.get_race_partner = lambda: ("partner", partner)
+    main.RACE_MODE = mode
+    main.RACE_HEDGE_DELAY = args.hedge_ms / 1000
+    main._generation_latency = main._LatencyStats()
+
+    totals: list[float] = []
+    gate = asyncio.Semaphore(args.concurrency)
+
+    async def one(i: int):
+        async with gate:
+            started = time.perf_counter()
+            await main.ask_with_retry(f"{mode} 지연 측정 질문 {i} {time.time_ns()}")
+            totals.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one(i) for i in range(args.questions)))
+    gen = main._generation_latency.summary().get(mode, {})
+    return (f"생성 p50 {gen.get('p50_ms', 0):5d}  p95 {gen.get('p95_ms', 0):5d}  p99 {gen.get('p99_ms', 0):5d} ms"
+            f"  | 전체 p50 {_pct(totals, 0.50):5.0f}  p99 {_pct(totals, 0.99):5.0f} ms")
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=208)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--hedge-ms", type=float, default=150)
+    parser.add_argument("--db-ms", type=float, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"[bench] 질문 {args.questions}건, 동시 {args.concurrency}, hedge {args.hedge_ms:g}ms, DB {args.db_ms:g}ms")
+    for mode in ("off", "hedge", "parallel"):
+        # ask_with_retry 단계별 로그는 버린다
+        stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+        try:
+            line = asyncio.run(_run_mode(mode, args))
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+        print(f"  {mode:8s}: {line}")
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,66 @@
+"""
+bench_result_format.py – /api/ask 결과 직렬화 방식 비교
+실행: python bench_result_format.py [--rows 10000 100000]
+
+td_irpos 형태(날짜·코드 문자열 + 수치 컬럼 다수)의 임의 DataFrame으로
+  기존   : json.loads(df.to_json(records)) → json.dumps (FastAPI 응답 직렬화 근사)
+  records: result_format.records_json (to_json 결과를 그대로 이어 붙임)
+  columns: result_format.columns_json
+  arrow  : result_format.arrow_ipc (pyarrow 설치 시)
+의 소요 시간과 본문 크기를 출력한다.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from result_format import arrow_ipc, columns_json, records_json
+
+META = {"message_id": "bench", "sql": "SELECT * FROM td_irpos", "chart_type": "bar", "summary": "", "from_cache": False}
+
+
+def _frame(rows: int, numeric_cols: int = 30) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(1e6, 1e5, size=(rows, numeric_cols)), columns=[f"amt_{i}" for i in range(numeric_cols)])
+    df.insert(0, "std_date", rng.choice(["20260101", "20260102", "20260103"], rows))
+    df.insert(1, "org_code", rng.choice(["A001", "B002", "C003"], rows))
+    df.insert(2, "port_no", rng.integers(1, 500, rows))
+    return df
+
+
+def _legacy(meta: dict, df: pd.DataFrame) -> bytes:
+    data = json.loads(df.to_json(orient="records", force_ascii=False))
+    return json.dumps({**meta, "data": data}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _time(fn, *args, repeat: int = 3):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        out = fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+
+    encoders = [("기존", _legacy), ("records", records_json), ("columns", columns_json), ("arrow", arrow_ipc)]
+    for rows in args.rows:
+        df = _frame(rows)
+        print(f"\n[bench] {rows}행 x {df.shape[1]}열")
+        for name, encode in encoders:
+            try:
+                seconds, body = _time(encode, META, df)
+            except ImportError:
+                print(f"  {name:8s}: pyarrow 미설치 — 건너뜀")
+                continue
+            print(f"  {name:8s}: {seconds * 1000:8.1f}ms  {len(body) / 1e6:7.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
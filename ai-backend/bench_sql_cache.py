@@ -0,0 +1,181 @@
+"""
+bench_sql_cache.py – 질문 → SQL 캐시 조회 속도 및 기존 선형 스캔과의 결과 동일성 확인
+실행: python bench_sql_cache.py [--sizes 100,10000,100000] [--queries 300] [--linear-queries 20] [--seed 0]
+
+캐시 크기(--sizes)마다 합성 질문(기관·기간·지표·조건 조합)을 캐시에 넣고,
+  - 캐시 질문 일부를 고친 질문 (문자 치환·삽입·삭제)
+  - 캐시에 없는 무작위 질문, 짧은 질문
+으로 조회한다.
+  1) 동일성: 여러 threshold에서 SQLCache.lookup 결과(SQL, 점수)가
+     기존 main.find_cached_sql 의 SequenceMatcher 선형 스캔과 모두 같아야 한다 (다르면 종료 코드 1)
+  2) 속도  : CACHE_THRESHOLD(0.92)에서 조회 1건당 평균/최대 시간 비교
+선형 스캔은 10만 건에서 조회 1건에 수 초가 걸리므로 앞쪽 --linear-queries 건만 재고
+(동일성도 그 질문들로 확인), 색인 조회는 --queries 건 전체로 잰다. (기본 설정 전체 실행 ≈4~5분)
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from difflib import SequenceMatcher
+
+from sql_cache import SQLCache
+
+THRESHOLDS = (0.92, 0.85, 0.7, 0.5)
+CACHE_THRESHOLD = 0.92
+
+_ORGS = ["본사", "서울지점", "부산지점", "대구지점", "광주지점", "대전지점", "ALM팀", "자금부", "리스크관리부"]
+_PERIODS = ["오늘", "어제", "이번 주", "지난주", "이번 달", "지난달", "올해", "작년", "2025년 4분기", "2026년 1월"]
+_METRICS = ["매출액", "잔액", "평가금액", "수익률", "듀레이션", "VaR", "평균 금리", "거래 건수", "연체율", "순이자마진"]
+_FORMS = ["알려줘", "보여줘", "조회해줘", "얼마야", "비교해줘", "추이를 그려줘", "상위 10개 보여줘"]
+_FILTERS = ["", "포트폴리오별 ", "상품별 ", "통화별 ", "만기 1년 이내 ", "원화 ", "외화 "]
+
+
+def _linear_best(cache: dict[str, str], question: str) -> tuple[str | None, float]:
+    best_q: str | None = None
+    best_score = 0.0
+    q = question.strip()
+    for cached_q in cache:
+        score = SequenceMatcher(None, q, cached_q).ratio()
+        if score > best_score:
+            best_score = score
+            best_q = cached_q
+    return best_q, best_score
+
+
+def _apply_threshold(cache: dict[str, str], best_q: str | None, best_score: float,
+                     threshold: float) -> tuple[str | None, float]:
+    if best_q and best_score >= threshold:
+        return cache[best_q], best_score
+    return None, 0.0
+
+
+def linear_lookup(cache: dict[str, str], question: str, threshold: float) -> tuple[str | None, float]:
+    """기존 find_cached_sql 과 동일한 전체 선형 스캔 (비교 기준)"""
+    return _apply_threshold(cache, *_linear_best(cache, question), threshold)
+
+
+def _question(rng: random.Random) -> str:
+    return (f"{rng.choice(_PERIODS)} {rng.choice(_ORGS)} {rng.choice(_FILTERS)}"
+            f"{rng.choice(_METRICS)} {rng.choice(_FORMS)}")
+
+
+def _perturb(rng: random.Random, text: str) -> str:
+    chars = list(text)
+    for _ in range(rng.randint(1, 3)):
+        op = rng.random()
+        pos = rng.randrange(len(chars))
+        if op < 0.4:
+            chars[pos] = rng.choice("가나다라마바사는의를 1")
+        elif op < 0.7:
+            chars.insert(pos, rng.choice("좀 더요"))
+        elif len(chars) > 2:
+            del chars[pos]
+    return "".join(chars)
+
+
+def _queries(rng: random.Random, keys: list[str], n: int) -> list[str]:
+    queries = []
+    for i in range(n):
+        kind = i % 5
+        if kind == 0:
+            queries.append(rng.choice(keys))
+        elif kind in (1, 2):
+            queries.append(_perturb(rng, rng.choice(keys)))
+        elif kind == 3:
+            queries.append(_question(rng))
+        else:
+            queries.append(rng.choice(keys)[: rng.randint(1, 6)])
+    return queries
+
+
+def _fill(rng: random.Random, size: int) -> tuple[dict[str, str], SQLCache]:
+    linear: dict[str, str] = {}
+    cache = SQLCache()
+    # 짧은 질문(bigram 0~1개)도 섞어 길이 버킷 경로까지 확인
+    extra = ["a", "ab", "잔액", "VaR", "매출"]
+    while len(linear) < size:
+        q = extra.pop() if extra else _question(rng)
+        if rng.random() < 0.3:
+            q = _perturb(rng, q)
+        q = q.strip()
+        if not q or q in linear:
+            continue
+        sql = f"SELECT {len(linear)} AS id"
+        linear[q] = sql
+        cache.set(q, sql, pinned=len(linear) % 2 == 0)
+    return linear, cache
+
+
+def check_equivalence(linear: dict[str, str], cache: SQLCache, queries: list[str],
+                      best: list[tuple[str | None, float]] | None = None) -> int:
+    # 선형 스캔 최고점은 threshold와 무관하므로 질문마다 한 번만 계산
+    mismatches = 0
+    best = best or [_linear_best(linear, q) for q in queries]
+    for threshold in THRESHOLDS:
+        for q, (best_q, best_score) in zip(queries, best):
+            expected = _apply_threshold(linear, best_q, best_score, threshold)
+            actual = cache.lookup(q, threshold)
+            if expected != actual:
+                mismatches += 1
+                if mismatches <= 5:
+                    print(f"  불일치 t={threshold} {q!r}: 선형 {expected} / 색인 {actual}")
+    print(f"[check] 캐시 {len(linear)}건 × 질문 {len(queries)}건 × threshold {THRESHOLDS}: 불일치 {mismatches}건")
+    return mismatches
+
+
+def _time(fn, queries: list[str]) -> tuple[list[float], list]:
+    """(조회 1건당 ms 목록, 결과 목록)"""
+    samples, results = [], []
+    for q in queries:
+        started = time.perf_counter()
+        results.append(fn(q))
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples, results
+
+
+def _line(name: str, samples: list[float]) -> str:
+    return (f"  {name:10s}: 조회 {len(samples):4d}건  평균 {statistics.mean(samples):9.3f}ms  "
+            f"중앙 {statistics.median(samples):9.3f}ms  최대 {max(samples):9.3f}ms")
+
+
+def bench_size(size: int, args) -> int:
+    rng = random.Random(args.seed)
+    linear, cache = _fill(rng, size)
+    queries = _queries(rng, list(linear), args.queries)
+    linear_queries = queries[:args.linear_queries]
+
+    # 선형 스캔 시간 = 최고점 계산 시간 (threshold 적용은 무시할 만함), 그 결과로 동일성도 확인
+    old, best = _time(lambda q: _linear_best(linear, q), linear_queries)
+    mismatches = check_equivalence(linear, cache, linear_queries, best)
+    new, _ = _time(lambda q: cache.lookup(q, CACHE_THRESHOLD), queries)
+
+    print(f"[bench] 캐시 {len(linear)}건, threshold {CACHE_THRESHOLD}")
+    print(_line("선형 스캔", old))
+    print(_line("bigram 색인", new))
+    print(f"  평균 {statistics.mean(old) / statistics.mean(new):.0f}배 빠름\n")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="100,10000,100000", help="쉼표로 구분한 캐시 크기")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--linear-queries", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # 동일성 확인은 캐시가 작을 때도 질문 전체로 해 둔다 (후보 거르기 경계 조건)
+    small_linear, small_cache = _fill(random.Random(args.seed + 1), 50)
+    mismatches = check_equivalence(small_linear, small_cache,
+                                   _queries(random.Random(args.seed + 2), list(small_linear), args.queries))
+    print()
+    for size in (int(v) for v in args.sizes.split(",")):
+        mismatches += bench_size(size, args)
+    if mismatches:
+        sys.exit(f"[check] 선형 스캔과 결과 불일치 {mismatches}건")
+    print("[check] 선형 스캔과 결과 동일: OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+bench_train_bulk.py – 학습 방식 비교 (건별 add vs train_bulk 최초 실행 vs 재실행)
+실행: python bench_train_bulk.py
+
+train.py + train_ncr.py 의 DDL·문서·Golden SQL 항목 전체를 임시 CHROMA_PATH 에
+  1) 기존 방식 : 항목마다 임베딩 1회 + collection.add (vanna add_question_sql/add_ddl/add_documentation 과 동일)
+  2) 최초 실행 : train_bulk (빈 컬렉션, 64개 단위 임베딩·upsert)
+  3) 재실행    : train_bulk (변경 없음 → 임베딩 없이 건너뜀)
+으로 학습하고 소요 시간과 items/sec 를 출력한다. 실제 CHROMA_PATH 데이터는 건드리지 않는다.
+
+임베딩 모델(all-MiniLM-L6-v2 ONNX)을 받을 수 없는 환경에서는 고정 벡터 임베딩으로 바꿔
+Chroma 쓰기·조회 비용만 측정하고 그 사실을 출력한다. (재실행은 임베딩을 호출하지 않으므로 영향 없음)
+"""
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+_tmp = tempfile.mkdtemp(prefix="bench_train_")
+os.environ["CHROMA_PATH"] = os.path.join(_tmp, "chroma")
+os.environ.setdefault("LLM_PROVIDER", "sqlcoder")
+os.environ.setdefault("SQLCODER_MODE", "ollama")
+
+import train  # noqa: E402
+import train_ncr  # noqa: E402
+from vanna_setup import TRAINING_FILES_SOURCE, get_primary_vn  # noqa: E402
+
+DIM = 384   # DefaultEmbeddingFunction(all-MiniLM-L6-v2) 차원
+
+
+def _fixed_embedding(texts: list[str]) -> list[list[float]]:
+    return [[b / 255 for b in hashlib.sha256(text.encode("utf-8")).digest()] * (DIM // 32) for text in texts]
+
+
+def _items() -> list[dict]:
+    items = []
+    for module in (train, train_ncr):
+        items += module.ddl_items() + module.documentation_items() + module.golden_sql_items()
+    return items
+
+
+def _train_one_by_one(vn, items: list[dict]) -> float:
+    started = time.perf_counter()
+    for item in items:
+        collection, id_, doc = vn._training_record(item)
+        collection.add(ids=[id_], documents=[doc], embeddings=[list(vn.embedding_function([doc])[0])])
+    return time.perf_counter() - started
+
+
+def _clear(vn):
+    for training_type in ("sql", "ddl", "documentation"):
+        vn.delete_training(training_type=training_type)
+
+
+def main():
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+    try:
+        vn = get_primary_vn()
+        items = _items()
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    try:
+        vn.embedding_function(["probe"])
+        embedding = "all-MiniLM-L6-v2"
+    except Exception as e:
+        vn.embedding_function = _fixed_embedding
+        embedding = f"고정 벡터 (모델 로드 실패: {str(e)[:60]}) — 임베딩 시간 제외"
+
+    counts = {kind: sum(1 for item in items if kind in item) for kind in ("sql", "ddl", "documentation")}
+    print(f"[bench] 학습 항목 {len(items)}개 (sql {counts['sql']} / ddl {counts['ddl']} / "
+          f"doc {counts['documentation']}), 임베딩: {embedding}")
+
+    seconds = _train_one_by_one(vn, items)
+    print(f"  건별 add    : {seconds:7.2f}s  {len(items) / seconds:8.1f} items/s")
+    _clear(vn)
+
+    for label in ("최초 실행", "재실행"):
+        result = vn.train_bulk(items, source=TRAINING_FILES_SOURCE)
+        print(f"  {label:10s}: {result['seconds']:7.2f}s  {result['items_per_sec']:8.1f} items/s  "
+              f"(신규 {result['added']} / 변경 없음 {result['skipped']} / 실패 {result['failed']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+bench_training_delete.py – 학습 데이터 삭제 방식 비교 (건별 remove vs 배치 delete)
+실행: python bench_training_delete.py [--rows 10000]
+
+메모리 Chroma 컬렉션에 임의 임베딩으로 rows건을 넣고,
+  1) 기존 방식: id 하나씩 collection.delete
+  2) 배치 방식: vanna_setup._delete_ids (1회 조회 + 배치 delete)
+의 소요 시간을 비교한다. 실제 CHROMA_PATH 데이터는 건드리지 않는다.
+"""
+import argparse
+import random
+import time
+
+import chromadb
+from chromadb.config import Settings
+
+from vanna_setup import _delete_ids
+
+DIM = 384   # DefaultEmbeddingFunction(all-MiniLM-L6-v2) 차원
+
+
+def _fill(client, name: str, rows: int):
+    collection = client.get_or_create_collection(name=name)
+    for i in range(0, rows, 1000):
+        ids = [f"{n:08d}-sql" for n in range(i, min(i + 1000, rows))]
+        collection.add(
+            ids=ids,
+            documents=[f'{{"question": "q{n}", "sql": "SELECT {n}"}}' for n in range(len(ids))],
+            embeddings=[[random.random() for _ in range(DIM)] for _ in ids],
+        )
+    return collection
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    args = parser.parse_args()
+
+    client = chromadb.EphemeralClient(settings=Settings(anonymized_telemetry=False))
+
+    collection = _fill(client, "bench_one_by_one", args.rows)
+    started = time.perf_counter()
+    for id_ in collection.get(include=[])["ids"]:
+        collection.delete(ids=[id_])
+    one_by_one = time.perf_counter() - started
+
+    collection = _fill(client, "bench_batched", args.rows)
+    started = time.perf_counter()
+    _delete_ids(collection, collection.get(include=[])["ids"])
+    batched = time.perf_counter() - started
+
+    print(f"[bench] {args.rows}건 삭제")
+    print(f"  건별 delete : {one_by_one:8.2f}s")
+    print(f"  배치 delete : {batched:8.2f}s  (x{one_by_one / batched:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+column_profile.py – 조회 결과 컬럼 프로파일 (차트 타입 추론 / Smart Narrative 공용)
+
+컬럼별로 dtype·날짜/비율 성격(컬럼명 키워드)·고유값 수·결측 수와
+수치 컬럼의 min / max / mean / first / last(결측 제외)를 한 번에 계산한다.
+수치 통계는 컬럼 루프 없이 NumPy 2차원 배열 연산으로 처리.
+"""
+import warnings
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+DATE_KEYWORDS = ("date", "month", "year", "날짜", "월", "기간")
+# "rate"는 환율(fx_rate 등) 오탐 방지를 위해 제외, "pct"/"ratio"/"비율"만 사용
+PCT_KEYWORDS = ("pct", "ratio", "비율")
+
+
+def _trend(first: float, last: float) -> str:
+    return "상승" if last > first else "하락" if last < first else "보합"
+
+
+def profile_columns(df: pd.DataFrame) -> dict:
+    rows = len(df)
+    names = [str(c) for c in df.columns]
+    lowered = [n.lower() for n in names]
+    numeric = np.array([pd.api.types.is_numeric_dtype(dt) for dt in df.dtypes], dtype=bool)
+    nulls = df.isna().sum().to_numpy() if len(names) else np.zeros(0, dtype=int)
+    # 고유값 수: 수치 컬럼은 아래에서 정렬 배열로 일괄 계산 (해시 기반 nunique 보다 빠름)
+    unique = np.zeros(len(names), dtype=int)
+    for i in np.flatnonzero(~numeric):
+        unique[i] = df.iloc[:, i].nunique(dropna=True)
+
+    columns = [
+        {
+            "name": name,
+            "dtype": str(dtype),
+            "numeric": bool(is_num),
+            "date_like": any(k in low for k in DATE_KEYWORDS),
+            "pct_like": any(k in low for k in PCT_KEYWORDS),
+            "nulls": int(null),
+        }
+        for name, low, dtype, is_num, null in zip(names, lowered, df.dtypes, numeric, nulls)
+    ]
+
+    num_idx = np.flatnonzero(numeric)
+    if rows and len(num_idx):
+        values = df.iloc[:, num_idx].to_numpy(dtype=float, na_value=np.nan)
+        valid = ~np.isnan(values)
+        has_value = valid.any(axis=0)
+        ordered = np.sort(values, axis=0)      # NaN은 뒤로 정렬됨
+        changes = (ordered[1:] != ordered[:-1]) & ~np.isnan(ordered[1:])
+        unique[num_idx] = changes.sum(axis=0) + has_value
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)   # 전부 결측인 컬럼
+            mins = np.nanmin(values, axis=0)
+            maxs = np.nanmax(values, axis=0)
+            means = np.nanmean(values, axis=0)
+        first_pos = valid.argmax(axis=0)
+        last_pos = rows - 1 - valid[::-1].argmax(axis=0)
+        cols = np.arange(len(num_idx))
+        firsts = values[first_pos, cols]
+        lasts = values[last_pos, cols]
+        for j, i in enumerate(num_idx):
+            if not has_value[j]:
+                continue
+            columns[i]["stats"] = {
+                "min": float(mins[j]),
+                "max": float(maxs[j]),
+                "mean": float(means[j]),
+                "first": float(firsts[j]),
+                "last": float(lasts[j]),
+                "trend": _trend(firsts[j], lasts[j]),
+            }
+
+    for column, uniq in zip(columns, unique):
+        column["unique"] = int(uniq)
+    return {"rows": rows, "columns": columns}
+
+
+def chart_type(profile: dict) -> str:
+    columns = profile["columns"]
+    numeric_count = sum(c["numeric"] for c in columns)
+    if any(c["date_like"] for c in columns):
+        return "area" if numeric_count >= 2 else "line"
+    if any(c["pct_like"] for c in columns) and len(columns) <= 3 and 2 <= profile["rows"] <= 12:
+        return "pie"
+    return "bar"
+
+
+def numeric_stats(profile: dict, limit: int = 3) -> dict:
+    """앞쪽 수치 컬럼 limit개의 통계 {컬럼명: stats} (값이 전부 결측인 컬럼은 제외)"""
+    numeric = [c for c in profile["columns"] if c["numeric"]][:limit]
+    return {c["name"]: c["stats"] for c in numeric if "stats" in c}
+
+
+class ProfileCache:
+    """message_id → 프로파일 LRU (ask 응답 시 저장, /api/narrative 에서 재사용)"""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._items: OrderedDict[str, dict] = OrderedDict()
+
+    def put(self, message_id: str, profile: dict):
+        self._items[message_id] = profile
+        self._items.move_to_end(message_id)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+
+    def get(self, message_id: str) -> Optional[dict]:
+        profile = self._items.get(message_id)
+        if profile is not None:
+            self._items.move_to_end(message_id)
+        return profile
@@ -402,3 +402,7 @@ if __name__ == "__main__":
     col_cnt = cur.fetchone()[0]
     print(f"[완료] td_irpos 테이블 생성 — {col_cnt}개 컬럼, PK(std_date, org_code, con_sep_clcd, bo_item_code)")
     conn.close()
+
+    # 실행 중인 AI 서버의 결과 캐시 무효화
+    from data_version import bump_data_version
+    bump_data_version()
@@ -328,3 +328,7 @@ if __name__ == "__main__":
     )
     print(f"td_irriskcr {cur.fetchone()[0]} columns created")
     conn.close()
+
+    # 실행 중인 AI 서버의 결과 캐시 무효화
+    from data_version import bump_data_version
+    bump_data_version()
@@ -0,0 +1,22 @@
+"""
+data_version.py – 데이터 변경 마커 (AI 서버 결과 캐시 무효화용)
+
+migrate.py / create_td_*.py 실행 후 마커 파일을 갱신하면
+main.py의 결과 캐시가 다음 버전 확인 시점에 전체 무효화된다.
+"""
+import os
+import time
+
+DATA_VERSION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data_version")
+
+
+def bump_data_version():
+    with open(DATA_VERSION_FILE, "w", encoding="utf-8") as f:
+        f.write(str(time.time_ns()))
+
+
+def read_data_version() -> str:
+    if not os.path.exists(DATA_VERSION_FILE):
+        return ""
+    with open(DATA_VERSION_FILE, encoding="utf-8") as f:
+        return f.read().strip()
@@ -350,3 +350,7 @@ if __name__ == "__main__":
     conn = psycopg2.connect(DATABASE_URL)
     migrate(conn)
     conn.close()
+
+    # 실행 중인 AI 서버의 결과 캐시 무효화
+    from data_version import bump_data_version
+    bump_data_version()
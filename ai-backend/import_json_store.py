@@ -0,0 +1,24 @@
+"""
+import_json_store.py – 기존 JSON 파일 → 앱 저장소(SQLite) 1회 가져오기
+실행: python import_json_store.py [--dir <JSON 파일 위치>]
+
+feedback.json / chat_history.json / reports_user.json / dashboards.json / my_dashboard.json
+중 존재하는 파일만 가져오며, 대상 테이블은 파일 내용으로 교체된다.
+(저장소 파일이 새로 만들어지는 첫 서버 기동 시에는 main.py 가 자동으로 실행)
+"""
+import argparse
+import os
+
+from store import STORE_PATH, Store, import_json_files
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dir", default=os.path.dirname(os.path.abspath(__file__)))
+    args = parser.parse_args()
+
+    imported = import_json_files(Store(), args.dir)
+    print(f"=== {STORE_PATH} 가져오기 완료 ===")
+    for name, count in imported.items():
+        print(f"  {name}: {count}건")
+    if not imported:
+        print("  가져올 JSON 파일 없음")
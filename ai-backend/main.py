@@ -8,28 +8,35 @@ main.py – FastAPI AI 분석 서버
   3) 실패 시 Fallback LLM (Groq 또는 Ollama 범용)
   4) 최종 실패 시 503 에러 반환
 """
+import asyncio
+import functools
 import json
 import os
+import threading
+import time
 import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait as futures_wait
 from datetime import datetime
-from difflib import SequenceMatcher
 from typing import Optional
 
 import pandas as pd
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException, Header, Depends, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 
 load_dotenv()
 
 # Vanna / SQLCoder 초기화
-import requests as _requests
-
 from vanna_setup import (
     vn,
     get_fallback_vn,
+    fallback_configured,
     get_provider_vanna,
+    get_race_partner,
     available_providers,
     MODEL_NAME,
     LLM_PROVIDER,
@@ -40,7 +47,32 @@ from vanna_setup import (
     GROQ_MODEL_FB,
     OLLAMA_HOST,
     FALLBACK_OLLAMA_MODEL,
+    TRAINING_FILES_SOURCE,
+    fetch_data_version,
+    iter_sql,
+    QueryCancel,
+    SQLRejected,
+    embedding_cache_stats,
+    groq_client,
+    http_session,
+    http_pool_stats,
+    sql_error_stats,
+)
+from result_cache import ResultCache
+from result_format import (
+    ARROW_MEDIA_TYPE,
+    COLUMNS_MEDIA_TYPE,
+    EXPORT_MEDIA_TYPES,
+    arrow_ipc,
+    columns_json,
+    csv_chunks,
+    negotiate_format,
+    parquet_chunks,
+    records_json,
 )
+from column_profile import ProfileCache, chart_type, numeric_stats, profile_columns
+from sql_cache import SQLCache
+from store import Store, import_json_files
 
 app = FastAPI(title="InsightBi AI API", version="2.0.0")
 
@@ -55,9 +87,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# ── 피드백 파일 ──────────────────────────────────────────────────
-FEEDBACK_FILE = os.path.join(os.path.dirname(__file__), "feedback.json")
-
 # ── SQL 보안 가드레일 ─────────────────────────────────────────────
 FORBIDDEN_KEYWORDS = [
     "DELETE", "DROP", "UPDATE", "INSERT", "CREATE",
@@ -86,16 +115,10 @@ RELEVANCE_DISTANCE_THRESHOLD = float(os.getenv("RELEVANCE_THRESHOLD", "1.2"))
 def is_question_relevant(question: str) -> bool:
     """ChromaDB에서 질문과 학습 데이터 간 유사도를 확인해 관련성 판단"""
     try:
-        collection = vn.sql_collection
-        results = collection.query(
-            query_texts=[question],
-            n_results=1,
-            include=["distances"],
-        )
-        distances = results.get("distances", [[]])[0]
-        if not distances:
+        # few-shot 검색과 같은 1회 검색 결과를 공유 (generate_sql에서 재사용)
+        _, min_distance = vn.search_similar_sql(question)
+        if min_distance is None:
             return False
-        min_distance = min(distances)
         print(f"[relevance] distance={min_distance:.4f} threshold={RELEVANCE_DISTANCE_THRESHOLD}")
         return min_distance <= RELEVANCE_DISTANCE_THRESHOLD
     except Exception as e:
@@ -114,7 +137,11 @@ SUGGESTIONS = [
 ]
 
 # ── SQL 캐시 ──────────────────────────────────────────────────────
-_sql_cache: dict[str, str] = {}
+# Golden SQL은 pinned(제거 안 됨), LLM 생성 결과는 learned(LRU/TTL 제거 대상)
+_sql_cache = SQLCache(
+    max_learned=int(os.getenv("SQL_CACHE_MAX_LEARNED", "5000")),
+    ttl_seconds=float(os.getenv("SQL_CACHE_TTL_SECONDS", "0")),  # 0 = 만료 없음
+)
 CACHE_THRESHOLD = 0.92  # 거의 동일한 질문만 캐시 사용 (LLM SQL 생성 우선)
 
 
@@ -130,13 +157,74 @@ def _load_golden_sql():
     with open(path, encoding="utf-8") as f:
         pairs = json.load(f)
     for pair in pairs:
-        _sql_cache[pair["question"]] = pair["sql"]
+        _sql_cache.set(pair["question"], pair["sql"], pinned=True)
     print(f"[cache] Golden SQL {len(pairs)}개 로드 완료 ({os.path.basename(path)})")
 
 
 _load_golden_sql()
 
 
+# ── 결과 캐시 (정규화 SQL → DataFrame) ───────────────────────────
+# 데이터 버전(db/.data_version 마커, td_irncr/td_irpos/td_dmaqfx 최신 std_date)이
+# 바뀌면 전체 무효화 → 반복 질문은 DB 재조회 없이 응답
+_result_cache = ResultCache(
+    fetch_data_version,
+    max_entries=int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "256")),
+    max_rows=int(os.getenv("RESULT_CACHE_MAX_ROWS", "50000")),
+    check_interval=float(os.getenv("RESULT_CACHE_CHECK_SECONDS", "30")),
+)
+
+# ── 컬럼 프로파일 캐시 (message_id → 프로파일) ─────────────────────
+# /api/ask 응답 시 1회 계산한 프로파일을 /api/narrative 가 재사용 (데이터 재업로드 불필요)
+_profiles = ProfileCache(int(os.getenv("PROFILE_CACHE_SIZE", "512")))
+
+
+# ── 결과 행 수 제한 / 페이지 ──────────────────────────────────────
+# LLM이 LIMIT 없는 SELECT * 를 만들어도 DB에서 ASK_MAX_ROWS(+1)행까지만 가져온다.
+# 응답 1페이지는 기본적으로 제한 내 전체 행(ASK_PAGE_ROWS = ASK_MAX_ROWS). 페이지를 줄이면
+# 나머지는 /api/ask/{message_id}/rows 로 이어 받는다 (SQL 재생성 없이 저장된 SQL 재사용 — 대부분 결과 캐시 적중).
+# 클라이언트는 아직 next_cursor 를 따라가지 않으므로 ASK_PAGE_ROWS 를 줄이면 화면에 일부 행만 보인다.
+ASK_MAX_ROWS = int(os.getenv("ASK_MAX_ROWS", "10000"))
+ASK_PAGE_ROWS = int(os.getenv("ASK_PAGE_ROWS", str(ASK_MAX_ROWS)))
+ASK_RESULTS_KEPT = int(os.getenv("ASK_RESULTS_KEPT", "512"))
+
+_ask_results: "OrderedDict[str, str]" = OrderedDict()    # message_id → SQL
+
+
+def _limit_sql(sql: str) -> str:
+    """행 수 제한 래핑 (+1행으로 잘림 여부 판단). 줄바꿈은 SQL 끝의 -- 주석 대비"""
+    body = sql.strip().rstrip(";").strip()
+    return f"SELECT * FROM (\n{body}\n) AS _ask_rows LIMIT {ASK_MAX_ROWS + 1}"
+
+
+def _run_sql_cached(vanna, sql: str, cancel: Optional[QueryCancel] = None) -> pd.DataFrame:
+    df = _result_cache.get(sql)
+    if df is not None:
+        print(f"[result-cache HIT] sql={sql[:60]}")
+        return df
+    df = vanna.run_sql(_limit_sql(sql), cancel=cancel)
+    _result_cache.put(sql, df)
+    return df
+
+
+def _remember_ask(message_id: str, sql: str):
+    _ask_results[message_id] = sql
+    while len(_ask_results) > ASK_RESULTS_KEPT:
+        _ask_results.popitem(last=False)
+
+
+def _page(df: pd.DataFrame, offset: int, limit: int) -> tuple[pd.DataFrame, dict]:
+    """(페이지 DataFrame, 페이지 메타). 전체 행은 ASK_MAX_ROWS로 잘라 계산"""
+    row_count = min(len(df), ASK_MAX_ROWS)
+    end = min(offset + limit, row_count)
+    return df.iloc[offset:end], {
+        "row_count": row_count,
+        "truncated": len(df) > ASK_MAX_ROWS,
+        "offset": offset,
+        "next_cursor": str(end) if end < row_count else None,
+    }
+
+
 # ── 관리자 인증 ───────────────────────────────────────────────────
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "admin1234").strip()
 
@@ -191,17 +279,7 @@ class FeedbackDeleteRequest(BaseModel):
 # ── 유틸 함수 ─────────────────────────────────────────────────────
 
 def find_cached_sql(question: str) -> tuple[str | None, float]:
-    best_q: str | None = None
-    best_score = 0.0
-    q = question.strip()
-    for cached_q in _sql_cache:
-        score = SequenceMatcher(None, q, cached_q).ratio()
-        if score > best_score:
-            best_score = score
-            best_q = cached_q
-    if best_q and best_score >= CACHE_THRESHOLD:
-        return _sql_cache[best_q], best_score
-    return None, 0.0
+    return _sql_cache.lookup(question, CACHE_THRESHOLD)
 
 
 def validate_sql(sql: str) -> bool:
@@ -209,65 +287,248 @@ def validate_sql(sql: str) -> bool:
     return not any(kw in upper for kw in FORBIDDEN_KEYWORDS)
 
 
-def infer_chart_type(df: pd.DataFrame) -> str:
-    cols = [c.lower() for c in df.columns]
-    date_cols = [c for c in cols if any(k in c for k in ["date", "month", "year", "날짜", "월", "기간"])]
-    numeric_cols = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
-    # "rate"는 환율(fx_rate 등) 오탐 방지를 위해 제외, "pct"/"ratio"/"비율"만 파이 조건으로 사용
-    pct_cols = [c for c in cols if "pct" in c or "ratio" in c or "비율" in c]
+def infer_chart_type(df: pd.DataFrame, profile: Optional[dict] = None) -> str:
+    return chart_type(profile or profile_columns(df))
 
-    if date_cols:
-        return "area" if len(numeric_cols) >= 2 else "line"
-    if pct_cols and len(df.columns) <= 3 and 2 <= len(df) <= 12:
-        return "pie"
-    return "bar"
 
-
-def generate_summary(question: str, df: pd.DataFrame, sql: str) -> str:
+def generate_summary(question: str, df: pd.DataFrame, sql: str, truncated: bool = False) -> str:
     rows = len(df)
     cols = list(df.columns)
     if rows == 1:
         parts = [f"{col}: {df.iloc[0][col]}" for col in cols]
         return "현재 수치: " + ", ".join(parts)
+    if truncated:
+        return f"결과가 많아 상위 {rows}개 데이터만 조회했습니다. ({', '.join(cols[:3])} 등)"
     return f"총 {rows}개 데이터를 조회했습니다. ({', '.join(cols[:3])} 등)"
 
 
+# ── 블로킹 작업 실행기 ────────────────────────────────────────────
+# LLM 호출(requests/OpenAI/Anthropic/Gemini 동기 클라이언트)과 SQL 실행은 모두 동기 함수라
+# 이벤트 루프에서 직접 호출하면 다른 요청(/api/health 포함)이 전부 멈춘다.
+# → 용도별 스레드 풀에서 실행. DB 풀은 SQLAlchemy 연결 풀(pool_size 3 + overflow 2) 크기에 맞춤
+_llm_pool = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_WORKERS", "8")), thread_name_prefix="llm")
+_db_pool = ThreadPoolExecutor(max_workers=int(os.getenv("DB_WORKERS", "5")), thread_name_prefix="db")
+
+
+async def _in_pool(pool: ThreadPoolExecutor, fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(pool, functools.partial(fn, *args, **kwargs))
+
+
+async def _emit(emit, event: dict):
+    """스트리밍 요청일 때만 단계 이벤트 전달"""
+    if emit is not None:
+        await emit(event)
+
+
+async def _generate_sql(vanna, context: str, emit=None) -> str:
+    """SQL 생성. 스트리밍 요청이면 토큰을 sql_token 이벤트로 즉시 전달"""
+    if emit is None:
+        return await _in_pool(_llm_pool, vanna.generate_sql, context)
+
+    loop = asyncio.get_running_loop()
+    tokens: asyncio.Queue = asyncio.Queue()
+
+    def on_token(text: str):
+        loop.call_soon_threadsafe(tokens.put_nowait, text)
+
+    future = loop.run_in_executor(_llm_pool, vanna.generate_sql_stream, context, on_token)
+    future.add_done_callback(lambda _: tokens.put_nowait(None))
+    while (text := await tokens.get()) is not None:
+        await emit({"type": "sql_token", "text": text})
+    return await future
+
+
+# ── Race 모드 (opt-in) ────────────────────────────────────────────
+# off      : primary → fallback 순차 시도 (기본)
+# hedge    : primary 즉시 호출, RACE_HEDGE_DELAY_MS 안에 유효한 SQL이 없으면 두 번째 백엔드 추가 호출
+# parallel : 두 백엔드 동시 호출
+# 먼저 검증(validate_sql + is_relevant_sql)을 통과한 SQL을 채택하고 나머지는 취소
+RACE_MODE = os.getenv("RACE_MODE", "off").strip().lower()
+RACE_HEDGE_DELAY = float(os.getenv("RACE_HEDGE_DELAY_MS", "1500")) / 1000
+
+
+class _LatencyStats:
+    """키(모드)별 최근 window건 지연시간 → p50/p95/p99"""
+
+    def __init__(self, window: int = 500):
+        self._window = window
+        self._samples: dict[str, deque] = {}
+
+    def record(self, key: str, seconds: float):
+        self._samples.setdefault(key, deque(maxlen=self._window)).append(seconds)
+
+    def summary(self) -> dict:
+        result = {}
+        for key, samples in list(self._samples.items()):
+            ordered = sorted(samples)
+            if not ordered:
+                continue
+
+            def pct(p: float) -> int:
+                return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000)
+
+            result[key] = {"count": len(ordered), "p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99)}
+        return result
+
+
+_generation_latency = _LatencyStats()
+
+
+async def _generate_valid_sql(vanna, context: str) -> str:
+    sql = await _generate_sql(vanna, context)
+    if not sql or not sql.upper().strip().startswith("SELECT"):
+        raise ValueError(f"유효하지 않은 SQL 형식: {sql[:80]}")
+    if not validate_sql(sql):
+        raise HTTPException(
+            status_code=400,
+            detail="보안 위반 쿼리가 감지되었습니다. 데이터 조회 질문만 가능합니다."
+        )
+    if not is_relevant_sql(sql):
+        raise HTTPException(
+            status_code=400,
+            detail="학습된 데이터와 관련 없는 질문입니다. 등록된 테이블 데이터에 대해 질문해 주세요."
+        )
+    return sql
+
+
+async def _race_generate(context: str, racers: list) -> tuple[Optional[str], Optional[str], str]:
+    """
+    racers: [(이름, vanna), ...] 순서대로 투입. (sql, 승자 이름, 마지막 오류) 반환.
+    모든 후보가 보안/관련성 검증에서 거절되면 해당 HTTPException 전달.
+    """
+    waiting = list(racers)
+    running: dict[asyncio.Task, str] = {}
+
+    def launch():
+        name, vanna = waiting.pop(0)
+        running[asyncio.create_task(_generate_valid_sql(vanna, context))] = name
+
+    launch()
+    if RACE_MODE == "parallel":
+        while waiting:
+            launch()
+
+    last_error = ""
+    rejected: Optional[HTTPException] = None
+    try:
+        while running:
+            done, _ = await asyncio.wait(
+                running, timeout=RACE_HEDGE_DELAY if waiting else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                print(f"[race] {RACE_HEDGE_DELAY * 1000:.0f}ms 경과 → {waiting[0][0]} hedge 호출")
+                launch()
+                continue
+            for task in done:
+                name = running.pop(task)
+                try:
+                    sql = task.result()
+                    print(f"[race] {name} 채택  sql={sql[:60]}")
+                    return sql, name, ""
+                except HTTPException as e:
+                    rejected = rejected or e
+                    last_error = str(e.detail)
+                except Exception as e:
+                    last_error = str(e)
+                print(f"[race] {name} 실패: {last_error[:120]}")
+            if waiting:   # hedge 대기 중 실패 → 다음 후보 즉시 투입
+                launch()
+    finally:
+        # 스레드에서 실행 중인 LLM 호출 자체는 중단할 수 없으므로 결과만 버린다
+        for task in running:
+            task.cancel()
+
+    if rejected is not None:
+        raise rejected
+    return None, None, last_error
+
+
 # ── SQLCoder 이중 파이프라인 핵심 함수 ───────────────────────────
 
-async def ask_with_retry(question: str, provider: Optional[str] = None, max_attempts: int = 2):
+def _raise_if_final(e: Exception):
+    """시간 초과·취소는 SQL을 다시 생성해도 DB 연결만 더 붙잡음 → 재시도 없이 종료 (비용 초과는 재생성 대상)"""
+    if isinstance(e, SQLRejected) and e.reason != "cost":
+        raise HTTPException(status_code=499 if e.reason == "cancelled" else 504, detail=str(e))
+
+
+async def ask_with_retry(question: str, provider: Optional[str] = None, max_attempts: int = 2, emit=None,
+                         cancel: Optional[QueryCancel] = None):
     """
     [파이프라인]
     1) SQL 캐시 조회          → 히트 시 LLM 생략
     2) 지정 프로바이더 LLM    → groq | gemini | claude | 기본(vn)
     3) 실패 시 Fallback LLM  → 프로바이더 미지정 시에만 적용
     4) 모두 실패              → 503 에러
+
+    emit: /api/ask/stream 에서 전달하는 단계 이벤트 콜백 (cache → sql_token → sql)
+    cancel: 클라이언트 연결 종료 시 실행 중인 DB 쿼리를 중단하는 핸들
     """
     # 프로바이더 인스턴스 결정
-    primary_vn = get_provider_vanna(provider) if provider else vn
+    # 백엔드는 첫 사용 시 생성(SDK import·Chroma 연결)되므로 이벤트 루프가 아닌 _llm_pool 에서 조회
+    primary_vn = await _in_pool(_llm_pool, get_provider_vanna, provider) if provider else vn
 
     # ── Step 0: 관련성 사전 검사 ─────────────────────────────
     # Chroma distance 선필터가 정상적인 한국어 질문도 과하게 차단하고 있어
     # 여기서는 텔레메트리만 남기고, 실제 안전성은 아래 SQL 검증으로 처리한다.
-    if not is_question_relevant(question):
+    if not await _in_pool(_llm_pool, is_question_relevant, question):
         print(f"[relevance] soft-fail bypassed for question: {question[:80]}")
 
     # ── Step 1: 캐시 조회 ─────────────────────────────────────
     cached_sql, score = find_cached_sql(question)
+    await _emit(emit, {"type": "cache", "hit": cached_sql is not None, "score": round(score, 4)})
     if cached_sql:
         print(f"[cache HIT] score={score:.2f}  provider={provider or 'default'}  sql={cached_sql[:60]}")
         try:
-            df = primary_vn.run_sql(cached_sql)
+            await _emit(emit, {"type": "sql", "sql": cached_sql, "backend": "cache"})
+            df = await _in_pool(_db_pool, _run_sql_cached, primary_vn, cached_sql, cancel)
             return cached_sql, df, True, "cache"
         except Exception as e:
+            _raise_if_final(e)
             print(f"[cache] 캐시 SQL 실행 실패, LLM으로 폴백: {e}")
 
-    # ── Step 2: 지정 프로바이더 LLM ──────────────────────────
     last_error: str = ""
     context = question
+    default_backend = provider or (f"sqlcoder-{SQLCODER_MODE}" if LLM_PROVIDER == "sqlcoder" else LLM_PROVIDER)
+
+    # sql_generation_latency: LLM 생성 구간만 누적 (실패한 시도 포함, DB 실행 시간 제외)
+    generation_seconds = 0.0
+
+    async def timed_generation(coro):
+        nonlocal generation_seconds
+        generation_started = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            generation_seconds += time.perf_counter() - generation_started
+
+    # ── Step 1.5: Race 모드 (프로바이더 미지정 시에만) ────────
+    partner = (await _in_pool(_llm_pool, get_race_partner)
+               if RACE_MODE in ("hedge", "parallel") and not provider else None)
+    if partner is not None:
+        sql, winner, last_error = await timed_generation(
+            _race_generate(question, [("primary", primary_vn), partner]))
+        if sql:
+            winner_vn = primary_vn if winner == "primary" else partner[1]
+            backend = default_backend if winner == "primary" else winner
+            try:
+                await _emit(emit, {"type": "sql", "sql": sql, "backend": backend})
+                df = await _in_pool(_db_pool, _run_sql_cached, winner_vn, sql, cancel)
+                _sql_cache[question.strip()] = sql
+                _generation_latency.record(RACE_MODE, generation_seconds)
+                return sql, df, False, backend
+            except Exception as e:
+                _raise_if_final(e)
+                last_error = str(e)
+        print(f"[race] 유효한 SQL 없음 → 순차 재시도: {last_error[:120]}")
+        context = f"{question}\n[이전 시도 오류, 다시 시도: {last_error[:80]}]"
+
+    # ── Step 2: 지정 프로바이더 LLM ──────────────────────────
 
     for attempt in range(max_attempts):
         try:
-            sql = primary_vn.generate_sql(context)
+            sql = await timed_generation(_generate_sql(primary_vn, context, emit))
             if not sql or not sql.upper().strip().startswith("SELECT"):
                 raise ValueError(f"유효하지 않은 SQL 형식: {sql[:80]}")
             if not validate_sql(sql):
@@ -280,26 +541,30 @@ async def ask_with_retry(question: str, provider: Optional[str] = None, max_atte
                     status_code=400,
                     detail="학습된 데이터와 관련 없는 질문입니다. 등록된 테이블 데이터에 대해 질문해 주세요."
                 )
-            df = primary_vn.run_sql(sql)
+            backend = default_backend
+            await _emit(emit, {"type": "sql", "sql": sql, "backend": backend})
+            df = await _in_pool(_db_pool, _run_sql_cached, primary_vn, sql, cancel)
             _sql_cache[question.strip()] = sql
-            backend = provider or (f"sqlcoder-{SQLCODER_MODE}" if LLM_PROVIDER == "sqlcoder" else LLM_PROVIDER)
+            _generation_latency.record(RACE_MODE if partner else "off", generation_seconds)
             print(f"[{backend}] 성공 (attempt={attempt+1})  sql={sql[:60]}")
             return sql, df, False, backend
         except HTTPException:
             raise
         except Exception as e:
+            _raise_if_final(e)
             last_error = str(e)
             print(f"[{provider or 'primary'}] attempt={attempt+1} 실패: {last_error[:120]}")
+            await _emit(emit, {"type": "retry", "backend": provider or "primary", "attempt": attempt + 1, "error": last_error[:200]})
             context = f"{question}\n[이전 시도 오류, 다시 시도: {last_error[:80]}]"
 
     # ── Step 3: Fallback LLM (프로바이더 미지정 시에만) ───────
     if not provider:
-        fallback_vn = get_fallback_vn()
+        fallback_vn = await _in_pool(_llm_pool, get_fallback_vn)
         if fallback_vn is not None:
             print("[fallback] Primary 실패 → Fallback LLM 시도")
             for attempt in range(2):
                 try:
-                    sql = fallback_vn.generate_sql(context)
+                    sql = await timed_generation(_generate_sql(fallback_vn, context, emit))
                     if not sql or not sql.upper().strip().startswith("SELECT"):
                         raise ValueError(f"Fallback SQL 형식 오류: {sql[:80]}")
                     if not validate_sql(sql):
@@ -312,15 +577,19 @@ async def ask_with_retry(question: str, provider: Optional[str] = None, max_atte
                             status_code=400,
                             detail="학습된 데이터와 관련 없는 질문입니다. 등록된 테이블 데이터에 대해 질문해 주세요."
                         )
-                    df = fallback_vn.run_sql(sql)
+                    await _emit(emit, {"type": "sql", "sql": sql, "backend": "fallback"})
+                    df = await _in_pool(_db_pool, _run_sql_cached, fallback_vn, sql, cancel)
                     _sql_cache[question.strip()] = sql
+                    _generation_latency.record(RACE_MODE if partner else "off", generation_seconds)
                     print(f"[fallback] 성공 (attempt={attempt+1})  sql={sql[:60]}")
                     return sql, df, False, "fallback"
                 except HTTPException:
                     raise
                 except Exception as e:
+                    _raise_if_final(e)
                     last_error = str(e)
                     print(f"[fallback] attempt={attempt+1} 실패: {last_error[:120]}")
+                    await _emit(emit, {"type": "retry", "backend": "fallback", "attempt": attempt + 1, "error": last_error[:200]})
 
     raise HTTPException(
         status_code=503,
@@ -328,125 +597,208 @@ async def ask_with_retry(question: str, provider: Optional[str] = None, max_atte
     )
 
 
-# ── 이벤트 핸들러 ─────────────────────────────────────────────────
+# ── 동일 질문 동시 요청 병합 (single-flight) ─────────────────────
+# 대시보드 새로고침 등으로 같은 질문이 동시에 들어오면 LLM·SQL 실행을 1회만 수행하고
+# 결과를 공유. 작업은 Task로 분리해 먼저 온 클라이언트가 끊겨도 나머지는 결과를 받는다.
+# 기다리던 클라이언트가 모두 끊기면 작업과 실행 중인 DB 쿼리를 취소해 연결을 돌려준다.
+_inflight: dict[tuple[str, str], asyncio.Task] = {}
+_flight_state: dict[asyncio.Task, dict] = {}      # task → {"cancel": QueryCancel, "waiters": n}
+_single_flight_stats = {"executed": 0, "coalesced": 0, "cancelled": 0}
 
-@app.on_event("startup")
-async def _startup():
-    """DB가 없으면 자동 마이그레이션"""
-    import sys
-    import subprocess
+DISCONNECT_POLL_SECONDS = float(os.getenv("DISCONNECT_POLL_SECONDS", "0.5"))
 
-    needs_migration = False
 
-    if DATABASE_URL:
-        # PostgreSQL: npl_trend 테이블 존재 여부로 판단
-        try:
-            import psycopg2
-            conn = psycopg2.connect(DATABASE_URL)
-            cur = conn.cursor()
-            cur.execute(
-                "SELECT COUNT(*) FROM information_schema.tables "
-                "WHERE table_schema='public' AND table_name='npl_trend'"
-            )
-            needs_migration = cur.fetchone()[0] == 0
-            conn.close()
-        except Exception as e:
-            print(f"[startup] PostgreSQL 연결 실패: {e}")
+async def _wait_disconnect(request: Request):
+    while not await request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+
+
+def _flight_done(key: tuple[str, str], task: asyncio.Task):
+    _flight_state.pop(task, None)
+    if _inflight.get(key) is task:
+        _inflight.pop(key, None)
+
+
+async def ask_single_flight(question: str, provider: Optional[str] = None, request: Optional[Request] = None):
+    key = (" ".join(question.split()), provider or "")
+    task = _inflight.get(key)
+    if task is None:
+        cancel = QueryCancel()
+        task = asyncio.create_task(ask_with_retry(question, provider=provider, cancel=cancel))
+        _inflight[key] = task
+        _flight_state[task] = {"cancel": cancel, "waiters": 0}
+        task.add_done_callback(functools.partial(_flight_done, key))
+        _single_flight_stats["executed"] += 1
     else:
-        # SQLite: 파일 존재 여부로 판단
-        needs_migration = not os.path.exists(VANNA_DB_PATH)
-
-    if needs_migration:
-        print("[startup] DB not found — running migration...")
-        result = subprocess.run(
-            [sys.executable, os.path.join(os.path.dirname(__file__), "db", "migrate.py")],
-            capture_output=True, text=True,
+        _single_flight_stats["coalesced"] += 1
+        print(f"[single-flight] 진행 중인 동일 질문에 합류: {question[:60]}")
+    if request is None:
+        return await asyncio.shield(task)
+
+    state = _flight_state.get(task)
+    if state is not None:
+        state["waiters"] += 1
+    watcher = asyncio.create_task(_wait_disconnect(request))
+    try:
+        # asyncio.wait 는 대기 중 취소돼도 task 를 취소하지 않음 (shield 와 동일)
+        done, _ = await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if state is not None:
+            state["waiters"] -= 1
+    if task in done:
+        return task.result()
+
+    if state is not None and state["waiters"] == 0 and not task.done():
+        print(f"[single-flight] 대기 클라이언트 없음 → 작업·쿼리 취소: {question[:60]}")
+        state["cancel"].cancel()
+        task.cancel()
+        _single_flight_stats["cancelled"] += 1
+    raise HTTPException(status_code=499, detail="클라이언트 연결이 종료되었습니다.")
+
+
+# ── 시작 부트스트랩 (백그라운드) ─────────────────────────────────
+# 마이그레이션·ChromaDB 학습을 startup 훅에서 동기로 돌리면 임베딩이 끝날 때까지
+# 아무 요청도 받을 수 없다. 별도 스레드에서 진행하고 상태를 /api/health 로 노출,
+# 학습이 끝나기 전 /api/ask 는 503 + Retry-After 로 응답한다.
+#   pending → migrating → training → ready   (예외 시 failed)
+
+BOOTSTRAP_RETRY_AFTER = int(os.getenv("BOOTSTRAP_RETRY_AFTER", "15"))
+
+_bootstrap = {
+    "state": "pending",
+    "detail": None,
+    "started_at": None,
+    "finished_at": None,
+    "error": None,
+}
+
+
+def _set_bootstrap_state(state: str, detail: Optional[str] = None):
+    _bootstrap["state"] = state
+    _bootstrap["detail"] = detail
+    print(f"[startup] 부트스트랩 {state}" + (f" — {detail}" if detail else ""))
+
+
+def _require_ready():
+    """학습 완료 전에는 SQL 생성 요청 거절 (failed는 기존처럼 가용 데이터로 계속 서비스)"""
+    if _bootstrap["state"] not in ("ready", "failed"):
+        raise HTTPException(
+            status_code=503,
+            detail=f"서버 준비 중입니다 ({_bootstrap['state']}). 잠시 후 다시 시도해주세요.",
+            headers={"Retry-After": str(BOOTSTRAP_RETRY_AFTER)},
         )
-        print("[startup] Migration complete" if result.returncode == 0
-              else f"[startup] Migration failed:\n{result.stderr}")
 
-    # ChromaDB가 비어있으면 자동 학습
+
+def _run_bootstrap():
+    """DB가 없으면 자동 마이그레이션, ChromaDB가 비어 있으면 자동 학습"""
+    import sys
+    import subprocess
+
+    _bootstrap["started_at"] = time.time()
     try:
-        df = vn.get_training_data()
-        chroma_empty = df is None or len(df) == 0
-    except Exception:
-        chroma_empty = True
-
-    if chroma_empty:
-        print("[startup] ChromaDB 비어있음 — 자동 학습 시작...")
-        for script in ["train.py", "train_ncr.py"]:
-            script_path = os.path.join(os.path.dirname(__file__), script)
-            if not os.path.exists(script_path):
-                continue
+        _set_bootstrap_state("migrating")
+        needs_migration = False
+
+        if DATABASE_URL:
+            # PostgreSQL: npl_trend 테이블 존재 여부로 판단
+            try:
+                import psycopg2
+                conn = psycopg2.connect(DATABASE_URL)
+                cur = conn.cursor()
+                cur.execute(
+                    "SELECT COUNT(*) FROM information_schema.tables "
+                    "WHERE table_schema='public' AND table_name='npl_trend'"
+                )
+                needs_migration = cur.fetchone()[0] == 0
+                conn.close()
+            except Exception as e:
+                print(f"[startup] PostgreSQL 연결 실패: {e}")
+        else:
+            # SQLite: 파일 존재 여부로 판단
+            needs_migration = not os.path.exists(VANNA_DB_PATH)
+
+        if needs_migration:
+            print("[startup] DB not found — running migration...")
             result = subprocess.run(
-                [sys.executable, script_path],
+                [sys.executable, os.path.join(os.path.dirname(__file__), "db", "migrate.py")],
                 capture_output=True, text=True,
             )
-            if result.returncode == 0:
-                print(f"[startup] {script} 학습 완료")
-            else:
-                print(f"[startup] {script} 학습 실패:\n{result.stderr[:500]}")
-    else:
-        print(f"[startup] ChromaDB 학습 데이터 {len(df)}개 확인됨 (학습 스킵)")
+            print("[startup] Migration complete" if result.returncode == 0
+                  else f"[startup] Migration failed:\n{result.stderr}")
 
-    # ChromaDB에서 구형 NCR 테이블(ncr_summary, ncr_trend, risk_composition) 학습 데이터 자동 정리
-    _OBSOLETE_TABLES = ["ncr_summary", "ncr_trend", "risk_composition"]
-    try:
-        df = vn.get_training_data()
-        if df is not None and len(df) > 0:
-            pattern = "|".join(_OBSOLETE_TABLES)
-            old = df[df["content"].str.contains(pattern, case=False, na=False)]
-            if len(old) > 0:
-                for id_ in old["id"].tolist():
-                    try:
-                        vn.remove_training_data(id=id_)
-                    except Exception:
-                        pass
-                print(f"[startup] ChromaDB 구형 NCR 항목 {len(old)}개 제거 완료")
+        _set_bootstrap_state("training")
+        # ChromaDB가 비어있으면 자동 학습
+        try:
+            df = vn.get_training_data()
+            chroma_empty = df is None or len(df) == 0
+        except Exception:
+            chroma_empty = True
+
+        if chroma_empty:
+            print("[startup] ChromaDB 비어있음 — 자동 학습 시작...")
+            for script in ["train.py", "train_ncr.py"]:
+                script_path = os.path.join(os.path.dirname(__file__), script)
+                if not os.path.exists(script_path):
+                    continue
+                _set_bootstrap_state("training", script)
+                result = subprocess.run(
+                    [sys.executable, script_path],
+                    capture_output=True, text=True,
+                )
+                if result.returncode == 0:
+                    print(f"[startup] {script} 학습 완료")
+                else:
+                    print(f"[startup] {script} 학습 실패:\n{result.stderr[:500]}")
+        else:
+            print(f"[startup] ChromaDB 학습 데이터 {len(df)}개 확인됨 (학습 스킵)")
+
+        # ChromaDB에서 구형 NCR 테이블(ncr_summary, ncr_trend, risk_composition) 학습 데이터 자동 정리
+        _OBSOLETE_TABLES = ["ncr_summary", "ncr_trend", "risk_composition"]
+        try:
+            obsolete = vn.find_training_ids(_OBSOLETE_TABLES)
+            if obsolete:
+                deleted = vn.delete_training(ids=obsolete)
+                print(f"[startup] ChromaDB 구형 NCR 항목 {deleted}개 제거 완료")
             else:
                 print("[startup] ChromaDB 구형 NCR 항목 없음 (정리 불필요)")
-    except Exception as e:
-        print(f"[startup] ChromaDB 정리 실패(무시): {e}")
-
-
-# ── 대시보드 I/O ──────────────────────────────────────────────────
-
-CHAT_HISTORY_FILE = os.path.join(os.path.dirname(__file__), "chat_history.json")
-REPORTS_FILE = os.path.join(os.path.dirname(__file__), "reports_user.json")
-DASHBOARDS_FILE = os.path.join(os.path.dirname(__file__), "dashboards.json")
-MY_DASHBOARD_FILE = os.path.join(os.path.dirname(__file__), "my_dashboard.json")
-
+        except Exception as e:
+            print(f"[startup] ChromaDB 정리 실패(무시): {e}")
 
-def _read_dashboards() -> list:
-    if not os.path.exists(DASHBOARDS_FILE):
-        return []
-    with open(DASHBOARDS_FILE, encoding="utf-8") as f:
+        # 요청 경로에서 쓰일 보조 백엔드를 준비 완료 전에 미리 생성 (첫 요청이 생성 비용을 떠안지 않도록)
         try:
-            return json.load(f)
-        except json.JSONDecodeError:
-            return []
-
+            if fallback_configured():
+                get_fallback_vn()
+            if RACE_MODE in ("hedge", "parallel"):
+                get_race_partner()
+        except Exception as e:
+            print(f"[startup] 보조 백엔드 준비 실패(무시): {e}")
 
-def _write_dashboards(records: list):
-    with open(DASHBOARDS_FILE, "w", encoding="utf-8") as f:
-        json.dump(records, f, ensure_ascii=False, indent=2)
+        _set_bootstrap_state("ready")
+    except Exception as e:
+        _bootstrap["error"] = str(e)
+        _set_bootstrap_state("failed", str(e))
+    finally:
+        _bootstrap["finished_at"] = time.time()
 
 
-# ── 피드백 I/O ────────────────────────────────────────────────────
+# ── 이벤트 핸들러 ─────────────────────────────────────────────────
 
-def _read_feedback() -> list:
-    if not os.path.exists(FEEDBACK_FILE):
-        return []
-    with open(FEEDBACK_FILE, encoding="utf-8") as f:
-        try:
-            return json.load(f)
-        except json.JSONDecodeError:
-            return []
+@app.on_event("startup")
+async def _startup():
+    """부트스트랩을 백그라운드 스레드로 시작하고 즉시 반환 (브리핑·대시보드는 바로 서비스)"""
+    threading.Thread(target=_run_bootstrap, name="bootstrap", daemon=True).start()
 
 
-def _write_feedback(records: list):
-    with open(FEEDBACK_FILE, "w", encoding="utf-8") as f:
-        json.dump(records, f, ensure_ascii=False, indent=2)
+# ── 앱 저장소 ─────────────────────────────────────────────────────
+# 피드백·채팅 히스토리·보고서·대시보드 (SQLite WAL, 최초 생성 시 기존 JSON 파일 가져오기)
+# 저장소 호출은 동기 SQLite I/O → 엔드포인트는 def(스레드풀 실행)로 두거나,
+# 요청 본문을 await 해야 하는 경우 run_in_threadpool 로 감싸 이벤트 루프를 막지 않는다.
+_store = Store()
+if _store.created:
+    _imported = import_json_files(_store, os.path.dirname(__file__))
+    if _imported:
+        print(f"[store] 기존 JSON 파일 가져오기: {_imported}")
 
 
 # ════════════════════════════════════════════════════════════════
@@ -455,13 +807,21 @@ def _write_feedback(records: list):
 
 @app.get("/api/health")
 async def health():
+    bootstrap = _bootstrap["state"]
     return {
         "status": "ok",
+        "ready": bootstrap in ("ready", "failed"),
+        "bootstrap": dict(_bootstrap),
         "provider": LLM_PROVIDER,
         "sqlcoder_mode": SQLCODER_MODE if LLM_PROVIDER == "sqlcoder" else None,
         "model": MODEL_NAME,
-        "fallback_enabled": get_fallback_vn() is not None,
+        "fallback_enabled": fallback_configured(),
         "cache_size": len(_sql_cache),
+        "cache": _sql_cache.stats(),
+        "result_cache": _result_cache.stats(),
+        "http_pool": http_pool_stats(),
+        "embedding_cache": embedding_cache_stats(),
+        "sql_errors": sql_error_stats(),
     }
 
 
@@ -475,6 +835,7 @@ async def cache_reload():
     before = len(_sql_cache)
     _sql_cache.clear()
     _load_golden_sql()
+    _result_cache.invalidate()
     return {"before": before, "after": len(_sql_cache)}
 
 
@@ -484,53 +845,205 @@ async def get_providers():
     return {"providers": available_providers()}
 
 
-@app.post("/api/ask")
-async def ask(req: AskRequest):
-    if not req.question.strip():
-        raise HTTPException(status_code=400, detail="질문을 입력해주세요.")
-
-    sql, df, from_cache, backend = await ask_with_retry(req.question, provider=req.provider)
-
-    data = json.loads(df.to_json(orient="records", force_ascii=False))
-    chart_type = infer_chart_type(df)
-    summary = generate_summary(req.question, df, sql)
+def _ask_meta(question: str, provider: Optional[str], sql: str, df: pd.DataFrame,
+              from_cache: bool, backend: str) -> dict:
+    """/api/ask 응답 중 data를 제외한 부분 (data는 result_format 인코더가 직접 이어 붙임)"""
+    truncated = len(df) > ASK_MAX_ROWS
+    df = df.iloc[:ASK_MAX_ROWS]
+    profile = profile_columns(df)
+    summary = generate_summary(question, df, sql, truncated)
     message_id = str(uuid.uuid4())
+    _profiles.put(message_id, profile)
+    _remember_ask(message_id, sql)
 
     return {
         "message_id": message_id,
         "sql": sql,
-        "data": data,
-        "chart_type": chart_type,
+        "chart_type": infer_chart_type(df, profile),
         "summary": summary,
         "from_cache": from_cache,
         "backend": backend,
-        "provider": req.provider or "default",
+        "provider": provider or "default",
     }
 
 
-def _read_user_reports() -> list:
-    if not os.path.exists(REPORTS_FILE):
-        return []
-    with open(REPORTS_FILE, encoding="utf-8") as f:
+@app.post("/api/ask")
+async def ask(req: AskRequest, request: Request, format: Optional[str] = None,
+              accept: Optional[str] = Header(None)):
+    """
+    응답 형식: ?format=records|columns|arrow 또는 Accept 헤더
+    (application/vnd.insightbi.columns+json, application/vnd.apache.arrow.stream). 기본 records
+    """
+    if not req.question.strip():
+        raise HTTPException(status_code=400, detail="질문을 입력해주세요.")
+    try:
+        fmt = negotiate_format(format, accept)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    _require_ready()
+
+    sql, df, from_cache, backend = await ask_single_flight(req.question, provider=req.provider, request=request)
+    meta = _ask_meta(req.question, req.provider, sql, df, from_cache, backend)
+    page, info = _page(df, 0, ASK_PAGE_ROWS)
+    return _encode_result(fmt, {**meta, **info}, page)
+
+
+def _encode_result(fmt: str, meta: dict, df: pd.DataFrame) -> Response:
+    if fmt == "columns":
+        return Response(columns_json(meta, df), media_type=COLUMNS_MEDIA_TYPE)
+    if fmt == "arrow":
         try:
-            return json.load(f)
-        except Exception:
-            return []
+            return Response(arrow_ipc(meta, df), media_type=ARROW_MEDIA_TYPE)
+        except ImportError:
+            raise HTTPException(status_code=406, detail="Arrow 형식은 pyarrow 설치 시에만 지원됩니다.")
+    return Response(records_json(meta, df), media_type="application/json")
+
+
+@app.get("/api/ask/{message_id}/rows")
+async def ask_rows(message_id: str, cursor: Optional[str] = None, limit: int = ASK_PAGE_ROWS,
+                   format: Optional[str] = None, accept: Optional[str] = Header(None)):
+    """
+    /api/ask 결과의 다음 페이지. cursor는 이전 응답의 next_cursor (없으면 처음부터).
+    SQL은 다시 생성하지 않고 ask 시점의 SQL을 재실행 (대부분 결과 캐시 적중)
+    """
+    sql = _ask_results.get(message_id)
+    if sql is None:
+        raise HTTPException(status_code=404, detail="결과가 만료되었습니다. 질문을 다시 실행해주세요.")
+    try:
+        fmt = negotiate_format(format, accept)
+        offset = int(cursor or 0)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="cursor가 올바르지 않습니다.")
+    limit = max(1, min(limit, ASK_PAGE_ROWS))
+    _require_ready()
+
+    df = await _in_pool(_db_pool, _run_sql_cached, vn, sql)
+    page, info = _page(df, offset, limit)
+    return _encode_result(fmt, {"message_id": message_id, **info}, page)
+
+
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "50000"))
+
+
+def _close_export(pending, *generators):
+    """진행 중인 조각 읽기가 끝난 뒤 제너레이터를 닫아 DB 연결·서버 측 커서 반납"""
+    if pending is not None:
+        futures_wait([pending])
+    for gen in generators:
+        gen.close()
+
+
+async def _iterate_export(parts, rows, cancel: QueryCancel):
+    """
+    인코딩 제너레이터(parts)를 DB 풀 스레드에서 한 조각씩 순회.
+    클라이언트 연결이 끊기면 Starlette가 응답 태스크를 취소 → finally 에서 읽던 쿼리를 취소하고
+    제너레이터를 닫는다 (취소 중에는 더 await 할 수 없으므로 정리는 DB 풀에 맡김)
+    """
+    pending = None
+    try:
+        while True:
+            pending = _db_pool.submit(next, parts, None)
+            part = await asyncio.wrap_future(pending)
+            pending = None
+            if part is None:
+                return
+            yield part
+    finally:
+        if pending is not None:
+            cancel.cancel()
+        _db_pool.submit(_close_export, pending, parts, rows)
+
+
+@app.get("/api/ask/{message_id}/export")
+async def ask_export(message_id: str, format: str = "csv"):
+    """
+    /api/ask 결과 전체 내보내기 (ASK_MAX_ROWS 제한 없음). format=csv|parquet
+    ask 시점의 SQL을 서버 측 커서로 재실행해 EXPORT_CHUNK_ROWS행씩 인코딩하며 스트리밍
+    """
+    sql = _ask_results.get(message_id)
+    if sql is None:
+        raise HTTPException(status_code=404, detail="결과가 만료되었습니다. 질문을 다시 실행해주세요.")
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"format은 {', '.join(EXPORT_MEDIA_TYPES)} 중 하나여야 합니다.")
+    if format == "parquet":
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=406, detail="Parquet 형식은 pyarrow 설치 시에만 지원됩니다.")
+    _require_ready()
+
+    encode = csv_chunks if format == "csv" else parquet_chunks
+    filename = f"insightbi_{message_id[:8]}.{format}"
+    cancel = QueryCancel()
+    rows = iter_sql(sql, EXPORT_CHUNK_ROWS, cancel)
+    return StreamingResponse(
+        _iterate_export(encode(rows), rows, cancel),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+STREAM_PREVIEW_ROWS = int(os.getenv("STREAM_PREVIEW_ROWS", "20"))
+
+
+@app.post("/api/ask/stream")
+async def ask_stream(req: AskRequest):
+    """
+    /api/ask 스트리밍 버전 (NDJSON, 한 줄에 이벤트 1개)
+      accepted → cache → sql_token* → sql → rows(미리보기) → result
+      실패 시 error 이벤트 (status, detail) 후 종료
+    """
+    if not req.question.strip():
+        raise HTTPException(status_code=400, detail="질문을 입력해주세요.")
+    _require_ready()
+
+    events: asyncio.Queue = asyncio.Queue()
+    cancel = QueryCancel()
+
+    async def run():
+        try:
+            await events.put({"type": "accepted"})
+            sql, df, from_cache, backend = await ask_with_retry(
+                req.question, provider=req.provider, emit=events.put, cancel=cancel,
+            )
+            preview = json.loads(df.head(STREAM_PREVIEW_ROWS).to_json(orient="records", force_ascii=False))
+            await events.put({"type": "rows", "columns": list(map(str, df.columns)), "total": len(df), "data": preview})
+            meta = _ask_meta(req.question, req.provider, sql, df, from_cache, backend)
+            page, info = _page(df, 0, ASK_PAGE_ROWS)
+            await events.put(records_json({"type": "result", **meta, **info}, page).decode("utf-8"))
+        except HTTPException as e:
+            await events.put({"type": "error", "status": e.status_code, "detail": e.detail})
+        except Exception as e:
+            await events.put({"type": "error", "status": 500, "detail": str(e)})
+        finally:
+            await events.put(None)
 
+    async def body():
+        task = asyncio.create_task(run())
+        try:
+            while (event := await events.get()) is not None:
+                # result 이벤트는 이미 직렬화된 문자열 (data 재파싱 방지)
+                line = event if isinstance(event, str) else json.dumps(event, ensure_ascii=False, default=str)
+                yield line + "\n"
+        finally:
+            # 클라이언트 연결 종료 → 실행 중인 DB 쿼리까지 중단
+            if not task.done():
+                cancel.cancel()
+                task.cancel()
 
-def _write_user_reports(records: list):
-    with open(REPORTS_FILE, "w", encoding="utf-8") as f:
-        json.dump(records, f, ensure_ascii=False, indent=2)
+    return StreamingResponse(body(), media_type="application/x-ndjson")
 
 
 @app.get("/api/reports")
-async def get_reports():
-    return {"reports": _read_user_reports()}
+def get_reports():
+    return {"reports": _store.list_reports()}
 
 
 @app.get("/api/reports/{report_id}")
-async def get_report(report_id: str):
-    report = next((r for r in _read_user_reports() if r.get("id") == report_id), None)
+def get_report(report_id: str):
+    report = _store.get_report(report_id)
     if not report:
         raise HTTPException(status_code=404, detail="보고서를 찾을 수 없습니다.")
     return {"report": report}
@@ -539,118 +1052,111 @@ async def get_report(report_id: str):
 @app.post("/api/reports")
 async def save_report(req: Request):
     body = await req.json()
-    rid = body.get("id", "")
-    records = _read_user_reports()
-    idx = next((i for i, r in enumerate(records) if r.get("id") == rid), -1)
-    if idx >= 0:
-        records[idx] = body
-    else:
-        records.insert(0, body)
-    _write_user_reports(records)
+    await run_in_threadpool(_store.save_report, body)
     return {"ok": True}
 
 
 @app.patch("/api/reports/{report_id}/status")
 async def update_report_status(report_id: str, req: Request):
     body = await req.json()
-    new_status = body.get("status")
-    records = _read_user_reports()
-    for r in records:
-        if r.get("id") == report_id:
-            r["status"] = new_status
-            break
-    _write_user_reports(records)
+    await run_in_threadpool(_store.update_report_status, report_id, body.get("status"))
     return {"ok": True}
 
 
 @app.delete("/api/reports/{report_id}")
-async def delete_report(report_id: str):
-    records = [r for r in _read_user_reports() if r.get("id") != report_id]
-    _write_user_reports(records)
+def delete_report(report_id: str):
+    _store.delete_report(report_id)
     return {"ok": True}
 
 
 @app.get("/api/chat-history")
-async def get_chat_history():
-    if not os.path.exists(CHAT_HISTORY_FILE):
-        return {"messages": []}
-    with open(CHAT_HISTORY_FILE, encoding="utf-8") as f:
-        try:
-            return {"messages": json.load(f)}
-        except Exception:
-            return {"messages": []}
+def get_chat_history():
+    return {"messages": _store.list_chat_messages()}
 
 
 @app.post("/api/chat-history")
 async def save_chat_history(req: Request):
     body = await req.json()
-    messages = body.get("messages", [])
-    with open(CHAT_HISTORY_FILE, "w", encoding="utf-8") as f:
-        json.dump(messages, f, ensure_ascii=False, indent=2)
+    await run_in_threadpool(_store.replace_chat_messages, body.get("messages", []))
     return {"ok": True}
 
 
+CHAT_PAGE_MAX = 200
+
+
+@app.get("/api/chat-history/messages")
+def get_chat_messages(limit: int = 50, cursor: Optional[int] = None):
+    """최신순 페이지 조회. 다음 페이지는 응답의 next_cursor 를 cursor 로 전달"""
+    messages, next_cursor = _store.chat_page(max(1, min(limit, CHAT_PAGE_MAX)), before=cursor)
+    return {"messages": messages, "next_cursor": next_cursor}
+
+
+@app.post("/api/chat-history/messages")
+async def append_chat_messages(req: Request):
+    """메시지 추가 ({"messages": [...]} 또는 메시지 1건). 같은 id는 교체"""
+    body = await req.json()
+    messages = body.get("messages", [body]) if isinstance(body, dict) else body
+    if not isinstance(messages, list) or not all(isinstance(m, dict) for m in messages):
+        raise HTTPException(status_code=400, detail="messages는 메시지 객체 목록이어야 합니다.")
+    await run_in_threadpool(_store.append_chat_messages, messages)
+    return {"ok": True, "appended": len(messages)}
+
+
+@app.patch("/api/chat-history/messages/{message_id}")
+async def patch_chat_message(message_id: str, req: Request):
+    fields = await req.json()
+    if not isinstance(fields, dict):
+        raise HTTPException(status_code=400, detail="변경할 필드 객체가 필요합니다.")
+    message = await run_in_threadpool(_store.patch_chat_message, message_id, fields)
+    if message is None:
+        raise HTTPException(status_code=404, detail="메시지를 찾을 수 없습니다.")
+    return {"ok": True, "message": message}
+
+
 @app.delete("/api/chat-history")
-async def clear_chat_history():
-    if os.path.exists(CHAT_HISTORY_FILE):
-        os.remove(CHAT_HISTORY_FILE)
+def clear_chat_history():
+    _store.clear_chat_messages()
     return {"ok": True}
 
 
 @app.get("/api/dashboards")
-async def get_dashboards():
-    return {"dashboards": _read_dashboards()}
+def get_dashboards():
+    return {"dashboards": _store.list_dashboards()}
 
 
 @app.post("/api/dashboards")
 async def save_dashboard(req: Request):
     body = await req.json()
-    name = body.get("name", "")
-    records = _read_dashboards()
-    idx = next((i for i, d in enumerate(records) if d.get("name") == name), -1)
-    if idx >= 0:
-        records[idx] = body
-    else:
-        records.insert(0, body)
-    _write_dashboards(records)
+    await run_in_threadpool(_store.save_dashboard, body)
     return {"ok": True}
 
 
 @app.delete("/api/dashboards/{name}")
-async def delete_dashboard(name: str):
-    records = [d for d in _read_dashboards() if d.get("name") != name]
-    _write_dashboards(records)
+def delete_dashboard(name: str):
+    _store.delete_dashboard(name)
     return {"ok": True}
 
 
 @app.get("/api/my-dashboard")
-async def get_my_dashboard():
-    if not os.path.exists(MY_DASHBOARD_FILE):
-        return {"dashboard": None}
-    with open(MY_DASHBOARD_FILE, encoding="utf-8") as f:
-        try:
-            return {"dashboard": json.load(f)}
-        except Exception:
-            return {"dashboard": None}
+def get_my_dashboard():
+    return {"dashboard": _store.get_value("my_dashboard")}
 
 
 @app.post("/api/my-dashboard")
 async def save_my_dashboard(req: Request):
     body = await req.json()
-    with open(MY_DASHBOARD_FILE, "w", encoding="utf-8") as f:
-        json.dump(body, f, ensure_ascii=False, indent=2)
+    await run_in_threadpool(_store.set_value, "my_dashboard", body)
     return {"ok": True}
 
 
 @app.delete("/api/my-dashboard")
-async def delete_my_dashboard():
-    if os.path.exists(MY_DASHBOARD_FILE):
-        os.remove(MY_DASHBOARD_FILE)
+def delete_my_dashboard():
+    _store.delete_value("my_dashboard")
     return {"ok": True}
 
 
 @app.post("/api/feedback")
-async def feedback(req: FeedbackRequest):
+def feedback(req: FeedbackRequest):
     if req.rating not in ("up", "down"):
         raise HTTPException(status_code=400, detail="rating은 'up' 또는 'down'이어야 합니다.")
 
@@ -662,9 +1168,7 @@ async def feedback(req: FeedbackRequest):
         "approved": False,
         "timestamp": datetime.now().isoformat(),
     }
-    records = _read_feedback()
-    records.append(entry)
-    _write_feedback(records)
+    _store.append_feedback(entry)
     return {"ok": True}
 
 
@@ -679,22 +1183,39 @@ async def admin_login(x_admin_password: str = Header(...)):
     return {"ok": True}
 
 
+TRAINING_PAGE_MAX = 1000
+
+
 @app.get("/admin/training")
-async def admin_get_training(_=Depends(require_admin)):
+def admin_get_training(
+    type: Optional[str] = None,
+    q: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    _=Depends(require_admin),
+):
+    """
+    학습 데이터 조회. type(sql | ddl | documentation)·q(부분 문자열) 필터,
+    limit 지정 시 페이지 단위 응답 + next_cursor (생략 시 전체 반환)
+    """
+    if type is not None and type not in vn.TRAINING_TYPES:
+        raise HTTPException(status_code=400, detail=f"type은 {', '.join(vn.TRAINING_TYPES)} 중 하나여야 합니다.")
+    if limit is not None:
+        limit = max(1, min(limit, TRAINING_PAGE_MAX))
     try:
-        df = vn.get_training_data()
-        if df is None or len(df) == 0:
-            return {"items": []}
-        return {"items": json.loads(df.to_json(orient="records", force_ascii=False))}
+        items, next_cursor = vn.training_page(training_type=type, contains=q or None, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
 
 
 @app.post("/admin/training/sql")
-async def admin_train_sql(req: TrainSQLRequest, _=Depends(require_admin)):
+def admin_train_sql(req: TrainSQLRequest, _=Depends(require_admin)):
     try:
         vn.train(question=req.question, sql=req.sql)
-        _sql_cache[req.question.strip()] = req.sql
+        _sql_cache.set(req.question.strip(), req.sql, pinned=True)
 
         # golden_sql.json에도 저장 (서버 재시작 후에도 유지)
         base = os.path.dirname(__file__)
@@ -716,7 +1237,7 @@ async def admin_train_sql(req: TrainSQLRequest, _=Depends(require_admin)):
 
 
 @app.post("/admin/training/doc")
-async def admin_train_doc(req: TrainDocRequest, _=Depends(require_admin)):
+def admin_train_doc(req: TrainDocRequest, _=Depends(require_admin)):
     try:
         vn.train(documentation=req.documentation)
         return {"ok": True}
@@ -725,7 +1246,7 @@ async def admin_train_doc(req: TrainDocRequest, _=Depends(require_admin)):
 
 
 @app.post("/admin/training/delete")
-async def admin_delete_training(req: DeleteTrainingRequest, _=Depends(require_admin)):
+def admin_delete_training(req: DeleteTrainingRequest, _=Depends(require_admin)):
     try:
         vn.remove_training_data(id=req.id)
         return {"ok": True}
@@ -734,19 +1255,10 @@ async def admin_delete_training(req: DeleteTrainingRequest, _=Depends(require_ad
 
 
 @app.post("/admin/training/delete-all")
-async def admin_delete_all_training(_=Depends(require_admin)):
+def admin_delete_all_training(_=Depends(require_admin)):
     """ChromaDB의 SQL 타입 학습 데이터 전체 삭제 + golden_sql.json 초기화"""
     try:
-        df = vn.get_training_data()
-        deleted = 0
-        if df is not None and len(df) > 0:
-            for _, row in df.iterrows():
-                if row.get("training_data_type") == "sql":
-                    try:
-                        vn.remove_training_data(id=row["id"])
-                        deleted += 1
-                    except Exception:
-                        pass
+        deleted = vn.delete_training(training_type="sql")
         # golden_sql.json 초기화
         base = os.path.dirname(__file__)
         filename = os.getenv("GOLDEN_SQL_FILE", "golden_sql.json")
@@ -759,32 +1271,90 @@ async def admin_delete_all_training(_=Depends(require_admin)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ── 증분 재학습 작업 (백그라운드) ─────────────────────────────────
+# train.py / train_ncr.py 의 학습 항목을 프로세스 안에서 모아 스크립트별로 Chroma와 비교,
+# 새 항목만 임베딩하고 파일에서 사라진 항목(각 스크립트의 SOURCE 태그)만 삭제한다.
+# 스크립트별 태그 도입 이전의 공용 태그(TRAINING_FILES_SOURCE) 항목 중 어느 스크립트도
+# 만들지 않는 것은 마지막에 정리한다.
+
+_retrain_jobs: dict[str, dict] = {}
+_retrain_lock = threading.Lock()
+_RETRAIN_JOBS_KEPT = 10
+
+
+def _training_file_sets() -> list[tuple[str, list[dict]]]:
+    """(출처 태그, 학습 항목) — 학습 스크립트별"""
+    import train
+    import train_ncr
+    return [(module.SOURCE, module.training_items()) for module in (train, train_ncr)]
+
+
+def _run_retrain_job(job: dict):
+    offset = 0
+
+    def progress(done: int, total: int):
+        job["progress"] = {"done": offset + done, "total": offset + total}
+
+    try:
+        sets = _training_file_sets()
+        job["state"] = "running"
+        job["items"] = sum(len(items) for _, items in sets)
+        result = {"total": 0, "added": 0, "skipped": 0, "failed": 0, "deleted": 0}
+        started = time.perf_counter()
+        for source, items in sets:
+            part = vn.train_bulk(items, source=source, prune=True, progress=progress)
+            offset += part["added"] + part["failed"]
+            for key in result:
+                result[key] += part[key]
+        result["deleted"] += vn.delete_training(where={"source": TRAINING_FILES_SOURCE})
+        elapsed = time.perf_counter() - started
+        result["seconds"] = round(elapsed, 3)
+        result["items_per_sec"] = round(result["total"] / elapsed, 1) if elapsed > 0 else None
+        job["result"] = result
+        job["state"] = "done"
+    except Exception as e:
+        job["state"] = "failed"
+        job["error"] = str(e)
+        print(f"[retrain] 재학습 실패: {e}")
+    finally:
+        job["finished_at"] = time.time()
+
+
 @app.post("/admin/training/retrain-all")
-async def admin_retrain_all(_=Depends(require_admin)):
-    """ChromaDB 전체 재학습 (train.py + train_ncr.py)"""
-    import sys
-    import subprocess
-    results = []
-    for script in ["train.py", "train_ncr.py"]:
-        script_path = os.path.join(os.path.dirname(__file__), script)
-        if not os.path.exists(script_path):
-            results.append({"script": script, "status": "skipped"})
-            continue
-        result = subprocess.run(
-            [sys.executable, script_path],
-            capture_output=True, text=True,
-        )
-        results.append({
-            "script": script,
-            "status": "ok" if result.returncode == 0 else "error",
-            "output": result.stdout[-1000:] if result.stdout else "",
-            "error": result.stderr[-500:] if result.stderr and result.returncode != 0 else "",
-        })
-    return {"ok": True, "results": results}
+def admin_retrain_all(_=Depends(require_admin)):
+    """학습 파일 기준 증분 재학습 작업 시작 (진행 상황은 /admin/training/jobs/{job_id})"""
+    with _retrain_lock:
+        running = next((j for j in _retrain_jobs.values() if j["state"] in ("queued", "running")), None)
+        if running:
+            # 409 + 진행 중 작업 정보 → 클라이언트는 그 작업을 이어서 폴링
+            return JSONResponse(status_code=409, content={"ok": False, "detail": "이미 재학습이 진행 중입니다.", "job": running})
+        job = {
+            "id": uuid.uuid4().hex[:12],
+            "state": "queued",
+            "started_at": time.time(),
+            "finished_at": None,
+            "items": None,
+            "progress": {"done": 0, "total": 0},
+            "result": None,
+            "error": None,
+        }
+        _retrain_jobs[job["id"]] = job
+        while len(_retrain_jobs) > _RETRAIN_JOBS_KEPT:
+            _retrain_jobs.pop(next(iter(_retrain_jobs)))
+    threading.Thread(target=_run_retrain_job, args=(job,), name=f"retrain-{job['id']}", daemon=True).start()
+    return {"ok": True, "job": job}
+
+
+@app.get("/admin/training/jobs/{job_id}")
+def admin_retrain_job(job_id: str, _=Depends(require_admin)):
+    job = _retrain_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="재학습 작업을 찾을 수 없습니다.")
+    return job
 
 
 @app.post("/admin/training/ddl-sync")
-async def admin_ddl_sync(_=Depends(require_admin)):
+def admin_ddl_sync(_=Depends(require_admin)):
     ddl_path = os.path.join(os.path.dirname(__file__), "training/ddl.sql")
     if not os.path.exists(ddl_path):
         raise HTTPException(status_code=404, detail="ddl.sql 파일을 찾을 수 없습니다.")
@@ -802,31 +1372,25 @@ async def admin_ddl_sync(_=Depends(require_admin)):
 
 
 @app.get("/admin/feedback")
-async def admin_get_feedback(_=Depends(require_admin)):
-    return {"items": _read_feedback()}
+def admin_get_feedback(_=Depends(require_admin)):
+    return {"items": _store.list_feedback()}
 
 
 @app.post("/admin/feedback/approve")
-async def admin_approve_feedback(req: FeedbackApproveRequest, _=Depends(require_admin)):
+def admin_approve_feedback(req: FeedbackApproveRequest, _=Depends(require_admin)):
     try:
         vn.train(question=req.question, sql=req.sql)
-        _sql_cache[req.question.strip()] = req.sql
+        _sql_cache.set(req.question.strip(), req.sql, pinned=True)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"학습 실패: {e}")
 
-    records = _read_feedback()
-    for r in records:
-        if r["message_id"] == req.message_id:
-            r["approved"] = True
-            break
-    _write_feedback(records)
+    _store.approve_feedback(req.message_id)
     return {"ok": True}
 
 
 @app.post("/admin/feedback/delete")
-async def admin_delete_feedback(req: FeedbackDeleteRequest, _=Depends(require_admin)):
-    records = [r for r in _read_feedback() if r["message_id"] != req.message_id]
-    _write_feedback(records)
+def admin_delete_feedback(req: FeedbackDeleteRequest, _=Depends(require_admin)):
+    _store.delete_feedback(req.message_id)
     return {"ok": True}
 
 
@@ -835,57 +1399,37 @@ async def admin_delete_feedback(req: FeedbackDeleteRequest, _=Depends(require_ad
 @app.get("/admin/monitoring")
 async def admin_monitoring(_=Depends(require_admin)):
     """피드백·채팅 히스토리 기반 모니터링 통계"""
-    from collections import Counter
-
-    # ── 피드백 통계 ─────────────────────────────────────────
-    feedback_data = _read_feedback()
-    up_count = sum(1 for f in feedback_data if f.get("rating") == "up")
-    down_count = sum(1 for f in feedback_data if f.get("rating") == "down")
-    question_counts = Counter(
-        f.get("question", "").strip()
-        for f in feedback_data
-        if f.get("question", "").strip()
-    )
-    top_feedback_questions = [
-        {"question": q, "count": c}
-        for q, c in question_counts.most_common(10)
-    ]
-
-    # ── 채팅 히스토리 통계 ──────────────────────────────────
-    chat_messages: list = []
-    if os.path.exists(CHAT_HISTORY_FILE):
-        with open(CHAT_HISTORY_FILE, encoding="utf-8") as f:
-            try:
-                chat_messages = json.load(f)
-            except Exception:
-                pass
-
-    user_msgs = [m for m in chat_messages if m.get("role") == "user"]
-    success_msgs = [m for m in chat_messages if m.get("status") == "success"]
-    error_msgs = [m for m in chat_messages if m.get("status") == "error"]
-    total_q = len(user_msgs)
-
-    top_chat_questions = [
-        {"question": q, "count": c}
-        for q, c in Counter(m.get("content", "").strip() for m in user_msgs if m.get("content", "").strip()).most_common(10)
-    ]
+    # 피드백·채팅 통계는 저장소가 변경 시점에 누적 집계 (전체 재스캔 없음)
+    counters = await run_in_threadpool(_store.counters)
+    top_feedback = await run_in_threadpool(_store.top_questions, "feedback", 10)
+    top_chat = await run_in_threadpool(_store.top_questions, "chat", 10)
+    fb_total = counters.get("feedback_total", 0)
+    up_count = counters.get("feedback_up", 0)
+    total_q = counters.get("chat_user", 0)
+    success = counters.get("chat_success", 0)
 
     return {
         "feedback": {
-            "total": len(feedback_data),
+            "total": fb_total,
             "up": up_count,
-            "down": down_count,
-            "satisfaction_rate": round(up_count / len(feedback_data) * 100, 1) if feedback_data else 0,
+            "down": counters.get("feedback_down", 0),
+            "satisfaction_rate": round(up_count / fb_total * 100, 1) if fb_total else 0,
         },
         "chat": {
             "total_queries": total_q,
-            "success": len(success_msgs),
-            "error": len(error_msgs),
-            "success_rate": round(len(success_msgs) / total_q * 100, 1) if total_q > 0 else 0,
+            "success": success,
+            "error": counters.get("chat_error", 0),
+            "success_rate": round(success / total_q * 100, 1) if total_q > 0 else 0,
         },
-        "top_feedback_questions": top_feedback_questions,
-        "top_chat_questions": top_chat_questions,
+        "top_feedback_questions": top_feedback,
+        "top_chat_questions": top_chat,
         "cache_size": len(_sql_cache),
+        "cache": _sql_cache.stats(),
+        "top_cache_entries": _sql_cache.top_entries(10),
+        "result_cache": _result_cache.stats(),
+        "single_flight": dict(_single_flight_stats, in_flight=len(_inflight)),
+        "race_mode": RACE_MODE,
+        "sql_generation_latency": _generation_latency.summary(),
     }
 
 
@@ -921,7 +1465,7 @@ def _classify_rho(rho: float) -> str:
 
 
 @app.get("/api/briefing")
-async def get_briefing():
+def get_briefing():
     """시장 데이터 KPI 직접 조회 → 요약 반환 (LLM 호출 없음)"""
     items = []
 
@@ -1040,37 +1584,51 @@ async def get_briefing():
 
 class NarrativeRequest(BaseModel):
     question: str
-    data: list  # list of dicts
+    message_id: Optional[str] = None   # /api/ask 응답의 message_id → 캐시된 프로파일 재사용
+    data: list = []  # list of dicts (message_id 프로파일이 없을 때만 필요)
+
+
+def _narrative_llm(messages: list) -> Optional[str]:
+    # 1순위: Groq API 직접 호출 (프로덕션)
+    if GROQ_API_KEY:
+        resp = groq_client().chat.completions.create(
+            model=GROQ_MODEL_FB,
+            messages=messages,
+            temperature=0.3,
+            max_tokens=150,
+        )
+        return resp.choices[0].message.content
+    # 2순위: Ollama 직접 호출 (로컬)
+    if OLLAMA_HOST:
+        resp = http_session().post(
+            f"{OLLAMA_HOST}/api/chat",
+            json={"model": FALLBACK_OLLAMA_MODEL, "messages": messages, "stream": False},
+            timeout=30,
+        )
+        resp.raise_for_status()
+        return resp.json()["message"]["content"]
+    return None
 
 
 @app.post("/api/narrative")
 async def generate_narrative(req: NarrativeRequest):
     """데이터 → 1~2문장 한국어 설명 (LLM 또는 템플릿 fallback)"""
-    if not req.data:
-        return {"narrative": ""}
-
-    try:
-        df = pd.DataFrame(req.data)
-    except Exception:
+    profile = _profiles.get(req.message_id) if req.message_id else None
+    if profile is None:
+        if not req.data:
+            # 프로파일 캐시가 만료된 경우 클라이언트가 data를 담아 다시 요청
+            return {"narrative": "", "profile_missing": bool(req.message_id)}
+        try:
+            profile = profile_columns(pd.DataFrame(req.data))
+        except Exception:
+            return {"narrative": ""}
+    if profile["rows"] == 0:
         return {"narrative": ""}
 
-    numeric_cols = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
-    rows = len(df)
+    rows = profile["rows"]
 
-    # ── 통계 계산 ─────────────────────────────────────────────
-    stats: dict = {"rows": rows}
-    for col in numeric_cols[:3]:
-        vals = df[col].dropna()
-        if len(vals) == 0:
-            continue
-        stats[col] = {
-            "min": float(vals.min()),
-            "max": float(vals.max()),
-            "mean": float(vals.mean()),
-            "last": float(vals.iloc[-1]),
-            "first": float(vals.iloc[0]),
-            "trend": "상승" if vals.iloc[-1] > vals.iloc[0] else "하락" if vals.iloc[-1] < vals.iloc[0] else "보합",
-        }
+    # ── 통계 (ask 응답 시 계산한 컬럼 프로파일 재사용) ─────────
+    stats: dict = {"rows": rows, **numeric_stats(profile, 3)}
 
     # ── LLM으로 설명 생성 시도 ─────────────────────────────────
     try:
@@ -1085,28 +1643,7 @@ async def generate_narrative(req: NarrativeRequest):
             "수치와 추세를 포함하고, 리스크 관리 관점에서 해석하세요."
         )
         messages = [{"role": "user", "content": prompt_text}]
-        narrative = None
-
-        # 1순위: Groq API 직접 호출 (프로덕션)
-        if GROQ_API_KEY:
-            from openai import OpenAI as _OpenAI
-            _client = _OpenAI(api_key=GROQ_API_KEY, base_url="https://api.groq.com/openai/v1")
-            resp = _client.chat.completions.create(
-                model=GROQ_MODEL_FB,
-                messages=messages,
-                temperature=0.3,
-                max_tokens=150,
-            )
-            narrative = resp.choices[0].message.content
-        # 2순위: Ollama 직접 호출 (로컬)
-        elif OLLAMA_HOST:
-            resp = _requests.post(
-                f"{OLLAMA_HOST}/api/chat",
-                json={"model": FALLBACK_OLLAMA_MODEL, "messages": messages, "stream": False},
-                timeout=30,
-            )
-            resp.raise_for_status()
-            narrative = resp.json()["message"]["content"]
+        narrative = await _in_pool(_llm_pool, _narrative_llm, messages)
 
         if narrative:
             sentences = [s.strip() for s in narrative.replace("\n", " ").split(".") if s.strip()]
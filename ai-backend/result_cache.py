@@ -0,0 +1,114 @@
+"""
+result_cache.py – SQL 실행 결과(DataFrame) 캐시
+
+[키]    공백·대소문자·끝 세미콜론을 정규화한 SQL (문자열 리터럴/따옴표 식별자는 그대로)
+[무효화] 데이터 버전(version_fn 반환값)이 바뀌면 전체 비움
+        버전 조회 자체도 DB 호출이므로 check_interval 초마다 한 번만 확인
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+import pandas as pd
+
+_QUOTED = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+
+
+def normalize_sql(sql: str) -> str:
+    parts = _QUOTED.split(sql.strip().rstrip(";").strip())
+    normalized = []
+    for i, part in enumerate(parts):
+        if i % 2 == 1:      # 리터럴 / 따옴표 식별자
+            normalized.append(part)
+        else:
+            normalized.append(re.sub(r"\s+", " ", part).lower())
+    return "".join(normalized).strip()
+
+
+class ResultCache:
+    """정규화 SQL → DataFrame LRU 캐시 (데이터 버전 변경 시 무효화)"""
+
+    def __init__(
+        self,
+        version_fn: Callable[[], Hashable],
+        max_entries: int = 256,
+        max_rows: int = 50000,
+        check_interval: float = 30.0,
+    ):
+        self._version_fn = version_fn
+        self.max_entries = max_entries      # 0 이하 = 캐시 비활성
+        self.max_rows = max_rows            # 이보다 큰 결과는 캐시하지 않음
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._frames: OrderedDict[str, pd.DataFrame] = OrderedDict()
+        self._version: Optional[Hashable] = None
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _check_version(self):
+        """데이터 버전 확인. 버전 조회(DB 호출)는 잠금 밖에서 하고, 비교·무효화만 잠금 안에서 처리"""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now      # 조회 중 들어온 다른 요청은 기존 버전으로 바로 진행
+        try:
+            version = self._version_fn()
+        except Exception as e:
+            print(f"[result-cache] 데이터 버전 확인 실패, 캐시 비움: {e}")
+            version = None
+        with self._lock:
+            if version is None or version != self._version:
+                if self._frames:
+                    print(f"[result-cache] 데이터 버전 변경 {self._version} → {version}, {len(self._frames)}개 무효화")
+                    self._frames.clear()
+                    self.invalidations += 1
+                self._version = version
+
+    def get(self, sql: str) -> Optional[pd.DataFrame]:
+        if self.max_entries <= 0:
+            return None
+        key = normalize_sql(sql)
+        self._check_version()
+        with self._lock:
+            df = self._frames.get(key)
+            if df is None:
+                self.misses += 1
+                return None
+            self._frames.move_to_end(key)
+            self.hits += 1
+            return df
+
+    def put(self, sql: str, df: pd.DataFrame):
+        if self.max_entries <= 0 or len(df) > self.max_rows:
+            return
+        key = normalize_sql(sql)
+        with self._lock:
+            if self._version is None:   # 버전을 알 수 없으면 무효화 기준이 없으므로 저장하지 않음
+                return
+            self._frames[key] = df
+            self._frames.move_to_end(key)
+            while len(self._frames) > self.max_entries:
+                self._frames.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self._frames.clear()
+            self._checked_at = 0.0
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._frames),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups * 100, 1) if lookups else 0,
+            "invalidations": self.invalidations,
+            "data_version": str(self._version),
+        }
@@ -0,0 +1,165 @@
+"""
+result_format.py – /api/ask 결과 직렬화
+
+기존: json.loads(df.to_json(orient="records")) → Python dict 목록 → FastAPI가 다시 JSON 직렬화
+현재: pandas C 인코더가 만든 JSON 텍스트를 응답 본문에 그대로 이어 붙인다 (파싱/재직렬화 없음)
+
+[형식]  ?format= 또는 Accept 헤더로 선택, 기본 records
+  records : {"data": [{"col": v, ...}, ...], ...}           (기존 형식)
+  columns : {"columns": ["col", ...], "data": [[v, ...], ...], ...}  (컬럼별 배열)
+  arrow   : Arrow IPC stream, 응답 메타데이터는 스키마 metadata "insightbi" 키에 JSON으로 저장
+            (pyarrow 설치 시에만 지원)
+
+[내보내기]  DataFrame 조각(iterator)을 받아 CSV / Parquet 바이트 조각을 순차 생성
+  조각 단위로 인코딩 후 바로 내보내므로 전체 행 수와 무관하게 메모리 사용이 일정하다.
+"""
+import json
+from typing import Iterable, Iterator, Optional
+
+import pandas as pd
+
+COLUMNS_MEDIA_TYPE = "application/vnd.insightbi.columns+json"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+FORMATS = ("records", "columns", "arrow")
+
+
+EXPORT_MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "parquet": "application/vnd.apache.parquet"}
+
+
+def negotiate_format(fmt: Optional[str], accept: Optional[str]) -> str:
+    """쿼리 format 우선, 없으면 Accept 헤더, 둘 다 없으면 records. 모르는 format은 ValueError"""
+    if fmt:
+        if fmt not in FORMATS:
+            raise ValueError(f"format은 {', '.join(FORMATS)} 중 하나여야 합니다.")
+        return fmt
+    accept = accept or ""
+    if ARROW_MEDIA_TYPE in accept:
+        return "arrow"
+    if COLUMNS_MEDIA_TYPE in accept:
+        return "columns"
+    return "records"
+
+
+def _splice(meta: dict, fields: list[tuple[str, str]]) -> bytes:
+    """메타 dict JSON 뒤에 이미 직렬화된 JSON 조각(fields)을 이어 붙임"""
+    head = json.dumps(meta, ensure_ascii=False, default=str)[:-1]
+    sep = ", " if meta else ""
+    tail = ", ".join(f"{json.dumps(key)}: {raw}" for key, raw in fields)
+    return (head + sep + tail + "}").encode("utf-8")
+
+
+def records_json(meta: dict, df: pd.DataFrame) -> bytes:
+    return _splice(meta, [("data", df.to_json(orient="records", force_ascii=False))])
+
+
+def columns_json(meta: dict, df: pd.DataFrame) -> bytes:
+    arrays = ", ".join(df.iloc[:, i].to_json(orient="values", force_ascii=False) for i in range(df.shape[1]))
+    columns = json.dumps([str(c) for c in df.columns], ensure_ascii=False)
+    return _splice(meta, [("columns", columns), ("data", f"[{arrays}]")])
+
+
+def arrow_ipc(meta: dict, df: pd.DataFrame) -> bytes:
+    """Arrow IPC stream. pyarrow 미설치 시 ImportError"""
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        b"insightbi": json.dumps(meta, ensure_ascii=False, default=str).encode("utf-8"),
+    })
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def csv_chunks(chunks: Iterable[pd.DataFrame]) -> Iterator[bytes]:
+    """첫 조각에만 헤더. Excel 한글 깨짐 방지를 위해 UTF-8 BOM으로 시작"""
+    first = True
+    for chunk in chunks:
+        text = chunk.to_csv(index=False, header=first, lineterminator="\n")
+        yield (("\ufeff" if first else "") + text).encode("utf-8")
+        first = False
+
+
+class _Drain:
+    """ParquetWriter 출력 대상 — 기록된 바이트를 모아 두었다가 take()로 넘기고 비움"""
+
+    def __init__(self):
+        self._parts: list[bytes] = []
+        self._pos = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        out = b"".join(self._parts)
+        self._parts.clear()
+        return out
+
+
+PARQUET_SCHEMA_LOOKAHEAD = 4   # 스키마 확정 전 미리 읽는 최대 조각 수
+
+
+def _unified_schema(tables: list):
+    """조각 스키마 통합 (null+X→X, int+float→float 등)"""
+    import pyarrow as pa
+
+    return pa.unify_schemas([t.schema for t in tables], promote_options="permissive")
+
+
+def parquet_chunks(chunks: Iterable[pd.DataFrame]) -> Iterator[bytes]:
+    """
+    조각마다 row group 1개씩 기록. pyarrow 미설치 시 ImportError
+    Parquet은 파일 중간에 스키마를 바꿀 수 없으므로, 전부 NULL 인 컬럼(null 타입)이 있으면 타입이 정해질 때까지
+    최대 PARQUET_SCHEMA_LOOKAHEAD 조각을 모아 통합 스키마를 정한 뒤 각 조각을 그 스키마로 cast.
+    그때까지도 전부 NULL 인 컬럼은 문자열로 기록
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    tables = (pa.Table.from_pandas(chunk, preserve_index=False) for chunk in chunks)
+    head: list = []
+    for table in tables:
+        head.append(table)
+        if len(head) >= PARQUET_SCHEMA_LOOKAHEAD or not any(pa.types.is_null(t) for t in _unified_schema(head).types):
+            break
+    if not head:
+        return
+    unified = _unified_schema(head)
+    schema = pa.schema(
+        [f.with_type(pa.string()) if pa.types.is_null(f.type) else f for f in unified],
+        metadata=unified.metadata,
+    )
+
+    def ordered():
+        while head:
+            yield head.pop(0)      # 모아 둔 조각은 기록 즉시 해제
+        yield from tables
+
+    sink = _Drain()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for table in ordered():
+            writer.write_table(table.cast(schema))
+            data = sink.take()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    tail = sink.take()
+    if tail:
+        yield tail
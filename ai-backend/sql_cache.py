@@ -0,0 +1,307 @@
+"""
+sql_cache.py – 질문 → SQL 캐시 (Golden SQL + LLM 학습 결과)
+
+[조회 방식]
+  기존: 캐시 전체 키에 대해 SequenceMatcher.ratio() 선형 스캔
+  현재: 문자 bigram 역색인으로 후보를 먼저 좁힌 뒤, 후보에만 정확한 ratio 계산
+
+  SequenceMatcher.ratio() = 2M / (len(a) + len(b))  (M = 매칭 문자 수)
+  ratio >= t 인 키는 아래 두 조건을 반드시 만족하므로, 이 조건으로 거르면
+  기존 선형 스캔과 결과가 동일하다.
+    1) 길이 조건   : 2·min(la, lb) / (la + lb) >= t
+    2) bigram 조건 : 공통 bigram 수(중복 포함) >= 3M - (la + lb) - 1
+       (매칭 블록 b개 → 블록 내부 bigram M - b개는 양쪽에 공통,
+        블록 사이에는 최소 1개의 불일치 문자 → b - 1 <= la + lb - 2M)
+
+[항목 구분]
+  pinned  : Golden SQL·관리자 학습 항목 — 용량 제한/TTL과 무관하게 유지
+  learned : LLM 생성 성공 결과 — max_learned 초과 시 LRU 제거, ttl_seconds 경과 시 만료
+"""
+import threading
+import time
+from collections import Counter, OrderedDict
+from difflib import SequenceMatcher
+from typing import Iterator, Optional
+
+
+def _bigrams(text: str) -> Counter:
+    return Counter(text[i:i + 2] for i in range(len(text) - 1))
+
+
+def _length_ok(la: int, lb: int, threshold: float) -> bool:
+    """길이만으로 계산한 ratio 상한이 threshold 이상인지"""
+    total = la + lb
+    return total > 0 and 2.0 * min(la, lb) / total >= threshold
+
+
+def _min_shared_bigrams(la: int, lb: int, threshold: float) -> int:
+    """ratio >= threshold 가 되기 위해 필요한 최소 공통 bigram 수"""
+    total = la + lb
+    matches = max(0, int(threshold * total / 2) - 1)
+    while 2.0 * matches / total < threshold:
+        matches += 1
+    return 3 * matches - total - 1
+
+
+class _Entry:
+    __slots__ = ("sql", "pinned", "created_at", "hits", "last_hit_at")
+
+    def __init__(self, sql: str, pinned: bool):
+        self.sql = sql
+        self.pinned = pinned
+        self.created_at = time.time()
+        self.hits = 0
+        self.last_hit_at: Optional[float] = None
+
+
+class SQLCache:
+    """dict 호환 질문 → SQL 캐시 + bigram 역색인 (learned 항목 LRU/TTL 관리)"""
+
+    def __init__(self, max_learned: int = 0, ttl_seconds: float = 0):
+        self.max_learned = max_learned      # 0 이하 = 무제한
+        self.ttl_seconds = ttl_seconds      # 0 이하 = 만료 없음
+        self._lock = threading.RLock()
+        self._entries: dict[str, _Entry] = {}
+        self._lru: OrderedDict[str, None] = OrderedDict()      # learned 항목, 최근 사용 순
+        self._created: OrderedDict[str, float] = OrderedDict() # learned 항목, 생성 순 (TTL)
+        self._ids: dict[str, int] = {}            # 질문 → 삽입 순번 (동점 시 먼저 들어온 키 우선)
+        self._keys: dict[int, str] = {}           # 삽입 순번 → 질문
+        self._postings: dict[str, dict[int, int]] = {}   # bigram → {순번: 등장 횟수}
+        self._by_length: dict[int, set[int]] = {}        # 길이 → 순번 (bigram이 없는 짧은 질문용)
+        self._next_id = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    # ── dict 호환 인터페이스 ──────────────────────────────────────
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, question: object) -> bool:
+        return question in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._entries))
+
+    def __getitem__(self, question: str) -> str:
+        return self._entries[question].sql
+
+    def __setitem__(self, question: str, sql: str):
+        self.set(question, sql)
+
+    def __delitem__(self, question: str):
+        with self._lock:
+            if question not in self._entries:
+                raise KeyError(question)
+            self._remove(question)
+
+    def get(self, question: str, default: Optional[str] = None) -> Optional[str]:
+        entry = self._entries.get(question)
+        return entry.sql if entry else default
+
+    def set(self, question: str, sql: str, pinned: bool = False):
+        """항목 추가/갱신. 기존 pinned 항목은 learned로 덮어써도 pinned 유지"""
+        with self._lock:
+            entry = self._entries.get(question)
+            if entry is None:
+                entry = _Entry(sql, pinned)
+                self._entries[question] = entry
+                self._index(question)
+            else:
+                entry.sql = sql
+                entry.pinned = entry.pinned or pinned
+                entry.created_at = time.time()
+
+            if entry.pinned:
+                self._lru.pop(question, None)
+                self._created.pop(question, None)
+            else:
+                self._lru[question] = None
+                self._lru.move_to_end(question)
+                self._created[question] = entry.created_at
+                self._created.move_to_end(question)
+                self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._lru.clear()
+            self._created.clear()
+            self._ids.clear()
+            self._keys.clear()
+            self._postings.clear()
+            self._by_length.clear()
+
+    # ── 용량/만료 관리 ────────────────────────────────────────────
+    def _remove(self, question: str):
+        del self._entries[question]
+        self._lru.pop(question, None)
+        self._created.pop(question, None)
+        self._unindex(question)
+
+    def _evict(self):
+        while self.max_learned > 0 and len(self._lru) > self.max_learned:
+            oldest, _ = self._lru.popitem(last=False)
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _expire(self):
+        if self.ttl_seconds <= 0:
+            return
+        deadline = time.time() - self.ttl_seconds
+        while self._created:
+            question, created_at = next(iter(self._created.items()))
+            if created_at > deadline:
+                break
+            self._remove(question)
+            self.expirations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            pinned = sum(1 for e in self._entries.values() if e.pinned)
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "pinned": pinned,
+                "learned": len(self._entries) - pinned,
+                "max_learned": self.max_learned,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups * 100, 1) if lookups else 0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def top_entries(self, n: int = 10) -> list[dict]:
+        """히트 수 상위 항목 (모니터링용)"""
+        with self._lock:
+            ranked = sorted(self._entries.items(), key=lambda item: item[1].hits, reverse=True)[:n]
+            return [
+                {
+                    "question": question,
+                    "hits": entry.hits,
+                    "pinned": entry.pinned,
+                    "last_hit_at": entry.last_hit_at,
+                }
+                for question, entry in ranked if entry.hits > 0
+            ]
+
+    # ── 색인 관리 ─────────────────────────────────────────────────
+    def _index(self, question: str):
+        key_id = self._next_id
+        self._next_id += 1
+        self._ids[question] = key_id
+        self._keys[key_id] = question
+        self._by_length.setdefault(len(question), set()).add(key_id)
+        for gram, count in _bigrams(question).items():
+            self._postings.setdefault(gram, {})[key_id] = count
+
+    def _unindex(self, question: str):
+        key_id = self._ids.pop(question)
+        del self._keys[key_id]
+        bucket = self._by_length[len(question)]
+        bucket.discard(key_id)
+        if not bucket:
+            del self._by_length[len(question)]
+        for gram in _bigrams(question):
+            posting = self._postings[gram]
+            posting.pop(key_id, None)
+            if not posting:
+                del self._postings[gram]
+
+    # ── 유사 질문 조회 ───────────────────────────────────────────
+    def _candidates(self, q: str, threshold: float) -> list[int]:
+        la = len(q)
+        max_len = int(la * (2 - threshold) / threshold) + 1 if threshold > 0 else max(self._by_length, default=0)
+        lengths = [lb for lb in self._by_length if lb <= max_len and _length_ok(la, lb, threshold)]
+        if not lengths:
+            return []
+
+        q_grams = _bigrams(q)
+        total = sum(q_grams.values())
+        min_shared = min(_min_shared_bigrams(la, lb, threshold) for lb in lengths)
+
+        candidates = []
+        if min_shared <= 0:
+            # 공통 bigram 없이도 통과할 수 있는 짧은 질문: 해당 길이 버킷을 직접 확인
+            seen = set()
+            for lb in lengths:
+                if _min_shared_bigrams(la, lb, threshold) <= 0:
+                    seen.update(self._by_length[lb])
+            candidates.extend(seen)
+            probe = list(q_grams)
+        else:
+            # prefix filter: 공통 bigram이 min_shared개 이상이려면 가장 희귀한
+            # (total - min_shared + 1)개 bigram 중 하나는 반드시 공유해야 한다
+            seen = set()
+            probe = []
+            budget = total - min_shared + 1
+            for gram in sorted(q_grams, key=lambda g: len(self._postings.get(g, ()))):
+                if budget <= 0:
+                    break
+                probe.append(gram)
+                budget -= q_grams[gram]
+
+        for gram in probe:
+            for key_id in self._postings.get(gram, ()):
+                if key_id in seen:
+                    continue
+                seen.add(key_id)
+                lb = len(self._keys[key_id])
+                if not _length_ok(la, lb, threshold):
+                    continue
+                shared = sum(
+                    min(count, self._postings[g].get(key_id, 0))
+                    for g, count in q_grams.items() if g in self._postings
+                )
+                if shared >= _min_shared_bigrams(la, lb, threshold):
+                    candidates.append(key_id)
+        return candidates
+
+    def lookup(self, question: str, threshold: float) -> tuple[Optional[str], float]:
+        """threshold 이상 가장 유사한 캐시 질문의 SQL 반환 (없으면 (None, 0.0))"""
+        q = question.strip()
+        with self._lock:
+            self._expire()
+            best_q, best_score = self._best_match(q, threshold)
+            if best_q is None:
+                self.misses += 1
+                return None, 0.0
+            entry = self._entries[best_q]
+            entry.hits += 1
+            entry.last_hit_at = time.time()
+            if not entry.pinned:
+                self._lru.move_to_end(best_q)
+            self.hits += 1
+            return entry.sql, best_score
+
+    def _best_match(self, q: str, threshold: float) -> tuple[Optional[str], float]:
+        if not q or not self._entries:
+            return None, 0.0
+        if q in self._entries:
+            return q, 1.0
+
+        # 상한(quick_ratio)이 높은 후보부터 정확한 ratio 계산, 상한이 현재 최고점 미만이면 중단
+        scored = []
+        for key_id in self._candidates(q, threshold):
+            matcher = SequenceMatcher(None, q, self._keys[key_id])
+            bound = matcher.quick_ratio()
+            if bound >= threshold:
+                scored.append((-bound, key_id, matcher))
+        scored.sort(key=lambda item: (item[0], item[1]))
+
+        best_id: Optional[int] = None
+        best_score = 0.0
+        for neg_bound, key_id, matcher in scored:
+            if -neg_bound < best_score:
+                break
+            score = matcher.ratio()
+            if score > best_score or (score == best_score and best_id is not None and key_id < best_id):
+                best_score = score
+                best_id = key_id
+
+        if best_id is not None and best_score >= threshold:
+            return self._keys[best_id], best_score
+        return None, 0.0
@@ -0,0 +1,386 @@
+"""
+store.py – 앱 상태 저장소 (SQLite WAL)
+
+feedback.json / chat_history.json / reports_user.json / dashboards.json / my_dashboard.json
+을 매 변경마다 통째로 다시 쓰던 방식을 대체한다.
+  - 변경은 해당 행만 INSERT/UPDATE/DELETE (트랜잭션 단위, 동시 요청 간 유실 없음)
+  - 키 인덱스: feedback.message_id, chat_messages.message_id, reports.id, dashboards.name
+  - 각 레코드 본문은 JSON 텍스트로 저장해 기존 응답 형식을 그대로 유지
+
+[목록 순서]  기존 JSON 리스트 순서를 그대로 재현
+  feedback / chat_messages : 추가 순 (seq)
+  reports / dashboards     : 신규 항목이 맨 앞 (insert(0)) → sort_key 를 최솟값 - 1 로 부여
+"""
+import json
+import os
+import sqlite3
+import threading
+from typing import Optional
+
+STORE_PATH = os.getenv("STORE_PATH", os.path.join(os.path.dirname(__file__), "app_store.db"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS feedback (
+    seq        INTEGER PRIMARY KEY AUTOINCREMENT,
+    message_id TEXT NOT NULL,
+    body       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_feedback_message_id ON feedback(message_id);
+
+CREATE TABLE IF NOT EXISTS chat_messages (
+    seq        INTEGER PRIMARY KEY AUTOINCREMENT,
+    message_id TEXT,
+    body       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_chat_messages_message_id ON chat_messages(message_id);
+
+CREATE TABLE IF NOT EXISTS reports (
+    id       TEXT PRIMARY KEY,
+    sort_key INTEGER NOT NULL,
+    body     TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS dashboards (
+    name     TEXT PRIMARY KEY,
+    sort_key INTEGER NOT NULL,
+    body     TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS kv (
+    key  TEXT PRIMARY KEY,
+    body TEXT NOT NULL
+);
+
+-- 모니터링용 누적 집계 (feedback / chat_messages 변경과 같은 트랜잭션에서 갱신)
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    n    INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS question_counts (
+    kind      TEXT NOT NULL,        -- feedback | chat
+    question  TEXT NOT NULL,
+    n         INTEGER NOT NULL,
+    first_seq INTEGER NOT NULL,     -- 동률 시 먼저 등장한 질문 우선 (Counter.most_common 과 동일)
+    PRIMARY KEY (kind, question)
+);
+CREATE INDEX IF NOT EXISTS ix_question_counts_top ON question_counts(kind, n DESC, first_seq);
+"""
+
+_SCHEMA_VERSION = 1     # 1: counters / question_counts 집계 추가
+
+
+def _dumps(record) -> str:
+    return json.dumps(record, ensure_ascii=False)
+
+
+class Store:
+    """단일 연결 + 잠금. 각 메서드가 하나의 트랜잭션"""
+
+    def __init__(self, path: str = STORE_PATH):
+        self.path = path
+        self.created = not os.path.exists(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < _SCHEMA_VERSION:
+            with self._lock, self._conn:
+                self._rebuild_aggregates()
+                self._conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+
+    def _rows(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            return [json.loads(body) for (body,) in self._conn.execute(sql, params)]
+
+    # ── 누적 집계 ───────────────────────────────────────────────
+    # 호출자가 잠금·트랜잭션을 잡은 상태에서 사용
+    def _bump(self, name: str, delta: int):
+        if delta:
+            self._conn.execute(
+                "INSERT INTO counters (name, n) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET n = n + excluded.n",
+                (name, delta),
+            )
+
+    def _bump_question(self, kind: str, question: str, delta: int, seq: int):
+        question = (question or "").strip()
+        if not question:
+            return
+        self._conn.execute(
+            "INSERT INTO question_counts (kind, question, n, first_seq) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(kind, question) DO UPDATE SET n = n + excluded.n",
+            (kind, question, delta, seq),
+        )
+        if delta < 0:
+            self._conn.execute(
+                "DELETE FROM question_counts WHERE kind = ? AND question = ? AND n <= 0", (kind, question)
+            )
+
+    def _feedback_delta(self, entry: dict, sign: int, seq: int):
+        self._bump("feedback_total", sign)
+        if entry.get("rating") in ("up", "down"):
+            self._bump(f"feedback_{entry['rating']}", sign)
+        self._bump_question("feedback", entry.get("question", ""), sign, seq)
+
+    def _chat_delta(self, message: dict, sign: int, seq: int):
+        if message.get("role") == "user":
+            self._bump("chat_user", sign)
+            self._bump_question("chat", message.get("content", ""), sign, seq)
+        if message.get("status") in ("success", "error"):
+            self._bump(f"chat_{message['status']}", sign)
+
+    def _reset_aggregates(self, prefix: str, kind: str):
+        self._conn.execute("DELETE FROM counters WHERE name LIKE ?", (prefix + "%",))
+        self._conn.execute("DELETE FROM question_counts WHERE kind = ?", (kind,))
+
+    def _rebuild_aggregates(self):
+        self._reset_aggregates("feedback_", "feedback")
+        for seq, body in self._conn.execute("SELECT seq, body FROM feedback ORDER BY seq").fetchall():
+            self._feedback_delta(json.loads(body), 1, seq)
+        self._reset_aggregates("chat_", "chat")
+        for seq, body in self._conn.execute("SELECT seq, body FROM chat_messages ORDER BY seq").fetchall():
+            self._chat_delta(json.loads(body), 1, seq)
+
+    def counters(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT name, n FROM counters"))
+
+    def top_questions(self, kind: str, n: int = 10) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT question, n FROM question_counts WHERE kind = ? ORDER BY n DESC, first_seq LIMIT ?",
+                (kind, n),
+            ).fetchall()
+        return [{"question": q, "count": c} for q, c in rows]
+
+    # ── feedback (추가 전용 로그) ───────────────────────────────
+    def list_feedback(self) -> list[dict]:
+        return self._rows("SELECT body FROM feedback ORDER BY seq")
+
+    def append_feedback(self, entry: dict):
+        with self._lock, self._conn:
+            seq = self._conn.execute(
+                "INSERT INTO feedback (message_id, body) VALUES (?, ?)",
+                (entry["message_id"], _dumps(entry)),
+            ).lastrowid
+            self._feedback_delta(entry, 1, seq)
+
+    def approve_feedback(self, message_id: str) -> bool:
+        """message_id 가 같은 첫 항목을 approved 처리"""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT seq, body FROM feedback WHERE message_id = ? ORDER BY seq LIMIT 1", (message_id,)
+            ).fetchone()
+            if row is None:
+                return False
+            entry = json.loads(row[1])
+            entry["approved"] = True
+            self._conn.execute("UPDATE feedback SET body = ? WHERE seq = ?", (_dumps(entry), row[0]))
+            return True
+
+    def delete_feedback(self, message_id: str) -> int:
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT seq, body FROM feedback WHERE message_id = ?", (message_id,)
+            ).fetchall()
+            for seq, body in rows:
+                self._feedback_delta(json.loads(body), -1, seq)
+            self._conn.execute("DELETE FROM feedback WHERE message_id = ?", (message_id,))
+            return len(rows)
+
+    # ── chat history ────────────────────────────────────────────
+    def list_chat_messages(self) -> list[dict]:
+        return self._rows("SELECT body FROM chat_messages ORDER BY seq")
+
+    def replace_chat_messages(self, messages: list[dict]):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM chat_messages")
+            self._reset_aggregates("chat_", "chat")
+            for m in messages:
+                seq = self._conn.execute(
+                    "INSERT INTO chat_messages (message_id, body) VALUES (?, ?)", (m.get("id"), _dumps(m))
+                ).lastrowid
+                self._chat_delta(m, 1, seq)
+
+    def append_chat_messages(self, messages: list[dict]):
+        """메시지 추가. 같은 id가 이미 있으면 제자리 교체 (재전송에 안전)"""
+        with self._lock, self._conn:
+            for m in messages:
+                row = self._conn.execute(
+                    "SELECT seq, body FROM chat_messages WHERE message_id = ?", (m.get("id"),)
+                ).fetchone() if m.get("id") is not None else None
+                if row:
+                    self._chat_delta(json.loads(row[1]), -1, row[0])
+                    self._conn.execute("UPDATE chat_messages SET body = ? WHERE seq = ?", (_dumps(m), row[0]))
+                    self._chat_delta(m, 1, row[0])
+                else:
+                    seq = self._conn.execute(
+                        "INSERT INTO chat_messages (message_id, body) VALUES (?, ?)", (m.get("id"), _dumps(m))
+                    ).lastrowid
+                    self._chat_delta(m, 1, seq)
+
+    def patch_chat_message(self, message_id: str, fields: dict) -> Optional[dict]:
+        """메시지 일부 필드 갱신 후 전체 메시지 반환 (없으면 None)"""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT seq, body FROM chat_messages WHERE message_id = ?", (message_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            old = json.loads(row[1])
+            new = {**old, **fields, "id": old.get("id", message_id)}
+            self._chat_delta(old, -1, row[0])
+            self._conn.execute("UPDATE chat_messages SET body = ? WHERE seq = ?", (_dumps(new), row[0]))
+            self._chat_delta(new, 1, row[0])
+            return new
+
+    def chat_page(self, limit: int, before: Optional[int] = None) -> tuple[list[dict], Optional[int]]:
+        """최신순 페이지. before = 이전 페이지의 next_cursor (seq), 더 없으면 next_cursor=None"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, body FROM chat_messages WHERE seq < ? ORDER BY seq DESC LIMIT ?",
+                (before if before is not None else 2 ** 63 - 1, limit + 1),
+            ).fetchall()
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return [json.loads(body) for _, body in rows[:limit]], next_cursor
+
+    def clear_chat_messages(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM chat_messages")
+            self._reset_aggregates("chat_", "chat")
+
+    # ── 키 기반 목록 (reports / dashboards) ─────────────────────
+    def _list_keyed(self, table: str) -> list[dict]:
+        return self._rows(f"SELECT body FROM {table} ORDER BY sort_key")
+
+    def _get_keyed(self, table: str, key_col: str, key: str) -> Optional[dict]:
+        rows = self._rows(f"SELECT body FROM {table} WHERE {key_col} = ?", (key,))
+        return rows[0] if rows else None
+
+    def _upsert_keyed(self, table: str, key_col: str, key: str, record: dict):
+        """기존 키는 제자리 갱신, 새 키는 맨 앞에 추가"""
+        with self._lock, self._conn:
+            updated = self._conn.execute(
+                f"UPDATE {table} SET body = ? WHERE {key_col} = ?", (_dumps(record), key)
+            ).rowcount
+            if not updated:
+                self._conn.execute(
+                    f"INSERT INTO {table} ({key_col}, sort_key, body) "
+                    f"VALUES (?, (SELECT COALESCE(MIN(sort_key), 0) - 1 FROM {table}), ?)",
+                    (key, _dumps(record)),
+                )
+
+    def _delete_keyed(self, table: str, key_col: str, key: str):
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {table} WHERE {key_col} = ?", (key,))
+
+    def list_reports(self) -> list[dict]:
+        return self._list_keyed("reports")
+
+    def get_report(self, report_id: str) -> Optional[dict]:
+        return self._get_keyed("reports", "id", report_id)
+
+    def save_report(self, report: dict):
+        self._upsert_keyed("reports", "id", report.get("id", ""), report)
+
+    def update_report_status(self, report_id: str, status) -> bool:
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT body FROM reports WHERE id = ?", (report_id,)).fetchone()
+            if row is None:
+                return False
+            report = json.loads(row[0])
+            report["status"] = status
+            self._conn.execute("UPDATE reports SET body = ? WHERE id = ?", (_dumps(report), report_id))
+            return True
+
+    def delete_report(self, report_id: str):
+        self._delete_keyed("reports", "id", report_id)
+
+    def list_dashboards(self) -> list[dict]:
+        return self._list_keyed("dashboards")
+
+    def save_dashboard(self, dashboard: dict):
+        self._upsert_keyed("dashboards", "name", dashboard.get("name", ""), dashboard)
+
+    def delete_dashboard(self, name: str):
+        self._delete_keyed("dashboards", "name", name)
+
+    # ── 단일 값 (my_dashboard) ──────────────────────────────────
+    def get_value(self, key: str):
+        rows = self._rows("SELECT body FROM kv WHERE key = ?", (key,))
+        return rows[0] if rows else None
+
+    def set_value(self, key: str, value):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO kv (key, body) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET body = excluded.body",
+                (key, _dumps(value)),
+            )
+
+    def delete_value(self, key: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+
+
+# ── 기존 JSON 파일 가져오기 ──────────────────────────────────────
+
+JSON_FILES = {
+    "feedback": "feedback.json",
+    "chat_history": "chat_history.json",
+    "reports": "reports_user.json",
+    "dashboards": "dashboards.json",
+    "my_dashboard": "my_dashboard.json",
+}
+
+
+def _load_json(path: str):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        try:
+            return json.load(f)
+        except json.JSONDecodeError:
+            print(f"[store] JSON 파싱 실패, 건너뜀: {path}")
+            return None
+
+
+def import_json_files(store: Store, base_dir: str) -> dict:
+    """base_dir 의 기존 JSON 파일을 저장소로 가져오기 (대상 테이블은 파일 내용으로 교체)"""
+    imported = {}
+
+    feedback = _load_json(os.path.join(base_dir, JSON_FILES["feedback"]))
+    if isinstance(feedback, list):
+        with store._lock, store._conn:
+            store._conn.execute("DELETE FROM feedback")
+            store._conn.executemany(
+                "INSERT INTO feedback (message_id, body) VALUES (?, ?)",
+                [(r.get("message_id", ""), _dumps(r)) for r in feedback],
+            )
+        imported["feedback"] = len(feedback)
+
+    messages = _load_json(os.path.join(base_dir, JSON_FILES["chat_history"]))
+    if isinstance(messages, list):
+        store.replace_chat_messages(messages)
+        imported["chat_history"] = len(messages)
+
+    for name, table, key_col in (("reports", "reports", "id"), ("dashboards", "dashboards", "name")):
+        records = _load_json(os.path.join(base_dir, JSON_FILES[name]))
+        if not isinstance(records, list):
+            continue
+        with store._lock, store._conn:
+            store._conn.execute(f"DELETE FROM {table}")
+            store._conn.executemany(
+                f"INSERT OR REPLACE INTO {table} ({key_col}, sort_key, body) VALUES (?, ?, ?)",
+                [(r.get(key_col, ""), i, _dumps(r)) for i, r in enumerate(records)],
+            )
+        imported[name] = len(records)
+
+    my_dashboard = _load_json(os.path.join(base_dir, JSON_FILES["my_dashboard"]))
+    if my_dashboard is not None:
+        store.set_value("my_dashboard", my_dashboard)
+        imported["my_dashboard"] = 1
+
+    with store._lock, store._conn:
+        store._rebuild_aggregates()
+    return imported
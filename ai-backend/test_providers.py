@@ -0,0 +1,67 @@
+"""
+test_providers.py – 등록 프로바이더(Claude) 실제 생성 확인
+실행: python -m pytest test_providers.py   (또는 python test_providers.py)
+
+설치된 anthropic SDK로 ClaudeSQLVanna 를 실제로 만들어
+  - 공유 httpx 클라이언트 주입이 SDK에 받아들여지는지
+  - 주입이 TypeError 로 거부돼도 SDK 기본 클라이언트로 생성되는지
+  - _get_provider / available_providers 에서 사라지지 않는지
+를 확인한다. 네트워크 호출은 하지 않는다 (가짜 API 키, 임시 CHROMA_PATH).
+"""
+import os
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix="test_providers_")
+os.environ["CHROMA_PATH"] = os.path.join(_tmp, "chroma")
+os.environ["CLAUDE_API_KEY"] = "test-key"
+
+import anthropic  # noqa: E402
+import pytest  # noqa: E402
+
+import vanna_setup  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def _claude_key(monkeypatch):
+    # 다른 테스트가 vanna_setup 을 먼저 import 했으면 위 환경변수가 반영되지 않는다
+    monkeypatch.setattr(vanna_setup, "CLAUDE_API_KEY", "test-key")
+
+
+def test_claude_uses_pooled_client():
+    vanna = vanna_setup.ClaudeSQLVanna()
+    assert isinstance(vanna._client, anthropic.Anthropic)
+    client = vanna._client._client
+    assert _httpx_on_request_hooked(client), "공유 httpx 클라이언트(event hook)가 주입되지 않음"
+
+
+def test_claude_falls_back_when_client_rejected(monkeypatch):
+    original = anthropic.Anthropic
+
+    def reject_http_client(*args, **kwargs):
+        if "http_client" in kwargs:
+            raise TypeError("Invalid `http_client` argument")
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(anthropic, "Anthropic", reject_http_client)
+    vanna = vanna_setup.ClaudeSQLVanna()
+    assert isinstance(vanna._client, original)
+    assert not _httpx_on_request_hooked(vanna._client._client)
+
+
+def test_claude_provider_registered():
+    vanna_setup._provider_registry.pop("claude", None)
+    vanna_setup._provider_failed.discard("claude")
+    assert vanna_setup._get_provider("claude") is not None
+    assert "claude" not in vanna_setup._provider_failed
+    claude = next(p for p in vanna_setup.available_providers() if p["id"] == "claude")
+    assert claude["available"]
+
+
+def _httpx_on_request_hooked(client) -> bool:
+    return vanna_setup._httpx_on_request in client.event_hooks.get("request", [])
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(pytest.main([__file__, "-q"]))
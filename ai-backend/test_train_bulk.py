@@ -0,0 +1,91 @@
+"""
+test_train_bulk.py – 학습 스크립트 재실행 시 수정 전 항목 정리 확인
+실행: python -m pytest test_train_bulk.py   (또는 python test_train_bulk.py)
+
+임시 CHROMA_PATH 에 train.py 항목을 학습한 뒤 Golden SQL 하나를 고쳐 다시 학습하면
+  - 고친 항목은 새 id로 추가되고 이전 id는 삭제되는지
+  - 다른 스크립트(train_ncr) 태그·태그 없는 항목은 그대로인지
+를 확인한다. 임베딩 모델은 받지 않고 고정 벡터 임베딩을 쓴다.
+"""
+import hashlib
+import os
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix="test_train_bulk_")
+os.environ["CHROMA_PATH"] = os.path.join(_tmp, "chroma")
+os.environ.setdefault("LLM_PROVIDER", "sqlcoder")
+os.environ.setdefault("SQLCODER_MODE", "ollama")
+
+import pytest  # noqa: E402
+
+import train  # noqa: E402
+import vanna_setup  # noqa: E402
+
+DIM = 384   # DefaultEmbeddingFunction(all-MiniLM-L6-v2) 차원
+
+
+def _fixed_embedding(texts: list[str]) -> list[list[float]]:
+    return [[b / 255 for b in hashlib.sha256(text.encode("utf-8")).digest()] * (DIM // 32) for text in texts]
+
+
+@pytest.fixture()
+def vn(monkeypatch):
+    backend = vanna_setup.get_primary_vn()
+    monkeypatch.setattr(backend, "embedding_function", _fixed_embedding)
+    for training_type in backend.TRAINING_TYPES:
+        backend.delete_training(training_type=training_type)
+    monkeypatch.setattr(train, "vn", backend)
+    return backend
+
+
+def _sql_id(backend, question: str, sql: str) -> str:
+    return backend._training_record({"question": question, "sql": sql})[1]
+
+
+def _ids(backend) -> set[str]:
+    return {
+        id_
+        for collection in (backend.sql_collection, backend.ddl_collection, backend.documentation_collection)
+        for id_ in collection.get(include=[])["ids"]
+    }
+
+
+def test_edit_then_retrain_removes_old_id(vn, monkeypatch):
+    first = train.train_all()
+    assert first["failed"] == 0 and first["deleted"] == 0
+    items = train.golden_sql_items()
+    old = items[0]
+    old_id = _sql_id(vn, old["question"], old["sql"])
+    assert old_id in _ids(vn)
+
+    # 다른 스크립트 태그 항목과 관리자 화면에서 직접 학습한 항목(태그 없음)
+    other = vn.train_bulk([{"question": "NCR 비율", "sql": "SELECT 1"}], source=vanna_setup.training_source("train_ncr"))
+    assert other["added"] == 1
+    vn.train_bulk([{"question": "직접 학습", "sql": "SELECT 2"}])
+    manual_id = _sql_id(vn, "직접 학습", "SELECT 2")
+
+    edited = dict(old, sql=old["sql"] + " -- edited")
+    monkeypatch.setattr(train, "golden_sql_items", lambda: [edited] + items[1:])
+    second = train.train_all()
+
+    ids = _ids(vn)
+    assert second["added"] == 1
+    assert second["deleted"] == 1
+    assert old_id not in ids
+    assert _sql_id(vn, edited["question"], edited["sql"]) in ids
+    assert _sql_id(vn, "NCR 비율", "SELECT 1") in ids
+    assert manual_id in ids
+
+
+def test_retrain_without_changes_is_noop(vn):
+    train.train_all()
+    again = train.train_all()
+    assert again["added"] == 0
+    assert again["deleted"] == 0
+    assert again["skipped"] == len(train.training_items())
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(pytest.main([__file__, "-q"]))
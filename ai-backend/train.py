@@ -1,39 +1,41 @@
 """
-train.py – Vanna 학습 스크립트 (1회 실행)
+train.py – Vanna 학습 스크립트
 실행: python train.py
+내용 해시 id로 upsert하므로 반복 실행해도 바뀐 항목만 새로 임베딩한다.
+이 스크립트 태그(SOURCE) 항목 중 더 이상 만들어지지 않는 항목(수정 전 내용·삭제된 항목)은 지운다.
 """
 import json
 import os
-from vanna_setup import vn
+from vanna_setup import training_source, vn
 
 TRAINING_DIR = os.path.join(os.path.dirname(__file__), "training")
+SOURCE = training_source("train")
 
 
-def train_ddl():
+def _report(tag: str, result: dict):
+    print(
+        f"  [{tag}] 신규 {result['added']} / 변경 없음 {result['skipped']} / 실패 {result['failed']}"
+        f" / 삭제 {result['deleted']}"
+        f"  ({result['seconds']}s, {result['items_per_sec']} items/s)"
+    )
+
+
+def ddl_items() -> list[dict]:
     ddl_path = os.path.join(TRAINING_DIR, "ddl.sql")
     with open(ddl_path, encoding="utf-8") as f:
         ddl = f.read()
-
     # 각 CREATE TABLE 블록을 개별 학습
     blocks = [b.strip() for b in ddl.split(";") if "CREATE TABLE" in b]
-    for block in blocks:
-        try:
-            vn.train(ddl=block + ";")
-            table = block.split("TABLE IF NOT EXISTS")[-1].split("(")[0].strip()
-            print(f"  [DDL] {table} 학습 완료")
-        except Exception as e:
-            print(f"  [DDL] 오류: {e}")
+    return [{"ddl": block + ";"} for block in blocks]
 
 
-def train_documentation():
+def documentation_items() -> list[dict]:
     doc_path = os.path.join(TRAINING_DIR, "documentation.md")
     with open(doc_path, encoding="utf-8") as f:
-        doc = f.read()
-    vn.train(documentation=doc)
-    print("  [DOC] 비즈니스 문서 학습 완료")
+        return [{"documentation": f.read()}]
 
 
-def train_golden_sql():
+def golden_sql_items() -> list[dict]:
     filename = os.getenv("GOLDEN_SQL_FILE", "golden_sql.json")
     json_path = os.path.join(TRAINING_DIR, filename)
     if not os.path.exists(json_path):
@@ -41,20 +43,25 @@ def train_golden_sql():
     print(f"  [SQL] 파일: {os.path.basename(json_path)}")
     with open(json_path, encoding="utf-8") as f:
         pairs = json.load(f)
-    for pair in pairs:
-        try:
-            vn.train(question=pair["question"], sql=pair["sql"])
-            print(f"  [SQL] 학습: {pair['question'][:40]}")
-        except Exception as e:
-            print(f"  [SQL] 오류 ({pair['question'][:30]}): {e}")
+    return [{"question": pair["question"], "sql": pair["sql"]} for pair in pairs]
+
+
+def training_items() -> list[dict]:
+    return ddl_items() + documentation_items() + golden_sql_items()
+
+
+def train_all() -> dict:
+    """
+    DDL·문서·Golden SQL 을 한 번에 학습 (prune 범위가 컬렉션 전체이므로 섹션별로 나눠 호출하지 않음).
+    수정된 항목은 새 id로 추가되고 이전 내용의 id는 삭제된다.
+    """
+    return vn.train_bulk(training_items(), source=SOURCE, prune=True)
 
 
 if __name__ == "__main__":
     print("=== Vanna 학습 시작 ===\n")
-    print("[1/3] DDL 학습...")
-    train_ddl()
-    print("\n[2/3] 비즈니스 문서 학습...")
-    train_documentation()
-    print("\n[3/3] Golden SQL 학습...")
-    train_golden_sql()
+    print(f"[1/3] DDL {len(ddl_items())}개")
+    print(f"[2/3] 비즈니스 문서 {len(documentation_items())}개")
+    print(f"[3/3] Golden SQL {len(golden_sql_items())}개\n")
+    _report("ALL", train_all())
     print("\n=== 학습 완료 ===")
@@ -1,11 +1,15 @@
 """
 train_ncr.py - NCR 관련 4개 테이블 증분 학습
 기존 ChromaDB를 건드리지 않고 새 테이블만 추가 학습합니다.
+내용 해시 id로 upsert하므로 반복 실행해도 바뀐 항목만 새로 임베딩합니다.
+이 스크립트 태그(SOURCE) 항목 중 더 이상 만들어지지 않는 항목(수정 전 내용·삭제된 항목)은 지웁니다.
 
 실행: cd ai-backend && python train_ncr.py
 """
 import re
-from vanna_setup import vn
+from vanna_setup import training_source, vn
+
+SOURCE = training_source("train_ncr")
 
 # ── 기존 create 파일에서 DDL·코멘트 임포트 ────────────────────
 from db.create_td_irncr import DDL as _RAW_IRNCR, COLUMN_COMMENTS as _CMT_IRNCR
@@ -36,14 +40,16 @@ TABLE_DESC = {
 }
 
 
-def train_ddl():
-    print("[1/3] DDL 학습...")
-    for table, ddl in DDL_MAP.items():
-        try:
-            vn.train(ddl=ddl)
-            print(f"  [DDL] {table} ({TABLE_DESC[table]}) 학습 완료")
-        except Exception as e:
-            print(f"  [DDL] {table} 오류: {e}")
+def _report(tag: str, result: dict):
+    print(
+        f"  [{tag}] 신규 {result['added']} / 변경 없음 {result['skipped']} / 실패 {result['failed']}"
+        f" / 삭제 {result['deleted']}"
+        f"  ({result['seconds']}s, {result['items_per_sec']} items/s)"
+    )
+
+
+def ddl_items() -> list[dict]:
+    return [{"ddl": ddl} for ddl in DDL_MAP.values()]
 
 
 # ── 2. 비즈니스 문서 학습 ─────────────────────────────────────
@@ -145,13 +151,8 @@ NCR 시장위험 항목별 산출 결과를 저장합니다.
 """
 
 
-def train_documentation():
-    print("[2/3] 비즈니스 문서 학습...")
-    try:
-        vn.train(documentation=DOCUMENTATION)
-        print("  [DOC] NCR 테이블 문서 학습 완료")
-    except Exception as e:
-        print(f"  [DOC] 오류: {e}")
+def documentation_items() -> list[dict]:
+    return [{"documentation": DOCUMENTATION}]
 
 
 # ── 3. Golden SQL 학습 ────────────────────────────────────────
@@ -385,25 +386,29 @@ GOLDEN_SQL = [
 ]
 
 
-def train_golden_sql():
-    print("[3/3] Golden SQL 학습...")
-    ok = 0
-    for pair in GOLDEN_SQL:
-        try:
-            vn.train(question=pair["question"], sql=pair["sql"])
-            print(f"  [SQL] {pair['question'][:50]}")
-            ok += 1
-        except Exception as e:
-            print(f"  [SQL] 오류 ({pair['question'][:30]}): {e}")
-    print(f"  → {ok}/{len(GOLDEN_SQL)}개 완료")
+def golden_sql_items() -> list[dict]:
+    return [{"question": pair["question"], "sql": pair["sql"]} for pair in GOLDEN_SQL]
+
+
+def training_items() -> list[dict]:
+    return ddl_items() + documentation_items() + golden_sql_items()
+
+
+def train_all() -> dict:
+    """
+    DDL·문서·Golden SQL 을 한 번에 학습 (prune 범위가 컬렉션 전체이므로 섹션별로 나눠 호출하지 않음).
+    수정된 항목은 새 id로 추가되고 이전 내용의 id는 삭제된다.
+    """
+    return vn.train_bulk(training_items(), source=SOURCE, prune=True)
 
 
 # ── 실행 ──────────────────────────────────────────────────────
 if __name__ == "__main__":
     print("=== NCR 테이블 증분 학습 시작 ===\n")
-    train_ddl()
-    print()
-    train_documentation()
-    print()
-    train_golden_sql()
+    print(f"[1/3] DDL {len(ddl_items())}개")
+    for table in DDL_MAP:
+        print(f"  [DDL] {table} ({TABLE_DESC[table]})")
+    print(f"[2/3] 비즈니스 문서 {len(documentation_items())}개")
+    print(f"[3/3] Golden SQL {len(golden_sql_items())}개\n")
+    _report("ALL", train_all())
     print("\n=== 학습 완료 ===")
@@ -19,13 +19,21 @@ vanna_setup.py – Vanna AI + SQLCoder 이중 파이프라인 (v3 - Defog 유료
                                        ↓ 실패
                                   503 에러 반환
 """
+import json
 import os
+import random
 import re
 import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
 
 import pandas as pd
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 from vanna.chromadb import ChromaDB_VectorStore
 
 load_dotenv()
@@ -54,6 +62,14 @@ GEMINI_MODEL   = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
 CLAUDE_API_KEY = os.getenv("CLAUDE_API_KEY", "")
 CLAUDE_MODEL   = os.getenv("CLAUDE_MODEL", "claude-haiku-4-5-20251001")
 
+# 생성 SQL 실행 제한 — 0 = 비활성
+SQL_TIMEOUT_SECONDS   = float(os.getenv("SQL_TIMEOUT_SECONDS", "30"))    # 쿼리당 statement timeout
+SQL_MAX_COST          = float(os.getenv("SQL_MAX_COST", "0"))            # EXPLAIN Total Cost 상한 (PostgreSQL)
+SQL_MAX_PLAN_ROWS     = float(os.getenv("SQL_MAX_PLAN_ROWS", "0"))       # EXPLAIN Plan Rows 상한 (PostgreSQL)
+SQL_RETRY_ATTEMPTS    = int(os.getenv("SQL_RETRY_ATTEMPTS", "3"))        # 일시적 오류 포함 총 실행 횟수
+SQL_RETRY_BASE_DELAY  = float(os.getenv("SQL_RETRY_BASE_DELAY", "0.2"))  # 백오프 기준(초), 시도마다 2배
+SQL_RETRY_MAX_DELAY   = float(os.getenv("SQL_RETRY_MAX_DELAY", "2"))
+
 # 범용 Ollama fallback 모델 (로컬)
 FALLBACK_OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2:latest")
 
@@ -150,6 +166,96 @@ SQL hints:
 - amount unit: 억원"""
 
 
+# ── HTTP 연결 풀 (Ollama / Groq / Claude 공용) ─────────────────────
+# 요청마다 새 TCP 연결을 여는 대신 keep-alive 세션을 재사용.
+# 풀 크기는 main.py의 LLM 스레드 풀(LLM_WORKERS)과 맞춘다.
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", os.getenv("LLM_WORKERS", "8")))
+GROQ_BASE_URL  = "https://api.groq.com/openai/v1"
+
+_http_session = requests.Session()
+_http_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE))
+_http_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE))
+
+_httpx_stats: dict[str, dict] = {}   # host → {"requests": n, "connections": n}
+_httpx_stats_lock = threading.Lock()
+_groq_client = None
+_groq_client_lock = threading.Lock()
+
+
+def http_session() -> requests.Session:
+    """Ollama 등 requests 기반 호출용 공유 세션"""
+    return _http_session
+
+
+def _count_httpx(host: str, key: str):
+    with _httpx_stats_lock:
+        stats = _httpx_stats.setdefault(host, {"requests": 0, "connections": 0})
+        stats[key] += 1
+
+
+def _httpx_on_request(request):
+    host = request.url.host
+
+    def trace(event_name: str, info: dict):
+        if event_name == "connection.connect_tcp.complete":
+            _count_httpx(host, "connections")
+
+    request.extensions["trace"] = trace
+    _count_httpx(host, "requests")
+
+
+def pooled_httpx_client(client_cls=None):
+    """
+    OpenAI/Anthropic SDK에 주입할 keep-alive httpx 클라이언트 (호스트별 연결 재사용 집계).
+    client_cls: SDK가 요구하는 클라이언트 클래스 (예: anthropic.DefaultHttpxClient).
+                SDK가 httpx 대신 httpx2 등을 쓰면 Limits/Timeout도 그 패키지 것으로 생성.
+    """
+    import httpx
+    module = httpx
+    if client_cls is not None:
+        base = next((c for c in client_cls.__mro__ if c.__name__ == "Client"), None)
+        if base is not None:
+            module = sys.modules.get(base.__module__.split(".")[0], httpx)
+    return (client_cls or httpx.Client)(
+        limits=module.Limits(max_connections=HTTP_POOL_SIZE, max_keepalive_connections=HTTP_POOL_SIZE),
+        timeout=module.Timeout(120.0, connect=10.0),
+        event_hooks={"request": [_httpx_on_request]},
+    )
+
+
+def groq_client():
+    """Groq(OpenAI 호환) 공유 클라이언트 — 최초 호출 시 1회 생성"""
+    global _groq_client
+    with _groq_client_lock:
+        if _groq_client is None:
+            from openai import OpenAI
+            _groq_client = OpenAI(
+                api_key=GROQ_API_KEY,
+                base_url=GROQ_BASE_URL,
+                http_client=pooled_httpx_client(),
+            )
+        return _groq_client
+
+
+def http_pool_stats() -> dict:
+    """호스트별 요청 수 / 새 연결 수 / 재사용 수"""
+    result: dict[str, dict] = {}
+    for adapter in set(_http_session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = f"{pool.host}:{pool.port}"
+            result[host] = {"requests": pool.num_requests, "connections": pool.num_connections}
+    with _httpx_stats_lock:
+        for host, stats in _httpx_stats.items():
+            result[host] = dict(stats)
+    for stats in result.values():
+        stats["reused"] = max(0, stats["requests"] - stats["connections"])
+    return result
+
+
 # ── SQL 후처리 ───────────────────────────────────────────────────
 
 def _clean_sql(raw: str) -> str:
@@ -225,38 +331,678 @@ if DATABASE_URL:
     )
 
 
-def _run_sql(sql: str) -> pd.DataFrame:
+class SQLRejected(Exception):
+    """
+    실행 제한에 걸린 쿼리 (_run_sql 내부 재시도 대상 아님)
+    reason: cost(EXPLAIN 추정치 초과) | timeout(statement timeout) | cancelled(클라이언트 연결 종료)
+    """
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+class QueryCancel:
+    """
+    실행 중인 쿼리 취소 핸들. _run_sql 이 실행 동안 DB별 취소 함수를 bind 하고,
+    다른 스레드(이벤트 루프)에서 cancel() 하면 서버 측 쿼리를 중단시킨다.
+      PostgreSQL: psycopg2 connection.cancel()   SQLite: connection.interrupt()
+    취소 함수는 잠금을 쥔 채 호출 — unbind 후 풀에 반납된 연결을 재사용하는 다른 쿼리를 끊지 않도록
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancel_fn = None
+        self.cancelled = False
+
+    def bind(self, fn):
+        with self._lock:
+            self._cancel_fn = fn
+            if self.cancelled:
+                self._call(fn)
+
+    def unbind(self):
+        with self._lock:
+            self._cancel_fn = None
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            if self._cancel_fn is not None:
+                self._call(self._cancel_fn)
+
+    @staticmethod
+    def _call(fn):
+        try:
+            fn()
+        except Exception as e:
+            print(f"[db] 쿼리 취소 실패 (무시): {e}")
+
+
+def _check_plan(conn, sql: str):
+    """EXPLAIN 추정 비용·행 수가 상한을 넘으면 실행 전에 거절 (PostgreSQL 전용)"""
+    if not (SQL_MAX_COST or SQL_MAX_PLAN_ROWS):
+        return
+    from sqlalchemy import text
+    plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    # 최상위 노드만 보면 LIMIT(_limit_sql 래핑)이 비용·행 수를 잘라 보이게 하므로 전체 노드의 최댓값 사용
+    cost, rows = _plan_max(plan[0]["Plan"])
+    if SQL_MAX_COST and cost > SQL_MAX_COST:
+        raise SQLRejected("cost", f"쿼리 예상 비용이 너무 큽니다 (cost {cost:,.0f} > {SQL_MAX_COST:,.0f}). 조인 조건을 확인해주세요.")
+    if SQL_MAX_PLAN_ROWS and rows > SQL_MAX_PLAN_ROWS:
+        raise SQLRejected("cost", f"쿼리 예상 행 수가 너무 많습니다 ({rows:,.0f} > {SQL_MAX_PLAN_ROWS:,.0f}행). 조건을 좁혀주세요.")
+
+
+def _plan_max(node: dict) -> tuple[float, float]:
+    """플랜 트리 전체의 (최대 Total Cost, 최대 Plan Rows)"""
+    cost, rows = node.get("Total Cost", 0), node.get("Plan Rows", 0)
+    for child in node.get("Plans", ()):
+        child_cost, child_rows = _plan_max(child)
+        cost, rows = max(cost, child_cost), max(rows, child_rows)
+    return cost, rows
+
+
+def _prepare_pg(conn, sql: str, cancel: Optional[QueryCancel]):
+    """실행 전 공통 설정: statement timeout, EXPLAIN 비용 검사, 취소 핸들 연결"""
+    from sqlalchemy import text
+    if SQL_TIMEOUT_SECONDS:
+        # SET LOCAL: 이 트랜잭션에만 적용, 연결 반납(rollback) 시 원복
+        conn.execute(text(f"SET LOCAL statement_timeout = {int(SQL_TIMEOUT_SECONDS * 1000)}"))
+    _check_plan(conn, sql)
+    if cancel is not None:
+        cancel.bind(_dbapi_connection(conn).cancel)
+
+
+def _dbapi_connection(conn):
+    """SQLAlchemy Connection → psycopg2 connection (1.4 / 2.x 호환)"""
+    fairy = conn.connection
+    return getattr(fairy, "dbapi_connection", None) or fairy.connection
+
+
+def _interrupted(cancel: Optional[QueryCancel]) -> SQLRejected:
+    if cancel is not None and cancel.cancelled:
+        return SQLRejected("cancelled", "클라이언트 연결 종료로 쿼리를 취소했습니다.")
+    return SQLRejected("timeout", f"쿼리 실행 시간이 {SQL_TIMEOUT_SECONDS:g}초를 초과했습니다.")
+
+
+# ── 오류 분류 / 재시도 ────────────────────────────────────────────
+# transient: 연결 끊김·풀 대기 초과·직렬화 실패·교착 등 다시 실행하면 성공할 수 있는 오류 → 재시도
+# permanent: 문법 오류·없는 컬럼/테이블·형 변환 오류 등 LLM이 SQL을 다시 만들어야 하는 오류 → 즉시 실패
+# (SQLRejected 는 분류 전에 따로 집계)
+
+# SQLSTATE 앞자리(클래스) 또는 전체 코드
+_TRANSIENT_SQLSTATES = ("08", "40001", "40P01", "53", "57P01", "57P02", "57P03")
+_TRANSIENT_MESSAGES = ("database is locked", "connection reset", "server closed the connection",
+                       "could not connect", "timeout expired")
+
+_sql_error_lock = threading.Lock()
+_sql_error_counts = {"transient": 0, "permanent": 0, "rejected": 0, "retried": 0, "recovered": 0}
+
+
+def classify_sql_error(e: Exception) -> str:
+    """transient | permanent"""
+    pgcode = getattr(getattr(e, "orig", None), "pgcode", None) or getattr(e, "pgcode", None)
+    if pgcode:
+        return "transient" if pgcode.startswith(_TRANSIENT_SQLSTATES) else "permanent"
+    # SQLAlchemy: 풀 대기 초과(TimeoutError), 끊긴 연결(connection_invalidated / DisconnectionError)
+    if getattr(e, "connection_invalidated", False):
+        return "transient"
+    if type(e).__module__.startswith("sqlalchemy") and type(e).__name__ in ("TimeoutError", "DisconnectionError"):
+        return "transient"
+    if isinstance(e, (ConnectionError, TimeoutError)):
+        return "transient"
+    message = str(e).lower()
+    return "transient" if any(m in message for m in _TRANSIENT_MESSAGES) else "permanent"
+
+
+def _count_sql_error(kind: str):
+    with _sql_error_lock:
+        _sql_error_counts[kind] += 1
+
+
+def sql_error_stats() -> dict:
+    with _sql_error_lock:
+        return dict(_sql_error_counts)
+
+
+def _retry_delay(attempt: int) -> float:
+    """지수 백오프 + full jitter: [0, min(max, base·2^attempt)]"""
+    return random.uniform(0, min(SQL_RETRY_MAX_DELAY, SQL_RETRY_BASE_DELAY * (2 ** attempt)))
+
+
+def _run_sql_pg(sql: str, cancel: Optional[QueryCancel]) -> pd.DataFrame:
+    from sqlalchemy import text
+    try:
+        with _pg_engine.connect() as conn:
+            _prepare_pg(conn, sql, cancel)
+            try:
+                return pd.read_sql(text(sql), conn)
+            finally:
+                if cancel is not None:
+                    cancel.unbind()
+    except SQLRejected:
+        raise
+    except Exception as e:
+        # 57014 query_canceled: statement timeout 또는 cancel()
+        if getattr(getattr(e, "orig", None), "pgcode", None) == "57014":
+            raise _interrupted(cancel) from e
+        raise
+
+
+def _run_sql_sqlite(sql: str, cancel: Optional[QueryCancel]) -> pd.DataFrame:
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    if SQL_TIMEOUT_SECONDS:
+        deadline = time.monotonic() + SQL_TIMEOUT_SECONDS
+        # VM 명령 10만 개마다 확인, 0 이 아닌 값을 반환하면 SQLite가 쿼리 중단
+        conn.set_progress_handler(lambda: time.monotonic() > deadline, 100000)
+    if cancel is not None:
+        cancel.bind(conn.interrupt)
+    try:
+        return pd.read_sql(sql, conn)
+    except Exception as e:
+        if "interrupted" in str(e):
+            raise _interrupted(cancel) from e
+        raise
+    finally:
+        if cancel is not None:
+            cancel.unbind()
+        conn.close()
+
+
+def _run_sql(sql: str, cancel: Optional[QueryCancel] = None) -> pd.DataFrame:
+    """
+    생성 SQL 실행. SQL_TIMEOUT_SECONDS 초과 시 서버 측에서 중단, cancel 로 외부 취소 가능.
+    일시적 오류만 지터 백오프로 최대 SQL_RETRY_ATTEMPTS회 실행하고, 잘못된 SQL(permanent)과
+    SQLRejected(비용·시간 초과·취소)는 바로 올려 ask_with_retry 가 곧바로 SQL을 재생성하게 한다.
+    """
+    if cancel is not None and cancel.cancelled:
+        raise _interrupted(cancel)
+    run = _run_sql_pg if _pg_engine is not None else _run_sql_sqlite
+    attempts = max(1, SQL_RETRY_ATTEMPTS)
+    for attempt in range(attempts):
+        try:
+            df = run(sql, cancel)
+            if attempt:
+                _count_sql_error("recovered")
+            return df
+        except SQLRejected:
+            _count_sql_error("rejected")
+            raise
+        except Exception as e:
+            kind = classify_sql_error(e)
+            _count_sql_error(kind)
+            if kind == "permanent" or attempt + 1 >= attempts or (cancel is not None and cancel.cancelled):
+                raise
+            delay = _retry_delay(attempt)
+            print(f"[db] 일시적 오류, {delay:.2f}초 후 재시도 ({attempt + 1}/{attempts}): {e}")
+            _count_sql_error("retried")
+            time.sleep(delay)
+
+
+def iter_sql(sql: str, chunksize: int = 50000, cancel: Optional[QueryCancel] = None):
+    """
+    SQL 결과를 chunksize행 DataFrame 단위로 순차 반환 (대용량 내보내기용).
+    PostgreSQL은 stream_results(서버 측 named cursor)로, SQLite는 커서 fetchmany로 읽어
+    전체 결과를 메모리에 올리지 않는다. 재시도 없음 (이미 내보낸 조각은 되돌릴 수 없음)
+    LIMIT 래핑이 없으므로 _run_sql 과 같은 statement timeout·EXPLAIN 검사·취소 핸들을 적용한다.
+    timeout 은 조각(FETCH) 단위 — 전체 내보내기 시간이 아니라 한 조각을 읽는 시간을 제한.
+    조각마다 다른 스레드에서 next() 될 수 있음 (StreamingResponse 순회) → SQLite check_same_thread=False.
+    제너레이터를 close() 하면 커서와 연결을 바로 반납한다.
+    """
+    if cancel is not None and cancel.cancelled:
+        raise _interrupted(cancel)
+    chunks = None
     if _pg_engine is not None:
         from sqlalchemy import text
-        last_err = None
-        for attempt in range(3):  # 최대 3회 재시도
-            try:
-                with _pg_engine.connect() as conn:
-                    return pd.read_sql(text(sql), conn)
-            except Exception as e:
-                last_err = e
-                print(f"[db] SQL 실행 실패 (시도 {attempt + 1}/3): {e}")
-                if attempt < 2:
-                    import time
-                    time.sleep(1)
-        raise last_err
+        conn = _pg_engine.connect()
+        try:
+            _prepare_pg(conn, sql, cancel)
+            streaming = conn.execution_options(stream_results=True, max_row_buffer=chunksize)
+            chunks = pd.read_sql(text(sql), streaming, chunksize=chunksize)
+            yield from chunks
+        except SQLRejected:
+            raise
+        except Exception as e:
+            if getattr(getattr(e, "orig", None), "pgcode", None) == "57014":
+                raise _interrupted(cancel) from e
+            raise
+        finally:
+            if chunks is not None:
+                chunks.close()
+            if cancel is not None:
+                cancel.unbind()
+            conn.close()
     else:
-        conn = sqlite3.connect(DB_PATH)
+        conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+        deadline = [float("inf")]
+        if SQL_TIMEOUT_SECONDS:
+            conn.set_progress_handler(lambda: time.monotonic() > deadline[0], 100000)
+        if cancel is not None:
+            cancel.bind(conn.interrupt)
         try:
-            return pd.read_sql(sql, conn)
+            while True:
+                deadline[0] = time.monotonic() + SQL_TIMEOUT_SECONDS
+                try:
+                    # 첫 조각: read_sql 이 쿼리를 실행해 첫 행까지 진행 (집계 쿼리는 여기서 전부 계산)
+                    if chunks is None:
+                        chunks = pd.read_sql(sql, conn, chunksize=chunksize)
+                    chunk = next(chunks)
+                except StopIteration:
+                    return
+                except Exception as e:
+                    if "interrupted" in str(e):
+                        raise _interrupted(cancel) from e
+                    raise
+                deadline[0] = float("inf")    # 클라이언트 수신 대기 시간은 제외
+                yield chunk
         finally:
+            if chunks is not None:
+                chunks.close()
+            if cancel is not None:
+                cancel.unbind()
             conn.close()
 
 
+# ── 데이터 버전 (결과 캐시 무효화 기준) ──────────────────────────
+
+# 적재 배치로 기준일자가 갱신되는 테이블
+_VERSIONED_TABLES = ("td_irncr", "td_irpos", "td_dmaqfx")
+
+
+def fetch_data_version() -> tuple:
+    """db/.data_version 마커 + 주요 테이블 MAX(std_date). 재시도 없이 1회 조회"""
+    from db.data_version import read_data_version
+
+    version = [read_data_version()]
+    for table in _VERSIONED_TABLES:
+        sql = f"SELECT MAX(std_date) FROM {table}"
+        try:
+            if _pg_engine is not None:
+                from sqlalchemy import text
+                with _pg_engine.connect() as conn:
+                    version.append(conn.execute(text(sql)).scalar())
+            else:
+                conn = sqlite3.connect(DB_PATH)
+                try:
+                    version.append(conn.execute(sql).fetchone()[0])
+                finally:
+                    conn.close()
+        except Exception:
+            version.append(None)  # 테이블 없음 (SQLite fallback 등)
+    return tuple(str(v) if v is not None else None for v in version)
+
+
+def _read_ollama_stream(resp, on_token, extract) -> str:
+    """Ollama 스트리밍 응답(NDJSON)을 읽어 토큰마다 on_token 호출, 전체 텍스트 반환"""
+    parts = []
+    with resp:
+        for line in resp.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            text = extract(chunk)
+            if text:
+                parts.append(text)
+                on_token(text)
+            if chunk.get("done"):
+                break
+    return "".join(parts)
+
+
+# ── 질문 임베딩 / 유사 질문 검색 캐시 ──────────────────────────────
+# 질문 1건당 관련성 검사(main.is_question_relevant) → Primary RAG → Fallback RAG에서
+# 같은 질문을 반복 임베딩·검색하던 것을 1회로 줄인다. 모든 백엔드 인스턴스가 공유.
+
+class _LRU:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._items), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+_question_embeddings = _LRU(int(os.getenv("EMBEDDING_CACHE_SIZE", "1024")))   # 질문 → 임베딩
+_similar_sql_results = _LRU(int(os.getenv("EMBEDDING_CACHE_SIZE", "1024")))   # (질문, n) → (few-shot, 최소 거리)
+
+
+def embedding_cache_stats() -> dict:
+    return {"embeddings": _question_embeddings.stats(), "similar_sql": _similar_sql_results.stats()}
+
+
+# ── 공유 벡터 스토어 ─────────────────────────────────────────────
+# 백엔드마다 ChromaDB_VectorStore.__init__ 를 호출하면 같은 CHROMA_PATH 에 대해
+# PersistentClient 가 백엔드 수만큼 열린다. 클라이언트·임베딩 모델을 1개만 만들어
+# 모든 백엔드가 같은 컬렉션을 사용하도록 config 로 주입한다.
+_chroma_client = None
+_embedding_function = None
+_chroma_lock = threading.Lock()
+
+
+def _shared_chroma_config() -> dict:
+    global _chroma_client, _embedding_function
+    with _chroma_lock:
+        if _chroma_client is None:
+            import chromadb
+            from chromadb.config import Settings
+            from chromadb.utils import embedding_functions
+            _chroma_client = chromadb.PersistentClient(
+                path=CHROMA_PATH, settings=Settings(anonymized_telemetry=False)
+            )
+            _embedding_function = embedding_functions.DefaultEmbeddingFunction()
+    return {
+        "path": CHROMA_PATH,
+        "client": _chroma_client,
+        "embedding_function": _embedding_function,
+        "n_results": 3,
+    }
+
+
 # ════════════════════════════════════════════════════════════════
 #  백엔드 클래스
 # ════════════════════════════════════════════════════════════════
 
+_DELETE_BATCH = 5000    # Chroma 1회 호출 최대 건수(get_max_batch_size) 이하로 유지
+
+
+def _delete_ids(collection, ids: list[str]) -> int:
+    """id 목록을 배치 단위로 삭제"""
+    for i in range(0, len(ids), _DELETE_BATCH):
+        collection.delete(ids=ids[i:i + _DELETE_BATCH])
+    return len(ids)
+
+
+def _training_row(training_type: str, id_: str, doc: str) -> dict:
+    """Chroma 문서 → get_training_data() 행 형식"""
+    if training_type == "sql":
+        try:
+            pair = json.loads(doc)
+            return {"id": id_, "question": pair.get("question"), "content": pair.get("sql"), "training_data_type": "sql"}
+        except (TypeError, ValueError):
+            pass
+    return {"id": id_, "question": None, "content": doc, "training_data_type": training_type}
+
+
+# train.py / train_ncr.py 에서 온 학습 항목의 출처 태그 접두사.
+# 스크립트마다 training_source(스크립트명) 태그를 달고, 재학습 시 자기 태그 항목만 정리한다.
+# 접두사만 있는 태그는 스크립트별 태그 도입 이전에 학습된 항목.
+TRAINING_FILES_SOURCE = "training_files"
+
+
+def training_source(script: str) -> str:
+    """학습 스크립트별 출처 태그 (예: training_files:train)"""
+    return f"{TRAINING_FILES_SOURCE}:{script}"
+
+
 class _VannaBase:
-    """공통 인터페이스"""
+    """공통 인터페이스 + 공유 유사 질문 검색 (ChromaDB_VectorStore 앞에 두어 검색 메서드 대체)"""
     def generate_sql(self, question: str, **kwargs) -> str:
         raise NotImplementedError
 
+    def embed_question(self, question: str) -> list:
+        embedding = _question_embeddings.get(question)
+        if embedding is None:
+            embedding = list(self.embedding_function([question])[0])
+            _question_embeddings.put(question, embedding)
+        return embedding
+
+    def search_similar_sql(self, question: str) -> tuple[list, Optional[float]]:
+        """sql 컬렉션 1회 검색 → (few-shot 예시 목록, 최소 거리). 결과는 질문 단위로 캐시"""
+        key = (question, self.n_results_sql)
+        cached = _similar_sql_results.get(key)
+        if cached is not None:
+            return cached
+        results = self.sql_collection.query(
+            query_embeddings=[self.embed_question(question)],
+            n_results=self.n_results_sql,
+            include=["documents", "distances"],
+        )
+        distances = (results.get("distances") or [[]])[0]
+        found = (
+            ChromaDB_VectorStore._extract_documents(results),
+            min(distances) if distances else None,
+        )
+        _similar_sql_results.put(key, found)
+        return found
+
+    def get_similar_question_sql(self, question: str, **kwargs) -> list:
+        return self.search_similar_sql(question)[0]
+
+    # 학습 데이터가 바뀌면 검색 결과 캐시 무효화 (임베딩은 질문 텍스트 기준이라 유지)
+    def add_question_sql(self, question: str, sql: str, **kwargs) -> str:
+        id_ = super().add_question_sql(question, sql, **kwargs)
+        _similar_sql_results.clear()
+        return id_
+
+    def remove_training_data(self, id: str, **kwargs) -> bool:
+        removed = super().remove_training_data(id, **kwargs)
+        _similar_sql_results.clear()
+        return removed
+
+    # ── 일괄 삭제 ────────────────────────────────────────────────
+    def _training_collections(self, training_type: Optional[str] = None) -> list:
+        collections = {
+            "sql": self.sql_collection,
+            "ddl": self.ddl_collection,
+            "documentation": self.documentation_collection,
+        }
+        return [collections[training_type]] if training_type else list(collections.values())
+
+    def find_training_ids(self, contains: list[str], training_type: Optional[str] = None) -> list[str]:
+        """문서 내용에 contains 중 하나라도 포함된(대소문자 무시) 학습 항목 id"""
+        needles = [c.lower() for c in contains]
+        ids = []
+        for collection in self._training_collections(training_type):
+            found = collection.get(include=["documents"])
+            ids += [
+                id_ for id_, doc in zip(found["ids"], found["documents"])
+                if doc and any(n in doc.lower() for n in needles)
+            ]
+        return ids
+
+    def delete_training(
+        self,
+        ids: Optional[list[str]] = None,
+        where: Optional[dict] = None,
+        training_type: Optional[str] = None,
+    ) -> int:
+        """
+        학습 항목 일괄 삭제 (컬렉션당 1회 조회 + 배치 delete). 삭제 건수 반환.
+          ids           : id 목록 (-sql/-ddl/-doc 접미사로 컬렉션 구분)
+          where         : metadata 필터 (예: {"source": TRAINING_FILES_SOURCE})
+          training_type : sql | ddl | documentation — ids/where 없으면 해당 타입 전체
+        """
+        deleted = 0
+        if ids is not None:
+            by_suffix = {"-sql": self.sql_collection, "-ddl": self.ddl_collection, "-doc": self.documentation_collection}
+            for suffix, collection in by_suffix.items():
+                matched = [id_ for id_ in ids if id_.endswith(suffix)]
+                if matched:
+                    deleted += _delete_ids(collection, matched)
+        else:
+            for collection in self._training_collections(training_type):
+                found = collection.get(where=where, include=[]) if where else collection.get(include=[])
+                deleted += _delete_ids(collection, found["ids"])
+        if deleted:
+            _similar_sql_results.clear()
+        return deleted
+
+    # ── 학습 데이터 페이지 조회 ──────────────────────────────────
+    # get_training_data()는 모든 컬렉션을 DataFrame으로 만든다. 관리자 화면은
+    # 컬렉션을 limit/offset 으로 읽고 커서("타입:offset")로 다음 페이지를 이어간다.
+    TRAINING_TYPES = ("sql", "ddl", "documentation")
+
+    def training_page(
+        self,
+        training_type: Optional[str] = None,
+        contains: Optional[str] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        page_size: int = 500,
+    ) -> tuple[list[dict], Optional[str]]:
+        """
+        (항목 목록, 다음 커서) 반환. 항목 형식은 get_training_data() 행과 동일.
+        limit=None 이면 끝까지 page_size 단위로 읽어 전체 반환 (next_cursor=None).
+        contains: 문서 부분 문자열 필터 (Chroma where_document $contains, 대소문자 구분)
+        """
+        types = [training_type] if training_type else list(self.TRAINING_TYPES)
+        start_type, offset = types[0], 0
+        if cursor:
+            start_type, _, raw_offset = cursor.partition(":")
+            if start_type not in types or not raw_offset.isdigit():
+                raise ValueError(f"잘못된 커서: {cursor}")
+            offset = int(raw_offset)
+
+        where_document = {"$contains": contains} if contains else None
+        items: list[dict] = []
+        for t in types[types.index(start_type):]:
+            collection = self._training_collections(t)[0]
+            while limit is None or len(items) < limit:
+                want = page_size if limit is None else min(page_size, limit - len(items))
+                found = collection.get(
+                    limit=want, offset=offset, where_document=where_document, include=["documents"],
+                )
+                for id_, doc in zip(found["ids"], found["documents"]):
+                    items.append(_training_row(t, id_, doc))
+                offset += len(found["ids"])
+                if len(found["ids"]) < want:
+                    break
+            else:
+                return items, f"{t}:{offset}"
+            offset = 0
+        return items, None
+
+    # ── 일괄 학습 ────────────────────────────────────────────────
+    # id는 Vanna add_* 와 같은 내용 해시(deterministic_uuid + -sql/-ddl/-doc)라
+    # 기존 항목과 호환되고, 이미 있는 id는 임베딩 계산 없이 건너뛴다.
+    def _training_record(self, item: dict) -> tuple:
+        """학습 항목 dict → (컬렉션, id, 문서)"""
+        from vanna.utils import deterministic_uuid
+        if "sql" in item:
+            doc = json.dumps({"question": item["question"], "sql": item["sql"]}, ensure_ascii=False)
+            return self.sql_collection, deterministic_uuid(doc) + "-sql", doc
+        if "ddl" in item:
+            return self.ddl_collection, deterministic_uuid(item["ddl"]) + "-ddl", item["ddl"]
+        if "documentation" in item:
+            doc = item["documentation"]
+            return self.documentation_collection, deterministic_uuid(doc) + "-doc", doc
+        raise ValueError(f"학습 항목 형식 오류: {sorted(item)}")
+
+    def train_bulk(
+        self,
+        items: list[dict],
+        batch_size: int = 64,
+        source: Optional[str] = None,
+        prune: bool = False,
+        progress=None,
+    ) -> dict:
+        """
+        {"question", "sql"} | {"ddl"} | {"documentation"} 목록을 일괄 학습.
+        컬렉션별로 기존 id를 한 번에 조회해 새 항목만 batch_size 단위로 임베딩·upsert.
+
+        source : 항목 metadata에 출처 태그 기록 (기존 항목도 태그가 없으면 부여)
+        prune  : 같은 source 태그를 가진 항목 중 items에 없는 것은 삭제
+                 (관리자 화면에서 직접 학습한 항목 등 태그 없는 항목은 건드리지 않음)
+        progress(done, total): 배치 처리마다 호출
+        """
+        started = time.perf_counter()
+        grouped: dict = {}
+        if prune:
+            for collection in (self.sql_collection, self.ddl_collection, self.documentation_collection):
+                grouped[collection.name] = (collection, {})
+        for item in items:
+            collection, id_, doc = self._training_record(item)
+            grouped.setdefault(collection.name, (collection, {}))[1][id_] = doc
+
+        metadata = {"source": source} if source else None
+        plan = []
+        for collection, docs in grouped.values():
+            found = collection.get(ids=list(docs), include=["metadatas"]) if docs else {"ids": [], "metadatas": []}
+            existing = set(found["ids"])
+            untagged = [
+                id_ for id_, meta in zip(found["ids"], found["metadatas"] or [None] * len(found["ids"]))
+                if metadata and (meta or {}).get("source") != source
+            ]
+            stale = []
+            if prune and source:
+                managed = collection.get(where={"source": source}, include=[])["ids"]
+                stale = [id_ for id_ in managed if id_ not in docs]
+            pending = [(id_, doc) for id_, doc in docs.items() if id_ not in existing]
+            plan.append((collection, existing, untagged, stale, pending))
+
+        total_work = sum(len(p[4]) for p in plan)
+        added = skipped = failed = deleted = 0
+        for collection, existing, untagged, stale, pending in plan:
+            skipped += len(existing)
+            if untagged:
+                collection.update(ids=untagged, metadatas=[metadata] * len(untagged))
+            if stale:
+                _delete_ids(collection, stale)
+                deleted += len(stale)
+            for i in range(0, len(pending), batch_size):
+                batch = pending[i:i + batch_size]
+                try:
+                    collection.upsert(
+                        ids=[id_ for id_, _ in batch],
+                        documents=[doc for _, doc in batch],
+                        embeddings=[list(e) for e in self.embedding_function([doc for _, doc in batch])],
+                        metadatas=[metadata] * len(batch) if metadata else None,
+                    )
+                    added += len(batch)
+                except Exception as e:
+                    failed += len(batch)
+                    print(f"[train] {collection.name} 배치 학습 실패 ({len(batch)}개): {e}")
+                if progress:
+                    progress(added + failed, total_work)
+        if added or deleted:
+            _similar_sql_results.clear()
+
+        elapsed = time.perf_counter() - started
+        total = added + skipped + failed
+        return {
+            "total": total,
+            "added": added,
+            "skipped": skipped,
+            "failed": failed,
+            "deleted": deleted,
+            "seconds": round(elapsed, 3),
+            "items_per_sec": round(total / elapsed, 1) if elapsed > 0 else None,
+        }
+
+    def generate_sql_stream(self, question: str, on_token, **kwargs) -> str:
+        """
+        토큰이 생성될 때마다 on_token(text) 호출 후 최종 정리된 SQL 반환.
+        스트리밍 미지원 백엔드는 완성된 SQL을 한 번에 전달.
+        """
+        sql = self.generate_sql(question, **kwargs)
+        on_token(sql)
+        return sql
+
 
 # ────────────────────────────────────────────────────────────────
 # 옵션 A: SQLCoder via Ollama  (로컬 개발용, 완전 무료)
@@ -269,7 +1015,7 @@ class SQLCoderOllamaVanna(_VannaBase, ChromaDB_VectorStore):
     """
 
     def __init__(self):
-        ChromaDB_VectorStore.__init__(self, config={"path": CHROMA_PATH, "n_results": 3})
+        ChromaDB_VectorStore.__init__(self, config=_shared_chroma_config())
 
     # ── Vanna 추상 메서드 구현 (ChromaDB_VectorStore 요건 충족) ──────
     # generate_sql을 직접 오버라이드하므로 실제로 호출되지 않음
@@ -289,7 +1035,7 @@ class SQLCoderOllamaVanna(_VannaBase, ChromaDB_VectorStore):
     # ── 핵심 로직 ───────────────────────────────────────────────────
     def _ollama_generate(self, prompt: str) -> str:
         """Ollama /api/generate (completion) 엔드포인트 호출"""
-        resp = requests.post(
+        resp = _http_session.post(
             f"{OLLAMA_HOST}/api/generate",
             json={
                 "model": SQLCODER_MODEL,
@@ -306,6 +1052,26 @@ class SQLCoderOllamaVanna(_VannaBase, ChromaDB_VectorStore):
         resp.raise_for_status()
         return resp.json().get("response", "")
 
+    def _ollama_generate_stream(self, prompt: str, on_token) -> str:
+        """Ollama /api/generate 스트리밍 호출 (NDJSON 청크마다 on_token)"""
+        resp = _http_session.post(
+            f"{OLLAMA_HOST}/api/generate",
+            json={
+                "model": SQLCODER_MODEL,
+                "prompt": prompt,
+                "stream": True,
+                "options": {
+                    "num_predict": 300,
+                    "temperature": 0.0,
+                    "stop": ["```", "\n\n\n", "###", "-- Q:"],
+                },
+            },
+            timeout=120,
+            stream=True,
+        )
+        resp.raise_for_status()
+        return _read_ollama_stream(resp, on_token, lambda chunk: chunk.get("response", ""))
+
     def generate_sql(self, question: str, **kwargs) -> str:
         try:
             similar = self.get_similar_question_sql(question)
@@ -315,6 +1081,14 @@ class SQLCoderOllamaVanna(_VannaBase, ChromaDB_VectorStore):
         raw = self._ollama_generate(prompt)
         return _clean_sql(raw)
 
+    def generate_sql_stream(self, question: str, on_token, **kwargs) -> str:
+        try:
+            similar = self.get_similar_question_sql(question)
+        except Exception:
+            similar = []
+        prompt = _build_sqlcoder_prompt(question, similar)
+        return _clean_sql(self._ollama_generate_stream(prompt, on_token))
+
     def generate_embedding(self, data: str, **kwargs):
         return ChromaDB_VectorStore.generate_embedding(self, data, **kwargs)
 
@@ -335,17 +1109,13 @@ class GroqSQLVanna(_VannaBase, ChromaDB_VectorStore):
     """
 
     def __init__(self):
-        ChromaDB_VectorStore.__init__(self, config={"path": CHROMA_PATH, "n_results": 3})
+        ChromaDB_VectorStore.__init__(self, config=_shared_chroma_config())
         if not GROQ_API_KEY:
             raise EnvironmentError(
                 "GROQ_API_KEY 환경변수가 설정되지 않았습니다. "
                 "https://console.groq.com 에서 무료 API 키를 발급 받으세요."
             )
-        from openai import OpenAI
-        self._client = OpenAI(
-            api_key=GROQ_API_KEY,
-            base_url="https://api.groq.com/openai/v1",
-        )
+        self._client = groq_client()
 
     # ── Vanna 추상 메서드 구현 ────────────────────────────────────
     def system_message(self, message: str) -> dict:
@@ -370,7 +1140,26 @@ class GroqSQLVanna(_VannaBase, ChromaDB_VectorStore):
         )
         return resp.choices[0].message.content
 
+    def _stream_groq(self, messages: list, model: str, on_token) -> str:
+        stream = self._client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=0.0,
+            max_tokens=300,
+            stream=True,
+        )
+        parts = []
+        for chunk in stream:
+            text = chunk.choices[0].delta.content if chunk.choices else None
+            if text:
+                parts.append(text)
+                on_token(text)
+        return "".join(parts)
+
     def generate_sql(self, question: str, **kwargs) -> str:
+        return self.generate_sql_stream(question, on_token=None, **kwargs)
+
+    def generate_sql_stream(self, question: str, on_token, **kwargs) -> str:
         try:
             similar = self.get_similar_question_sql(question)
         except Exception:
@@ -378,16 +1167,21 @@ class GroqSQLVanna(_VannaBase, ChromaDB_VectorStore):
 
         messages = _build_sqlcoder_messages(question, similar)
 
+        def call(model: str) -> str:
+            if on_token is None:
+                return self._call_groq(messages, model)
+            return self._stream_groq(messages, model, on_token)
+
         # Primary: 고정확도 대형 모델
         try:
-            raw = self._call_groq(messages, GROQ_MODEL_SQL)
+            raw = call(GROQ_MODEL_SQL)
             return _clean_sql(raw)
         except Exception as e:
             err_str = str(e)
             # Rate limit(429) 또는 서버 에러 시에만 internal secondary로 전환
             if "429" in err_str or "rate" in err_str.lower() or "503" in err_str:
                 print(f"[groq] {GROQ_MODEL_SQL} rate-limit → {GROQ_MODEL_FB} 전환: {err_str[:80]}")
-                raw = self._call_groq(messages, GROQ_MODEL_FB)
+                raw = call(GROQ_MODEL_FB)
                 return _clean_sql(raw)
             raise  # 다른 에러는 상위 fallback으로 전달
 
@@ -403,7 +1197,7 @@ class FallbackOllamaVanna(_VannaBase, ChromaDB_VectorStore):
     """로컬 환경 fallback — 범용 llama 모델로 SQL 재시도"""
 
     def __init__(self):
-        ChromaDB_VectorStore.__init__(self, config={"path": CHROMA_PATH, "n_results": 3})
+        ChromaDB_VectorStore.__init__(self, config=_shared_chroma_config())
 
     # ── Vanna 추상 메서드 구현 ────────────────────────────────────
     def system_message(self, message: str) -> dict:
@@ -418,7 +1212,7 @@ class FallbackOllamaVanna(_VannaBase, ChromaDB_VectorStore):
     def submit_prompt(self, prompt, **kwargs) -> str:
         raise NotImplementedError("FallbackOllamaVanna uses generate_sql directly")
 
-    def generate_sql(self, question: str, **kwargs) -> str:
+    def _build_messages(self, question: str) -> list:
         try:
             similar = self.get_similar_question_sql(question)
         except Exception:
@@ -430,12 +1224,14 @@ class FallbackOllamaVanna(_VannaBase, ChromaDB_VectorStore):
                 messages.append({"role": "user",      "content": item["question"]})
                 messages.append({"role": "assistant", "content": item["sql"]})
         messages.append({"role": "user", "content": question})
+        return messages
 
-        resp = requests.post(
+    def generate_sql(self, question: str, **kwargs) -> str:
+        resp = _http_session.post(
             f"{OLLAMA_HOST}/api/chat",
             json={
                 "model": FALLBACK_OLLAMA_MODEL,
-                "messages": messages,
+                "messages": self._build_messages(question),
                 "stream": False,
                 "options": {"temperature": 0.0, "num_predict": 300},
             },
@@ -444,6 +1240,22 @@ class FallbackOllamaVanna(_VannaBase, ChromaDB_VectorStore):
         resp.raise_for_status()
         return _clean_sql(resp.json()["message"]["content"])
 
+    def generate_sql_stream(self, question: str, on_token, **kwargs) -> str:
+        resp = _http_session.post(
+            f"{OLLAMA_HOST}/api/chat",
+            json={
+                "model": FALLBACK_OLLAMA_MODEL,
+                "messages": self._build_messages(question),
+                "stream": True,
+                "options": {"temperature": 0.0, "num_predict": 300},
+            },
+            timeout=120,
+            stream=True,
+        )
+        resp.raise_for_status()
+        raw = _read_ollama_stream(resp, on_token, lambda chunk: chunk.get("message", {}).get("content", ""))
+        return _clean_sql(raw)
+
     def generate_embedding(self, data: str, **kwargs):
         return ChromaDB_VectorStore.generate_embedding(self, data, **kwargs)
 
@@ -455,7 +1267,7 @@ class FallbackOllamaVanna(_VannaBase, ChromaDB_VectorStore):
 if LLM_PROVIDER in ("openai", "groq"):
     from vanna.openai import OpenAI_Chat
 
-    class _LegacyBase:
+    class _LegacyBase(_VannaBase):
         """Vanna 내장 submit_prompt를 그대로 사용하는 레거시 클래스"""
         def generate_sql(self, question: str, **kwargs) -> str:
             try:
@@ -472,7 +1284,7 @@ if LLM_PROVIDER in ("openai", "groq"):
 
     class OpenAIVanna(_LegacyBase, ChromaDB_VectorStore, OpenAI_Chat):
         def __init__(self):
-            ChromaDB_VectorStore.__init__(self, config={"path": CHROMA_PATH, "n_results": 3})
+            ChromaDB_VectorStore.__init__(self, config=_shared_chroma_config())
             cfg = {
                 "api_key": os.getenv("OPENAI_API_KEY") if LLM_PROVIDER == "openai"
                            else os.getenv("GROQ_API_KEY"),
@@ -480,13 +1292,13 @@ if LLM_PROVIDER in ("openai", "groq"):
                            else os.getenv("GROQ_MODEL", GROQ_MODEL_SQL),
             }
             if LLM_PROVIDER == "groq":
-                cfg["base_url"] = "https://api.groq.com/openai/v1"
+                cfg["base_url"] = GROQ_BASE_URL
             OpenAI_Chat.__init__(self, config=cfg)
 
 elif LLM_PROVIDER == "ollama":
     from vanna.ollama import Ollama
 
-    class _LegacyBase:
+    class _LegacyBase(_VannaBase):
         def generate_sql(self, question: str, **kwargs) -> str:
             try:
                 similar = self.get_similar_question_sql(question)
@@ -502,7 +1314,7 @@ elif LLM_PROVIDER == "ollama":
 
     class OllamaVanna(_LegacyBase, ChromaDB_VectorStore, Ollama):
         def __init__(self):
-            ChromaDB_VectorStore.__init__(self, config={"path": CHROMA_PATH, "n_results": 3})
+            ChromaDB_VectorStore.__init__(self, config=_shared_chroma_config())
             Ollama.__init__(self, config={"model": FALLBACK_OLLAMA_MODEL})
 
 
@@ -522,8 +1334,7 @@ def _build_primary() -> _VannaBase:
         print(f"[vanna] Primary: {LLM_PROVIDER} (legacy Vanna)")
         inst = OpenAIVanna()
         if LLM_PROVIDER == "groq":
-            from openai import OpenAI as _OAI
-            inst.client = _OAI(api_key=GROQ_API_KEY, base_url="https://api.groq.com/openai/v1")
+            inst.client = groq_client()
         return inst
     else:
         print(f"[vanna] Primary: Ollama generic  ({FALLBACK_OLLAMA_MODEL})")
@@ -544,29 +1355,61 @@ def _build_fallback():
     return None
 
 
-# ── 전역 인스턴스 ────────────────────────────────────────────────
+# ── 전역 인스턴스 (지연 생성) ─────────────────────────────────────
+# import 시점에는 아무 백엔드도 만들지 않는다. 클라이언트 라이브러리·ChromaDB·임베딩 모델
+# 로딩은 첫 사용 시점으로 미뤄 FastAPI가 먼저 헬스체크에 응답할 수 있게 한다.
 
-vn = _build_primary()
+_primary_vn: Optional[_VannaBase] = None
 _fallback_vn = None
+_fallback_built = False
+_build_lock = threading.RLock()
+
+
+def _attach_run_sql(inst):
+    inst.run_sql        = _run_sql
+    inst.run_sql_is_set = True
+    return inst
+
+
+def get_primary_vn() -> _VannaBase:
+    global _primary_vn
+    if _primary_vn is None:
+        with _build_lock:
+            if _primary_vn is None:
+                _primary_vn = _attach_run_sql(_build_primary())
+    return _primary_vn
 
-try:
-    _fallback_vn = _build_fallback()
-except Exception as e:
-    print(f"[vanna] Fallback 초기화 실패 (무시): {e}")
+
+def fallback_configured() -> bool:
+    """Fallback 백엔드를 쓰는 설정인지 (인스턴스 생성 없이 판단)"""
+    return LLM_PROVIDER == "sqlcoder" and SQLCODER_MODE != "groq"
 
 
 def get_fallback_vn():
+    global _fallback_vn, _fallback_built
+    if not _fallback_built:
+        with _build_lock:
+            if not _fallback_built:
+                try:
+                    inst = _build_fallback()
+                    _fallback_vn = _attach_run_sql(inst) if inst is not None else None
+                except Exception as e:
+                    print(f"[vanna] Fallback 초기화 실패 (무시): {e}")
+                _fallback_built = True
     return _fallback_vn
 
 
-# ── SQLite 실행 함수 연결 ────────────────────────────────────────
+class _LazyVanna:
+    """기존 `from vanna_setup import vn` 호환용 프록시 — 첫 속성 접근 시 Primary 생성"""
+
+    def __getattr__(self, name):
+        return getattr(get_primary_vn(), name)
+
+    def __setattr__(self, name, value):
+        setattr(get_primary_vn(), name, value)
 
-vn.run_sql        = _run_sql
-vn.run_sql_is_set = True
 
-if _fallback_vn is not None:
-    _fallback_vn.run_sql        = _run_sql
-    _fallback_vn.run_sql_is_set = True
+vn = _LazyVanna()
 
 
 # ════════════════════════════════════════════════════════════════
@@ -577,7 +1420,7 @@ class GeminiSQLVanna(_VannaBase, ChromaDB_VectorStore):
     """Google Gemini — 저비용 고속 Text-to-SQL (1M 컨텍스트)"""
 
     def __init__(self):
-        ChromaDB_VectorStore.__init__(self, config={"path": CHROMA_PATH, "n_results": 3})
+        ChromaDB_VectorStore.__init__(self, config=_shared_chroma_config())
         from google import genai
         self._client = genai.Client(api_key=GEMINI_API_KEY)
 
@@ -626,9 +1469,15 @@ class ClaudeSQLVanna(_VannaBase, ChromaDB_VectorStore):
     """Anthropic Claude — 200K 컨텍스트 고정확도 Text-to-SQL"""
 
     def __init__(self):
-        ChromaDB_VectorStore.__init__(self, config={"path": CHROMA_PATH, "n_results": 3})
+        ChromaDB_VectorStore.__init__(self, config=_shared_chroma_config())
         import anthropic
-        self._client = anthropic.Anthropic(api_key=CLAUDE_API_KEY)
+        try:
+            http_client = pooled_httpx_client(getattr(anthropic, "DefaultHttpxClient", None))
+            self._client = anthropic.Anthropic(api_key=CLAUDE_API_KEY, http_client=http_client)
+        except TypeError as e:
+            # SDK가 주입 클라이언트를 거부하면 (httpx 패키지 불일치 등) SDK 기본 클라이언트 사용
+            print(f"[provider] Claude 공유 httpx 클라이언트 주입 실패, SDK 기본 클라이언트 사용: {e}")
+            self._client = anthropic.Anthropic(api_key=CLAUDE_API_KEY, max_retries=2, timeout=120.0)
 
     def system_message(self, message: str) -> dict:
         return {"role": "system", "content": message}
@@ -675,44 +1524,58 @@ _PROVIDER_META = {
 }
 
 
-def _init_providers():
-    if GROQ_API_KEY:
-        try:
-            inst = GroqSQLVanna()
-            inst.run_sql = _run_sql
-            inst.run_sql_is_set = True
-            _provider_registry["groq"] = inst
-            print(f"[provider] Groq 초기화 완료 ({GROQ_MODEL_SQL})")
-        except Exception as e:
-            print(f"[provider] Groq 초기화 실패: {e}")
+def _provider_factories() -> dict:
+    """프로바이더 → (API 키, 클래스, 모델)"""
+    return {
+        "groq":   (GROQ_API_KEY,   GroqSQLVanna,   GROQ_MODEL_SQL),
+        "gemini": (GEMINI_API_KEY, GeminiSQLVanna, GEMINI_MODEL),
+        "claude": (CLAUDE_API_KEY, ClaudeSQLVanna, CLAUDE_MODEL),
+    }
 
-    if GEMINI_API_KEY:
-        try:
-            inst = GeminiSQLVanna()
-            inst.run_sql = _run_sql
-            inst.run_sql_is_set = True
-            _provider_registry["gemini"] = inst
-            print(f"[provider] Gemini 초기화 완료 ({GEMINI_MODEL})")
-        except Exception as e:
-            print(f"[provider] Gemini 초기화 실패: {e}")
 
-    if CLAUDE_API_KEY:
-        try:
-            inst = ClaudeSQLVanna()
-            inst.run_sql = _run_sql
-            inst.run_sql_is_set = True
-            _provider_registry["claude"] = inst
-            print(f"[provider] Claude 초기화 완료 ({CLAUDE_MODEL})")
-        except Exception as e:
-            print(f"[provider] Claude 초기화 실패: {e}")
+_provider_failed: set[str] = set()
 
 
-_init_providers()
+def _get_provider(provider: str) -> Optional[_VannaBase]:
+    """키가 설정된 프로바이더를 첫 요청 시 생성 (실패한 프로바이더는 재시도하지 않음)"""
+    inst = _provider_registry.get(provider)
+    if inst is not None or provider in _provider_failed:
+        return inst
+    factory = _provider_factories().get(provider)
+    if factory is None or not factory[0]:
+        return None
+    _, cls, model = factory
+    with _build_lock:
+        if provider in _provider_registry or provider in _provider_failed:
+            return _provider_registry.get(provider)
+        try:
+            _provider_registry[provider] = _attach_run_sql(cls())
+            print(f"[provider] {_PROVIDER_META[provider]['name']} 초기화 완료 ({model})")
+        except Exception as e:
+            _provider_failed.add(provider)
+            print(f"[provider] {_PROVIDER_META[provider]['name']} 초기화 실패: {e}")
+    return _provider_registry.get(provider)
 
 
 def get_provider_vanna(provider: str) -> _VannaBase:
     """지정 프로바이더 Vanna 인스턴스 반환. 없으면 기본 vn."""
-    return _provider_registry.get(provider, vn)
+    return _get_provider(provider) or get_primary_vn()
+
+
+def get_race_partner():
+    """
+    race 모드에서 기본 vn과 경쟁시킬 두 번째 백엔드 (이름, 인스턴스).
+    RACE_SECONDARY(fallback | groq | gemini | claude)로 지정, 미지정 시
+    fallback → 등록 프로바이더 순. 기본 vn과 같은 클래스는 제외.
+    """
+    preferred = os.getenv("RACE_SECONDARY", "").strip()
+    order = [preferred] if preferred else ["fallback", "groq", "gemini", "claude"]
+    primary = get_primary_vn()
+    for name in order:
+        inst = get_fallback_vn() if name == "fallback" else _get_provider(name)
+        if inst is not None and type(inst) is not type(primary):
+            return name, inst
+    return None
 
 
 def available_providers() -> list[dict]:
@@ -725,6 +1588,7 @@ def available_providers() -> list[dict]:
             "name": meta["name"],
             "model": meta["model"],
             "color": meta["color"],
-            "available": key in _provider_registry,
+            # 키 설정 여부로 판단 (인스턴스는 첫 요청 시 생성), 생성 실패 시 제외
+            "available": bool(_provider_factories()[key][0]) and key not in _provider_failed,
         })
     return result
@@ -22,7 +22,7 @@ export function DDLTab({ password }: DDLTabProps) {
     setError("");
     try {
       // ddl.sql은 공개 경로에 없으므로 훈련 데이터에서 DDL 타입을 가져옴
-      const res = await apiFetch("/api/admin/training", { headers });
+      const res = await apiFetch("/api/admin/training?type=ddl", { headers });
       const data = await res.json();
       if (!res.ok) throw new Error(data.detail);
       const ddlItems = (data.items ?? []).filter(
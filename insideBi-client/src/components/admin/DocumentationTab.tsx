@@ -30,7 +30,7 @@ export function DocumentationTab({ password }: DocumentationTabProps) {
     setLoading(true);
     setError("");
     try {
-      const res = await apiFetch("/api/admin/training", { headers });
+      const res = await apiFetch("/api/admin/training?type=documentation", { headers });
       const data = await res.json();
       if (!res.ok) throw new Error(data.detail);
       const docItems = (data.items as TrainingItem[]).filter(
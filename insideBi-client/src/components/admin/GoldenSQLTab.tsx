@@ -12,6 +12,15 @@ interface TrainingItem {
   content?: string;
 }
 
+interface RetrainJob {
+  id: string;
+  state: "queued" | "running" | "done" | "failed";
+  progress?: { done: number; total: number };
+  error?: string | null;
+}
+
+const RETRAIN_POLL_MS = 2000;
+
 interface GoldenSQLTabProps {
   password: string;
 }
@@ -33,7 +42,7 @@ export function GoldenSQLTab({ password }: GoldenSQLTabProps) {
     setLoading(true);
     setError("");
     try {
-      const res = await apiFetch("/api/admin/training", { headers });
+      const res = await apiFetch("/api/admin/training?type=sql", { headers });
       const data = await res.json();
       if (!res.ok) throw new Error(data.detail);
       // SQL 타입만 필터
@@ -76,6 +85,19 @@ export function GoldenSQLTab({ password }: GoldenSQLTabProps) {
     }
   };
 
+  /** 재학습 작업이 끝날 때까지 진행 상황 폴링 (서버는 작업을 백그라운드에서 수행) */
+  const waitForRetrainJob = async (jobId: string): Promise<RetrainJob> => {
+    for (;;) {
+      await new Promise((r) => setTimeout(r, RETRAIN_POLL_MS));
+      const res = await apiFetch(`/api/admin/training/jobs/${jobId}`, { headers });
+      const job = await res.json();
+      if (!res.ok) throw new Error(job.detail ?? job.error);
+      if (job.state === "done" || job.state === "failed") return job;
+      const { done, total } = job.progress ?? { done: 0, total: 0 };
+      setSuccessMsg(total ? `재학습 중... (${done}/${total})` : "재학습 준비 중...");
+    }
+  };
+
   const handleRetrainAll = async () => {
     if (!confirm("ChromaDB를 전체 재학습합니다. 시간이 걸릴 수 있습니다. 진행하시겠습니까?")) return;
     setRetraining(true);
@@ -86,11 +108,16 @@ export function GoldenSQLTab({ password }: GoldenSQLTabProps) {
         headers,
       });
       const data = await res.json();
-      if (!res.ok) throw new Error(data.detail);
+      // 409: 이미 진행 중인 작업이 있으면 그 작업을 이어서 기다림
+      if (!res.ok && !(res.status === 409 && data.job)) throw new Error(data.detail);
+      setSuccessMsg("재학습 시작...");
+      const job = await waitForRetrainJob(data.job.id);
+      if (job.state === "failed") throw new Error(job.error ?? "재학습 실패");
       setSuccessMsg("전체 재학습 완료! 목록을 새로고침합니다.");
       setTimeout(() => setSuccessMsg(""), 4000);
       fetchItems();
     } catch (e) {
+      setSuccessMsg("");
       setError(e instanceof Error ? e.message : "재학습 실패");
     } finally {
       setRetraining(false);
@@ -34,9 +34,11 @@ interface AiChartResultProps {
   data: Record<string, unknown>[];
   chartType: string;
   question?: string;
+  /** /api/ask 응답의 message_id — 서버에 캐시된 컬럼 프로파일로 설명 생성 (data 재전송 X) */
+  messageId?: string;
 }
 
-function useNarrative(data: Record<string, unknown>[], question?: string) {
+function useNarrative(data: Record<string, unknown>[], question?: string, messageId?: string) {
   const [narrative, setNarrative] = React.useState<string | null>(null);
   const [loading, setLoading] = React.useState(false);
 
@@ -44,24 +46,28 @@ function useNarrative(data: Record<string, unknown>[], question?: string) {
     if (!data || data.length === 0 || !question) return;
     setNarrative(null);
     setLoading(true);
-    apiFetch("/api/narrative", {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ question, data }),
-    })
-      .then((r) => r.json())
+    const request = (body: object) =>
+      apiFetch("/api/narrative", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify(body),
+      }).then((r) => r.json());
+
+    (messageId ? request({ question, message_id: messageId }) : request({ question, data }))
+      // 서버 프로파일 캐시가 만료됐으면 data를 담아 재요청
+      .then((json) => (json.profile_missing ? request({ question, data }) : json))
       .then((json) => {
         if (json.narrative) setNarrative(json.narrative);
       })
       .catch(() => {})
       .finally(() => setLoading(false));
-  }, [data, question]);
+  }, [data, question, messageId]);
 
   return { narrative, loading };
 }
 
-export function AiChartResult({ data, chartType, question }: AiChartResultProps) {
-  const { narrative, loading: narrativeLoading } = useNarrative(data, question);
+export function AiChartResult({ data, chartType, question, messageId }: AiChartResultProps) {
+  const { narrative, loading: narrativeLoading } = useNarrative(data, question, messageId);
 
   if (!data || data.length === 0) return null;
 
@@ -40,9 +40,18 @@ export function AiChatMessage({ message, onFeedback }: AiChatMessageProps) {
           <Bot className="h-4 w-4 text-primary animate-pulse" />
         </div>
         <div className="flex-1 space-y-2 pt-1">
-          <Skeleton className="h-3 w-3/4" />
-          <Skeleton className="h-3 w-1/2" />
-          <Skeleton className="h-3 w-5/6" />
+          {message.sql ? (
+            // /api/ask/stream 으로 받은 SQL (생성 중 토큰 포함)
+            <pre className="overflow-x-auto rounded-lg bg-muted/80 p-3 text-[11px] leading-relaxed text-foreground border">
+              {message.sql}
+            </pre>
+          ) : (
+            <>
+              <Skeleton className="h-3 w-3/4" />
+              <Skeleton className="h-3 w-1/2" />
+              <Skeleton className="h-3 w-5/6" />
+            </>
+          )}
           <p className="text-[10px] text-muted-foreground pt-0.5">
             SQL 생성 중...
             {elapsed > 0 && ` ${elapsed}초 경과`}
@@ -88,6 +97,7 @@ export function AiChatMessage({ message, onFeedback }: AiChatMessageProps) {
               data={message.data}
               chartType={message.chartType}
               question={message.question}
+              messageId={message.id}
             />
           </div>
         )}
@@ -20,8 +20,34 @@ function stripData(msgs: ChatMessage[]) {
   return msgs.map(({ data: _, ...m }) => m);
 }
 
-function persistHistory(msgs: ChatMessage[]) {
-  apiFetch("/api/chat-history", {
+/** /api/ask/stream 이벤트 (NDJSON 한 줄에 1개) */
+type AskStreamEvent =
+  | { type: "accepted" | "cache" | "rows" | "retry" }
+  | { type: "sql_token"; text: string }
+  | { type: "sql"; sql: string }
+  | ({ type: "result" } & AiAskResponse)
+  | { type: "error"; status: number; detail: string };
+
+/** NDJSON 응답 본문을 줄 단위로 읽어 이벤트로 반환 */
+async function* readNdjson(res: Response): AsyncGenerator<AskStreamEvent> {
+  const reader = res.body!.getReader();
+  const decoder = new TextDecoder();
+  let buffered = "";
+  for (;;) {
+    const { done, value } = await reader.read();
+    buffered += decoder.decode(value, { stream: !done });
+    const lines = buffered.split("\n");
+    buffered = done ? "" : lines.pop()!;
+    for (const line of lines) {
+      if (line.trim()) yield JSON.parse(line);
+    }
+    if (done) return;
+  }
+}
+
+/** 이번 턴에 확정된 메시지만 서버에 추가 (전체 히스토리 재전송 X) */
+function appendHistory(msgs: ChatMessage[]) {
+  apiFetch("/api/chat-history/messages", {
     method: "POST",
     headers: { "Content-Type": "application/json" },
     body: JSON.stringify({ messages: stripData(msgs) }),
@@ -86,7 +112,7 @@ export function AiChatProvider({ children }: { children: React.ReactNode }) {
 
     (async () => {
       try {
-        const res = await apiFetch("/api/ask", {
+        const res = await apiFetch("/api/ask/stream", {
           method: "POST",
           headers: { "Content-Type": "application/json" },
           body: JSON.stringify({ question, provider }),
@@ -112,7 +138,19 @@ export function AiChatProvider({ children }: { children: React.ReactNode }) {
           throw new Error(message);
         }
 
-        const data: AiAskResponse = await res.json();
+        // SQL 이 생성되는 대로 로딩 메시지에 보여주고, result 이벤트로 완료
+        const showSql = (sql: (prev: string) => string) =>
+          setMessages((prev) => prev.map((m) => (m.id === loadingId ? { ...m, sql: sql(m.sql ?? "") } : m)));
+        let result: AiAskResponse | null = null;
+        for await (const event of readNdjson(res)) {
+          if (event.type === "sql_token") showSql((prev) => prev + event.text);
+          else if (event.type === "sql") showSql(() => event.sql);
+          else if (event.type === "retry") showSql(() => "");
+          else if (event.type === "result") result = event;
+          else if (event.type === "error") throw new Error(event.detail || `HTTP ${event.status}`);
+        }
+        if (!result) throw new Error("응답이 중간에 끊겼습니다. 다시 시도하세요.");
+        const data: AiAskResponse = result;
 
         setMessages((prev) => {
           const next = prev.map((m) =>
@@ -131,7 +169,7 @@ export function AiChatProvider({ children }: { children: React.ReactNode }) {
                 }
               : m
           );
-          persistHistory(next);
+          appendHistory(next.filter((m) => m.id === userMsg.id || m.id === data.message_id));
           return next;
         });
       } catch (err) {
@@ -146,7 +184,7 @@ export function AiChatProvider({ children }: { children: React.ReactNode }) {
           const next = prev.map((m) =>
             m.id === loadingId ? { ...m, content: message, status: "error" as const } : m
           );
-          persistHistory(next);
+          appendHistory(next.filter((m) => m.id === userMsg.id || m.id === loadingId));
           return next;
         });
       }
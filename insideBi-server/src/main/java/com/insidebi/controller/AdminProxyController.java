@@ -2,6 +2,7 @@ package com.insidebi.controller;
 
 import com.insidebi.config.AppConfig;
 import com.insidebi.service.AiProxyService;
+import jakarta.servlet.http.HttpServletRequest;
 import lombok.RequiredArgsConstructor;
 import lombok.extern.slf4j.Slf4j;
 import org.springframework.http.*;
@@ -27,11 +28,15 @@ public class AdminProxyController {
         return aiProxyService.proxy("/admin/login", HttpMethod.POST, body, headers);
     }
 
-    /** GET /api/admin/training */
+    /** GET /api/admin/training?type=&q=&limit=&cursor= */
     @GetMapping("/training")
-    public ResponseEntity<?> getTraining(@RequestHeader HttpHeaders headers) {
+    public ResponseEntity<?> getTraining(
+            @RequestHeader HttpHeaders headers,
+            HttpServletRequest req) {
         if (!isAuthorized(headers)) return unauthorized();
-        return aiProxyService.proxy("/admin/training", HttpMethod.GET, null, headers);
+        String query = req.getQueryString();
+        String path = "/admin/training" + (query != null ? "?" + query : "");
+        return aiProxyService.proxy(path, HttpMethod.GET, null, headers);
     }
 
     /** POST /api/admin/training?type=sql|doc */
@@ -104,6 +109,15 @@ public class AdminProxyController {
         return aiProxyService.proxy("/admin/training/retrain-all", HttpMethod.POST, body, headers);
     }
 
+    /** GET /api/admin/training/jobs/{jobId}  (재학습 작업 진행 상황) */
+    @GetMapping("/training/jobs/{jobId}")
+    public ResponseEntity<?> retrainJob(
+            @PathVariable String jobId,
+            @RequestHeader HttpHeaders headers) {
+        if (!isAuthorized(headers)) return unauthorized();
+        return aiProxyService.proxy("/admin/training/jobs/" + jobId, HttpMethod.GET, null, headers);
+    }
+
     // ---- helpers ----
     private boolean isAuthorized(HttpHeaders headers) {
         String pw = headers.getFirst("x-admin-password");
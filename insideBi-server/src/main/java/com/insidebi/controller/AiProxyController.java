@@ -3,11 +3,13 @@ package com.insidebi.controller;
 import com.insidebi.service.AiProxyService;
 import com.insidebi.service.RateLimiterService;
 import jakarta.servlet.http.HttpServletRequest;
+import jakarta.servlet.http.HttpServletResponse;
 import lombok.RequiredArgsConstructor;
 import lombok.extern.slf4j.Slf4j;
 import org.springframework.http.*;
 import org.springframework.web.bind.annotation.*;
 
+import java.io.IOException;
 import java.util.Map;
 
 @Slf4j
@@ -36,6 +38,49 @@ public class AiProxyController {
         return aiProxyService.proxy("/api/ask", HttpMethod.POST, body, headers);
     }
 
+    /** POST /api/ask/stream  (rate-limited, NDJSON 이벤트를 받는 대로 전달) */
+    @PostMapping("/ask/stream")
+    public void askStream(
+            @RequestBody(required = false) Object body,
+            @RequestHeader HttpHeaders headers,
+            HttpServletRequest req,
+            HttpServletResponse resp) throws IOException {
+
+        String ip = getClientIp(req);
+        if (!rateLimiter.isAllowed(ip)) {
+            resp.setStatus(429);
+            resp.setHeader("Retry-After", String.valueOf(rateLimiter.getWindowSeconds()));
+            resp.setHeader("X-RateLimit-Limit", String.valueOf(rateLimiter.getMaxRequests()));
+            resp.setContentType(MediaType.APPLICATION_JSON_VALUE);
+            resp.getWriter().write("{\"error\":\"Too many requests\"}");
+            return;
+        }
+        aiProxyService.stream("/api/ask/stream", HttpMethod.POST, body, headers, resp);
+    }
+
+    /** GET /api/ask/{messageId}/export?format=csv|parquet  (ask 결과 전체 파일, 스트리밍 전달) */
+    @GetMapping("/ask/{messageId}/export")
+    public void exportAsk(
+            @PathVariable String messageId,
+            @RequestHeader HttpHeaders headers,
+            HttpServletRequest req,
+            HttpServletResponse resp) throws IOException {
+        String query = req.getQueryString();
+        String path = "/api/ask/" + messageId + "/export" + (query != null ? "?" + query : "");
+        aiProxyService.stream(path, HttpMethod.GET, null, headers, resp);
+    }
+
+    /** GET /api/ask/{messageId}/rows?cursor=&limit=  (ask 결과 다음 페이지) */
+    @GetMapping("/ask/{messageId}/rows")
+    public ResponseEntity<?> getAskRows(
+            @PathVariable String messageId,
+            @RequestHeader HttpHeaders headers,
+            HttpServletRequest req) {
+        String query = req.getQueryString();
+        String path = "/api/ask/" + messageId + "/rows" + (query != null ? "?" + query : "");
+        return aiProxyService.proxy(path, HttpMethod.GET, null, headers);
+    }
+
     /** GET /api/briefing */
     @GetMapping("/briefing")
     public ResponseEntity<?> getBriefing(@RequestHeader HttpHeaders headers) {
@@ -76,6 +121,24 @@ public class AiProxyController {
         return aiProxyService.proxy("/api/chat-history", HttpMethod.POST, body, headers);
     }
 
+    /** GET /api/chat-history/messages?limit=&cursor=  (최신순 페이지) */
+    @GetMapping("/chat-history/messages")
+    public ResponseEntity<?> getChatMessages(
+            @RequestHeader HttpHeaders headers,
+            HttpServletRequest req) {
+        String query = req.getQueryString();
+        String path = "/api/chat-history/messages" + (query != null ? "?" + query : "");
+        return aiProxyService.proxy(path, HttpMethod.GET, null, headers);
+    }
+
+    /** POST /api/chat-history/messages  (메시지 추가, 전체 히스토리 재전송 없음) */
+    @PostMapping("/chat-history/messages")
+    public ResponseEntity<?> appendChatMessages(
+            @RequestBody(required = false) Object body,
+            @RequestHeader HttpHeaders headers) {
+        return aiProxyService.proxy("/api/chat-history/messages", HttpMethod.POST, body, headers);
+    }
+
     /** DELETE /api/chat-history */
     @DeleteMapping("/chat-history")
     public ResponseEntity<?> deleteChatHistory(@RequestHeader HttpHeaders headers) {
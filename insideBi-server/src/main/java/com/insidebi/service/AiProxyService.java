@@ -1,6 +1,8 @@
 package com.insidebi.service;
 
+import com.fasterxml.jackson.databind.ObjectMapper;
 import com.insidebi.config.AppConfig;
+import jakarta.servlet.http.HttpServletResponse;
 import lombok.RequiredArgsConstructor;
 import lombok.extern.slf4j.Slf4j;
 import org.springframework.http.*;
@@ -8,6 +10,11 @@ import org.springframework.stereotype.Service;
 import org.springframework.web.client.HttpStatusCodeException;
 import org.springframework.web.client.RestTemplate;
 
+import java.io.IOException;
+import java.io.InputStream;
+import java.io.OutputStream;
+import java.net.URI;
+import java.util.List;
 import java.util.Map;
 
 @Slf4j
@@ -17,6 +24,10 @@ public class AiProxyService {
 
     private final RestTemplate restTemplate;
     private final AppConfig appConfig;
+    private final ObjectMapper objectMapper;
+
+    /** 스트리밍 응답에서 클라이언트로 그대로 넘길 헤더 */
+    private static final List<String> STREAM_HEADERS = List.of(HttpHeaders.CONTENT_TYPE, HttpHeaders.CONTENT_DISPOSITION);
 
     public ResponseEntity<Object> proxy(String path, HttpMethod method, Object body, HttpHeaders incomingHeaders) {
         String url = appConfig.aiBackendUrl + path;
@@ -32,7 +43,10 @@ public class AiProxyService {
         HttpEntity<Object> entity = new HttpEntity<>(body, headers);
 
         try {
-            ResponseEntity<Object> response = restTemplate.exchange(url, method, entity, Object.class);
+            // 쿼리 문자열은 클라이언트가 이미 인코딩해 보낸 그대로 전달 (URI 템플릿 재인코딩 방지)
+            ResponseEntity<Object> response = path.contains("?")
+                    ? restTemplate.exchange(URI.create(url), method, entity, Object.class)
+                    : restTemplate.exchange(url, method, entity, Object.class);
             return ResponseEntity.status(response.getStatusCode()).body(response.getBody());
         } catch (HttpStatusCodeException e) {
             log.warn("AI backend error: {} {}", e.getStatusCode(), e.getResponseBodyAsString());
@@ -59,4 +73,59 @@ public class AiProxyService {
                     .body(Map.of("error", "AI backend unavailable"));
         }
     }
+
+    /**
+     * 스트리밍 응답(NDJSON 질문 진행 이벤트, CSV/Parquet 내보내기) 전달.
+     * RestTemplate 으로 본문 전체를 받아 두지 않고, 읽는 대로 response 에 쓰고 flush 한다.
+     */
+    public void stream(String path, HttpMethod method, Object body, HttpHeaders incomingHeaders,
+                       HttpServletResponse response) throws IOException {
+        String url = appConfig.aiBackendUrl + path;
+        String adminPw = incomingHeaders.getFirst("x-admin-password");
+
+        try {
+            // 쿼리 문자열은 클라이언트가 이미 인코딩해 보낸 그대로 전달 (URI 템플릿 재인코딩 방지)
+            URI uri = path.contains("?") ? URI.create(url) : restTemplate.getUriTemplateHandler().expand(url);
+            restTemplate.execute(uri, method, request -> {
+                if (adminPw != null) {
+                    request.getHeaders().set("x-admin-password", adminPw);
+                }
+                if (body != null) {
+                    request.getHeaders().setContentType(MediaType.APPLICATION_JSON);
+                    objectMapper.writeValue(request.getBody(), body);
+                }
+            }, upstream -> {
+                response.setStatus(upstream.getStatusCode().value());
+                for (String name : STREAM_HEADERS) {
+                    String value = upstream.getHeaders().getFirst(name);
+                    if (value != null) response.setHeader(name, value);
+                }
+                copyFlushing(upstream.getBody(), response.getOutputStream());
+                return null;
+            });
+        } catch (HttpStatusCodeException e) {
+            // 스트림 시작 전 오류 (404 만료된 결과, 400 잘못된 형식 등) — 본문은 짧은 JSON
+            log.warn("AI backend error: {} {}", e.getStatusCode(), e.getResponseBodyAsString());
+            response.setStatus(e.getStatusCode().value());
+            response.setContentType(MediaType.APPLICATION_JSON_VALUE);
+            response.getOutputStream().write(e.getResponseBodyAsByteArray());
+        } catch (Exception e) {
+            log.error("AI backend stream failed: {}", e.getMessage());
+            // 이미 일부를 보냈으면 상태를 바꿀 수 없으므로 연결만 끊긴다
+            if (!response.isCommitted()) {
+                response.setStatus(HttpStatus.SERVICE_UNAVAILABLE.value());
+                response.setContentType(MediaType.APPLICATION_JSON_VALUE);
+                objectMapper.writeValue(response.getOutputStream(), Map.of("error", "AI backend unavailable"));
+            }
+        }
+    }
+
+    private static void copyFlushing(InputStream in, OutputStream out) throws IOException {
+        byte[] buffer = new byte[8192];
+        int read;
+        while ((read = in.read(buffer)) != -1) {
+            out.write(buffer, 0, read);
+            out.flush();
+        }
+    }
 }